@@ -1,10 +1,17 @@
 """
 Audit Trail that shows:
 - Accountability (who decided what and when)
+AI decisions are stored once, normalized:
+- case_decisions: one row per AI decision with typed columns (path, confidences, gap, band, ...),
+  chained to the decision it re-decided (prior_decision_uid)
+- decision_signals: the signals that fired for that decision
+- case_actions: the action log; AUTO_ROUTED and analyst rows point at the decision via decision_id
+  instead of carrying a copy of the AI context in extra_data
 """
 
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Column, Integer, String, DateTime, Float, JSON
 from .database import Base
 
 class CaseAction(Base):
@@ -15,5 +22,120 @@ class CaseAction(Base):
     account_id = Column(String, index=True)
     action = Column(String)                       # APPROVE | OVERRIDE | REQUEST_INFO | ESCALATE
     reason = Column(String, nullable=True)        # reason for action, especially if it's OVERRIDE
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    extra_data = Column(JSON, nullable=True)        # e.g the previous routed_path
\ No newline at end of file
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))   # per row, not once at import
+    extra_data = Column(JSON, nullable=True)        # human fields only (human_final_path, ...)
+    audit_uid = Column(String, unique=True, index=True, nullable=True)   # idempotent replay from the audit WAL
+    decision_id = Column(Integer, index=True, nullable=True)             # case_decisions.id this action is about
+
+
+class CaseDecision(Base):
+    __tablename__ = "case_decisions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    decision_uid = Column(String, unique=True, index=True)    # audit_uid of the AUTO_ROUTED action
+    origin = Column(String, default="ai_decision")            # ai_decision | migrated_copy (see audit_migration)
+    case_id = Column(String, index=True)
+    account_id = Column(String, index=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    routed_path = Column(String, nullable=True)               # after guardrails
+    workflow_path = Column(String, nullable=True)             # what the AI proposed
+    risk_band = Column(String, nullable=True)
+    risk_score = Column(Integer, nullable=True)
+    ai_confidence = Column(Float, nullable=True)
+    deterministic_confidence = Column(Float, nullable=True)
+    final_confidence = Column(Float, nullable=True)
+    confidence_gap = Column(Float, nullable=True)
+    case_version = Column(Integer, nullable=True)
+    content_hash = Column(String, nullable=True)
+    ai_tier = Column(String, nullable=True)
+    ai_model = Column(String, nullable=True)
+    ai_stop = Column(String, nullable=True)
+    policy_citations = Column(JSON, nullable=True)
+    evidence_event_ids = Column(JSON, nullable=True)
+    ai_output = Column(JSON, nullable=True)                   # validated model answer (AIReasoningOut), before guardrails
+    decision_mode = Column(String, nullable=True)             # full | incremental | reused (see app.redecision)
+    prior_decision_uid = Column(String, index=True, nullable=True)   # decision this one was based on
+    extras = Column(JSON, nullable=True)                      # anything else (tier latencies, escalation reasons)
+
+
+class DecisionSignal(Base):
+    __tablename__ = "decision_signals"
+
+    id = Column(Integer, primary_key=True)        # insertion order = order signals were first seen
+    decision_id = Column(Integer, index=True)
+    signal_name = Column(String, index=True)
+    position = Column(Integer)                    # index in the decision's fired_signals list
+    hits = Column(Integer, nullable=True)         # times it fired in the case (each hit adds its weight); NULL before counts were kept
+
+
+# AUTO_ROUTED extra_data key -> case_decisions column
+DECISION_COLUMNS = {
+    "ai_routed_path": "routed_path",
+    "ai_workflow_path": "workflow_path",
+    "risk_band": "risk_band",
+    "risk_score": "risk_score",
+    "ai_confidence": "ai_confidence",
+    "deterministic_confidence": "deterministic_confidence",
+    "final_confidence": "final_confidence",
+    "confidence_gap": "confidence_gap",
+    "case_version": "case_version",
+    "content_hash": "content_hash",
+    "ai_tier": "ai_tier",
+    "ai_model": "ai_model",
+    "ai_stop": "ai_stop",
+    "policy_citations": "policy_citations",
+    "evidence_event_ids": "evidence_event_ids",
+    "ai_output": "ai_output",
+    "decision_mode": "decision_mode",
+    "prior_decision_uid": "prior_decision_uid",
+}
+FLOAT_COLUMNS = {"ai_confidence", "deterministic_confidence", "final_confidence", "confidence_gap"}
+INT_COLUMNS = {"risk_score", "case_version"}
+
+# Fields an analyst action adds on top of the AI context
+HUMAN_FIELDS = ("human_action", "human_reason", "previous_routed_path", "human_final_path")
+
+
+def _coerce(column: str, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        if column in FLOAT_COLUMNS:
+            return float(value)
+        if column in INT_COLUMNS:
+            return int(value)
+    except (ValueError, TypeError):
+        return None
+    return value
+
+
+# Split an AUTO_ROUTED context dict into case_decisions column values + fired signal names
+def decision_row_from_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    row: Dict[str, Any] = {}
+    extras: Dict[str, Any] = {}
+    for key, value in context.items():
+        if key in ("fired_signals", "signal_counts"):   # stored in decision_signals
+            continue
+        if key in DECISION_COLUMNS:
+            row[DECISION_COLUMNS[key]] = _coerce(DECISION_COLUMNS[key], value)
+        else:
+            extras[key] = value
+    row["extras"] = extras or None
+    return row
+
+
+# Rebuild the AUTO_ROUTED context dict (the old extra_data shape) from a decision row
+def decision_context(decision: CaseDecision, fired_signals: List[str]) -> Dict[str, Any]:
+    context: Dict[str, Any] = {
+        key: getattr(decision, column)
+        for key, column in DECISION_COLUMNS.items()
+        if getattr(decision, column) is not None
+    }
+    context["fired_signals"] = fired_signals
+    context.update(decision.extras or {})
+    return context
+
+
+def human_fields(extra: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: v for k, v in (extra or {}).items() if k in HUMAN_FIELDS}
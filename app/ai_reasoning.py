@@ -5,22 +5,67 @@ It uses case object and Policy snippets and Outputs:
 - Includes workflow_path: MONITOR | REQUEST_INFO | REVIEW | ESCALATE
 - Includes evidence_event_ids + policy_citations
 - Includes explicit "AI STOP" boundary
+- Runs as a cascade: fast tier (small model, compact prompt), escalating to the strong tier
+  on invalid output, low confidence or a large gap vs the deterministic confidence
+- Model calls go through app.llm_scheduler (rate limits, priority classes, 429 backoff)
+- Incremental re-decisions (app.redecision) send the prior decision + what changed instead of
+  the whole case; the output format and validation are the same
+LangChain / OpenAI are imported on first use, not when this module is imported.
 """
 
 
 #Import dependencies
+import importlib
 import json
-from typing import Dict, Any, List
+import logging
+import os
+import re
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage
 from pydantic import ValidationError
 
+from . import llm_scheduler
 from .ai_schemas import AIReasoningOut
+from .llm_scheduler import INTERACTIVE, LLMSchedulerError
+from .local_models import LLM_BACKEND, FakeChatModel
+from .router import CONFIDENCE_FLOOR
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Model cascade: a cheap fast tier first, the strong tier only when its answer isn't trustworthy
+AI_CASCADE = os.getenv("AI_CASCADE", "1") == "1"
+AI_FAST_MODEL = os.getenv("AI_FAST_MODEL", "gpt-4o-mini")
+AI_STRONG_MODEL = os.getenv("AI_STRONG_MODEL", "gpt-4o")
+
+# Escalate when |AI confidence - deterministic confidence| is above this (same as the feedback high-gap threshold)
+CASCADE_GAP_THRESHOLD = float(os.getenv("CASCADE_GAP_THRESHOLD", "0.3"))
+
+# Fast tier's compact prompt
+FAST_TIER_TIMELINE_EVENTS = 8
+FAST_TIER_SNIPPET_CHARS = 300
+
+# Start of the narrative_summary string value in the model's JSON
+NARRATIVE_START_RE = re.compile(r'"narrative_summary"\s*:\s*"')
+
+
+# Pick the chat model backend: OpenAI by default, or the local stand-in for load tests
+def _get_chat_model(model_name: str = "gpt-4o-mini"):
+    if LLM_BACKEND == "fake":
+        return FakeChatModel(model=model_name, temperature=0)
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model_name, temperature=0)  #temperature of 0 ensures the result is factual
+
+
+# Import the LLM client stack ahead of the first request (startup warmup hook)
+def warm_up() -> None:
+    importlib.import_module("langchain_core.messages")
+    if LLM_BACKEND != "fake":
+        importlib.import_module("langchain_openai")
+
 
 # Convert RAG results to a citation list
 def _build_policy_citations(policy_snippets: List[Dict[str, Any]]) -> List[str]:
@@ -57,12 +102,76 @@ def _build_prompt_payload(case_obj: Dict[str, Any], policy_snippets: List[Dict[s
     }
 
 
-# Call the LLM and return a validated structured JSON output
-def generate_ai_reasoning(case_obj: Dict[str, Any], policy_snippets: List[Dict[str, Any]]) -> Dict[str, Any]:
-    model = ChatOpenAI(model="gpt-4o-mini", temperature=0)  #temperature of 0 ensures the result is factual
+# Payload for an incremental re-decision: the current risk picture, the prior AI answer and the
+# delta since the case it was made on (new events in full, the rest as ids / names)
+def _build_delta_payload(case_obj: Dict[str, Any], plan: Dict[str, Any], policy_snippets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    risk = case_obj.get("risk_assessment", {})
+    prior, delta = plan["prior"], plan["delta"]
+    prior_output = prior["context"]["ai_output"]
 
-    citations = _build_policy_citations(policy_snippets)
-    payload = _build_prompt_payload(case_obj, policy_snippets)
+    return {
+        "account_id": case_obj.get("account_id"),
+        "risk_band": risk.get("risk_band"),
+        "risk_score": risk.get("risk_score"),
+        "fired_signals": risk.get("fired_signals", []),
+        "signal_breakdown": risk.get("score_breakdown", {}),
+        "prior_decision": {
+            "case_version": prior["basis_case_version"],
+            "routed_path": prior["context"].get("ai_routed_path"),
+            **{k: prior_output.get(k) for k in (
+                "workflow_path", "confidence", "narrative_summary", "known_facts", "unknowns",
+                "why_this_path", "evidence_event_ids", "policy_citations",
+            )},
+        },
+        "changes_since_prior": {
+            "new_events": [
+                {
+                    "event_id": e.get("event_id"),
+                    "event_type": e.get("event_type"),
+                    "created_at": str(e.get("created_at")),
+                    "payload": e.get("payload", {}),
+                }
+                for e in delta["new_events"]
+            ],
+            "expired_event_ids": delta["expired_event_ids"],
+            "signals_added": delta["signals_added"],
+            "signals_removed": delta["signals_removed"],
+            "risk_band": delta["risk_band"],
+            "risk_score": delta["risk_score"],
+            "why_re_decided": plan["reasons"],
+        },
+        "policy_snippets": policy_snippets,
+    }
+
+
+# Prompt messages for one model call. compact=True is the fast tier's shorter prompt
+# (fewer timeline events, truncated policy snippets); the rules and output format are the same.
+# An incremental plan (app.redecision) swaps the full case for the prior decision + delta.
+def _build_messages(
+    case_obj: Dict[str, Any],
+    policy_snippets: List[Dict[str, Any]],
+    citations: List[str],
+    compact: bool = False,
+    plan: Optional[Dict[str, Any]] = None,
+) -> List[Any]:
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    incremental = plan is not None and plan["mode"] == "incremental"
+    if incremental:
+        payload = _build_delta_payload(case_obj, plan, policy_snippets)
+    else:
+        payload = _build_prompt_payload(case_obj, policy_snippets)
+        if compact:
+            payload["timeline"] = payload["timeline"][-FAST_TIER_TIMELINE_EVENTS:]
+    if compact:
+        payload["policy_snippets"] = [
+            {**s, "snippet": str(s.get("snippet", ""))[:FAST_TIER_SNIPPET_CHARS]} for s in policy_snippets
+        ]
+    preamble = (
+        "This account already has an AI decision. The payload holds that prior decision and only what "
+        "changed since. Keep what still holds, revise what the changes affect; evidence_event_ids may cite "
+        "the prior evidence or the new events.\n"
+    ) if incremental else ""
 
     system = SystemMessage(content=(
         "You are a compliance decision support assistant.\n"
@@ -90,6 +199,7 @@ def generate_ai_reasoning(case_obj: Dict[str, Any], policy_snippets: List[Dict[s
         '  "policy_citations": [string, ...],\n'
         '  "ai_stop": string\n'
         "}\n\n"
+        f"{preamble}"
         "Here is the case payload (JSON):\n"
         f"{json.dumps(payload, ensure_ascii=False)}\n\n"
         "Policy citation format must be like: source.md#chunk_12\n"
@@ -97,40 +207,193 @@ def generate_ai_reasoning(case_obj: Dict[str, Any], policy_snippets: List[Dict[s
         "Only use citations from the available list.\n"
         "Return ONLY JSON. No markdown.\n"
     ))
+    return [system, human]
+
 
-    raw = model.invoke([system, human]).content
+# Fail safe: if the model output can't be used, force REVIEW
+def _fail_safe(summary: str, unknown: str, why: str, citations: List[str]) -> Dict[str, Any]:
+    return AIReasoningOut(
+        narrative_summary=summary,
+        known_facts=[],
+        unknowns=[unknown],
+        workflow_path="REVIEW",
+        why_this_path=[why],
+        confidence=0.0,
+        evidence_event_ids=[],
+        policy_citations=citations[:1] if citations else [],
+        ai_stop="AI cannot freeze/restrict accounts or file regulatory reports. Human must decide enforcement."
+    ).model_dump()
 
+
+# Parse + validate raw model output. Returns (output, failure) where failure is None when the output is valid
+def _parse_model_output(raw: str, citations: List[str]) -> Tuple[Dict[str, Any], Optional[str]]:
     # Parse the JSON
     try:
         data = json.loads(raw)
     except Exception:
-        # Fail safe: if model output isn't valid JSON, force REVIEW
-        return AIReasoningOut(
-            narrative_summary="Model output could not be parsed. Failing safe to human review.",
-            known_facts=[],
-            unknowns=["Model returned invalid JSON."],
-            workflow_path="REVIEW",
-            why_this_path=["Fail-safe: invalid model output."],
-            confidence=0.0,
-            evidence_event_ids=[],
-            policy_citations=citations[:1] if citations else [],
-            ai_stop="AI cannot freeze/restrict accounts or file regulatory reports. Human must decide enforcement."
-        ).model_dump()
+        return _fail_safe(
+            "Model output could not be parsed. Failing safe to human review.",
+            "Model returned invalid JSON.",
+            "Fail-safe: invalid model output.",
+            citations,
+        ), "invalid_json"
 
     # Validate against schema
     try:
         validated = AIReasoningOut(**data)
-        return validated.model_dump()
-    except ValidationError:
-        # Fail safe: if schema validation fails, force REVIEW
-        return AIReasoningOut(
-            narrative_summary="Model output failed schema validation. Failing safe to human review.",
-            known_facts=[],
-            unknowns=["Model output did not match required schema."],
-            workflow_path="REVIEW",
-            why_this_path=["Fail-safe: schema validation failed."],
-            confidence=0.0,
-            evidence_event_ids=[],
-            policy_citations=citations[:1] if citations else [],
-            ai_stop="AI cannot freeze/restrict accounts or file regulatory reports. Human must decide enforcement."
-        ).model_dump()
\ No newline at end of file
+        return validated.model_dump(), None
+    except (ValidationError, TypeError):
+        return _fail_safe(
+            "Model output failed schema validation. Failing safe to human review.",
+            "Model output did not match required schema.",
+            "Fail-safe: schema validation failed.",
+            citations,
+        ), "schema_validation_failed"
+
+
+# Why a fast-tier answer isn't good enough (empty list = accept it)
+def _escalation_reasons(output: Dict[str, Any], failure: Optional[str], det_conf: float) -> List[str]:
+    if failure is not None:
+        return [failure]
+    reasons = []
+    confidence = float(output.get("confidence", 0.0))
+    if confidence < CONFIDENCE_FLOOR:
+        reasons.append(f"confidence {confidence} below {CONFIDENCE_FLOOR}")
+    if abs(confidence - det_conf) > CASCADE_GAP_THRESHOLD:
+        reasons.append(f"confidence gap {round(abs(confidence - det_conf), 2)} vs deterministic {det_conf}")
+    return reasons
+
+
+# Pulls the narrative_summary string out of a JSON object while it is still being streamed,
+# so its text can be shown token by token before the whole object has arrived
+class NarrativeExtractor:
+    def __init__(self):
+        self.buf = ""
+        self.pos: Optional[int] = None   # where the next unread narrative char is
+        self.done = False
+
+    # Feed the next raw chunk; returns the newly available narrative text
+    def feed(self, chunk: str) -> str:
+        if self.done:
+            return ""
+        self.buf += chunk
+        if self.pos is None:
+            m = NARRATIVE_START_RE.search(self.buf)
+            if not m:
+                return ""
+            self.pos = m.end()
+
+        buf, i, out = self.buf, self.pos, []
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                break
+            if ch == "\\":
+                end = i + (6 if buf[i + 1:i + 2] == "u" else 2)
+                if buf[i + 1:i + 3] in ("ud", "uD") and buf[i + 3:i + 4].lower() in ("8", "9", "a", "b"):
+                    end += 6   # high surrogate: decode together with the low half that follows
+                if end > len(buf):
+                    break   # escape sequence split across chunks; wait for the rest
+                out.append(json.loads(f'"{buf[i:end]}"'))
+                i = end
+                continue
+            out.append(ch)
+            i += 1
+        self.pos = i
+        return "".join(out)
+
+
+# The cascade as a stream of events:
+# - {"type": "token", "tier", "text"}: narrative text as the model writes it (stream=True only)
+# - {"type": "escalated", "from_tier", "to_tier", "reasons"}: fast answer rejected, strong tier starts over
+# - {"type": "result", "output", "trace"}: last event, output is validated (or the REVIEW fail-safe)
+# Fast tier first; the strong tier only runs when the fast answer failed validation, is below the
+# confidence floor, or disagrees too much with the deterministic confidence.
+# Every model call waits its turn in app.llm_scheduler at the given priority class.
+# plan: an app.redecision plan; "incremental" sends the prior decision + delta instead of the case.
+def _cascade_events(
+    case_obj: Dict[str, Any],
+    policy_snippets: List[Dict[str, Any]],
+    stream: bool,
+    priority: int = INTERACTIVE,
+    plan: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    citations = _build_policy_citations(policy_snippets)
+    det_conf = float(case_obj.get("risk_assessment", {}).get("confidence", 0.0))
+    trace: Dict[str, Any] = {"ai_tier": None, "ai_model": None, "ai_tier_latency_ms": {}, "ai_escalation_reasons": []}
+
+    if not AI_CASCADE:
+        tiers = [("fast", AI_FAST_MODEL, False)]     # single call, full prompt (pre-cascade behaviour)
+    else:
+        tiers = [("fast", AI_FAST_MODEL, True), ("strong", AI_STRONG_MODEL, False)]
+
+    output: Dict[str, Any] = {}
+    for position, (tier, model_name, compact) in enumerate(tiers):
+        is_last = position == len(tiers) - 1
+        messages = _build_messages(case_obj, policy_snippets, citations, compact=compact, plan=plan)
+
+        started = time.perf_counter()
+        try:
+            model = _get_chat_model(model_name)
+            if stream:
+                extractor = NarrativeExtractor()
+                parts = []
+                for chunk in llm_scheduler.stream(model, messages, priority):
+                    parts.append(chunk.content)
+                    text = extractor.feed(chunk.content)
+                    if text:
+                        yield {"type": "token", "tier": tier, "text": text}
+                raw = "".join(parts)
+            else:
+                raw = llm_scheduler.invoke(model, messages, priority).content
+            output, failure = _parse_model_output(raw, citations)
+        except LLMSchedulerError:
+            raise   # not sent at all; the strong tier shares the quota, escalating won't help
+        except Exception:
+            if is_last:
+                raise
+            logger.exception("AI %s tier (%s) failed; escalating", tier, model_name)
+            output, failure = {}, "model_error"
+        finally:
+            trace["ai_tier_latency_ms"][tier] = round((time.perf_counter() - started) * 1000, 1)
+
+        trace["ai_tier"], trace["ai_model"] = tier, model_name
+        if is_last:
+            break
+        reasons = _escalation_reasons(output, failure, det_conf)
+        if not reasons:
+            break
+        trace["ai_escalation_reasons"] = reasons
+        yield {"type": "escalated", "from_tier": tier, "to_tier": tiers[position + 1][0], "reasons": reasons}
+
+    yield {"type": "result", "output": output, "trace": trace}
+
+
+# Call the LLM cascade and return (validated structured JSON output, trace for the audit trail)
+def generate_ai_reasoning_with_trace(
+    case_obj: Dict[str, Any],
+    policy_snippets: List[Dict[str, Any]],
+    priority: int = INTERACTIVE,
+    plan: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    for event in _cascade_events(case_obj, policy_snippets, stream=False, priority=priority, plan=plan):
+        if event["type"] == "result":
+            return event["output"], event["trace"]
+    raise RuntimeError("AI cascade ended without a result")
+
+
+# Same cascade, streamed: narrative tokens as they arrive, then the validated result
+def stream_ai_reasoning(
+    case_obj: Dict[str, Any],
+    policy_snippets: List[Dict[str, Any]],
+    priority: int = INTERACTIVE,
+    plan: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    return _cascade_events(case_obj, policy_snippets, stream=True, priority=priority, plan=plan)
+
+
+# Call the LLM and return a validated structured JSON output
+def generate_ai_reasoning(case_obj: Dict[str, Any], policy_snippets: List[Dict[str, Any]], priority: int = INTERACTIVE) -> Dict[str, Any]:
+    output, _ = generate_ai_reasoning_with_trace(case_obj, policy_snippets, priority=priority)
+    return output
@@ -0,0 +1,133 @@
+"""
+One-off migration of case_actions rows written before decisions were normalized:
+- AUTO_ROUTED rows: their extra_data (the AI context) becomes a case_decisions row plus
+  decision_signals rows, and the action keeps only decision_id
+- Analyst rows: the copied AI context is dropped and the row points at the AUTO_ROUTED decision it
+  was copied from (the latest one for the case before the action). If the copy doesn't match that
+  decision, it is kept as its own decision with origin "migrated_copy", which feedback counts for
+  the override but not as an extra case
+Safe to re-run: only rows without a decision_id that still carry AI context are touched.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from .actions import (
+    CaseAction,
+    CaseDecision,
+    DecisionSignal,
+    HUMAN_FIELDS,
+    decision_row_from_context,
+    human_fields,
+)
+
+
+def _add_decision(db: Session, action: CaseAction, context: Dict[str, Any], uid: str, origin: str) -> CaseDecision:
+    decision = CaseDecision(
+        **decision_row_from_context(context),
+        decision_uid=uid,
+        origin=origin,
+        case_id=action.case_id,
+        account_id=action.account_id,
+        created_at=action.created_at,
+    )
+    db.add(decision)
+    db.flush()   # assigns decision.id
+    for position, name in enumerate(context.get("fired_signals") or []):
+        db.add(DecisionSignal(decision_id=decision.id, signal_name=name, position=position))
+    db.flush()
+    return decision
+
+
+# The decision an analyst row's AI context was copied from: latest AUTO_ROUTED for the case before it
+def _source_decision(db: Session, action: CaseAction) -> Optional[CaseDecision]:
+    return (
+        db.query(CaseDecision)
+        .join(CaseAction, CaseAction.decision_id == CaseDecision.id)
+        .filter(CaseAction.case_id == action.case_id)
+        .filter(CaseAction.action == "AUTO_ROUTED")
+        .filter(CaseAction.id < action.id)
+        .order_by(CaseAction.id.desc())
+        .first()
+    )
+
+
+def _signals(db: Session, decision_id: int) -> List[str]:
+    return [
+        name for (name,) in
+        db.query(DecisionSignal.signal_name)
+        .filter(DecisionSignal.decision_id == decision_id)
+        .order_by(DecisionSignal.position)
+    ]
+
+
+# Returns counts of migrated rows: {"decisions", "linked_actions", "copied_decisions"}
+def migrate_case_actions(db: Session, batch_size: int = 1000) -> Dict[str, int]:
+    counts = {"decisions": 0, "linked_actions": 0, "copied_decisions": 0}
+
+    # ---- AUTO_ROUTED rows, oldest first (keeps decision_signals in first-seen order) ----
+    last_id = 0
+    while True:
+        batch = (
+            db.query(CaseAction)
+            .filter(CaseAction.action == "AUTO_ROUTED")
+            .filter(CaseAction.decision_id.is_(None))
+            .filter(CaseAction.id > last_id)
+            .order_by(CaseAction.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for action in batch:
+            uid = action.audit_uid or f"legacy-{action.id}"
+            decision = _add_decision(db, action, action.extra_data or {}, uid, "ai_decision")
+            action.audit_uid = uid
+            action.decision_id = decision.id
+            action.extra_data = None
+            counts["decisions"] += 1
+        last_id = batch[-1].id
+        db.commit()
+
+    # ---- Analyst rows still carrying a copy of the AI context ----
+    carries_ai_context = or_(
+        func.json_extract(CaseAction.extra_data, "$.fired_signals").isnot(None),
+        func.json_extract(CaseAction.extra_data, "$.ai_routed_path").isnot(None),
+    )
+    last_id = 0
+    while True:
+        batch = (
+            db.query(CaseAction)
+            .filter(CaseAction.action != "AUTO_ROUTED")
+            .filter(CaseAction.decision_id.is_(None))
+            .filter(carries_ai_context)
+            .filter(CaseAction.id > last_id)
+            .order_by(CaseAction.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for action in batch:
+            extra = action.extra_data or {}
+            ai_context = {k: v for k, v in extra.items() if k not in HUMAN_FIELDS}
+
+            source = _source_decision(db, action)
+            if (
+                source is not None
+                and source.routed_path == ai_context.get("ai_routed_path")
+                and _signals(db, source.id) == list(ai_context.get("fired_signals") or [])
+            ):
+                action.decision_id = source.id
+            else:
+                copy = _add_decision(db, action, ai_context, f"migrated-{action.id}", "migrated_copy")
+                action.decision_id = copy.id
+                counts["copied_decisions"] += 1
+            action.extra_data = human_fields(extra)
+            counts["linked_actions"] += 1
+        last_id = batch[-1].id
+        db.commit()
+
+    return counts
@@ -0,0 +1,476 @@
+"""
+Asynchronous, batched audit-log writer for CaseAction records.
+Instead of a synchronous INSERT + COMMIT per /ai_decision and /cases/actions:
+- Each record is appended to a local write-ahead log (JSON lines, fsynced) and acknowledged
+- A background thread flushes pending records to case_actions in grouped transactions
+- A checkpoint file records how much of the WAL is committed; on restart the rest is replayed
+- Every record has a unique audit_uid, so replaying a record that did commit is a no-op
+- AUTO_ROUTED records carry their AI decision, written to case_decisions in the same transaction;
+  analyst records reference it by decision_uid (resolved to case_decisions.id at flush time)
+- Reads of the latest AUTO_ROUTED decision (per case or per account) check records still waiting
+  to be flushed first
+Each process writes its own WAL file (locked while the process is alive), so at startup only
+WALs left behind by dead processes are replayed. WAL names are unique per start (pid + random
+suffix): a container restarts with the same pid, and must never reuse a WAL that still holds
+records it couldn't replay.
+A batch that fails for any reason other than the database being unavailable is retried one record
+at a time. A record that still fails (constraint violation, unserializable value, ...) goes to the
+dead-letter file (AUDIT_DEAD_LETTER_FILE in the WAL directory) with its error, so it can't hold up
+the records behind it.
+AUDIT_WRITER_MODE=sync keeps the old behaviour (row added to the caller's transaction).
+Read-your-writes covers this process's buffer only: with several API workers, an AUTO_ROUTED
+record buffered by another worker isn't visible to /cases/actions here until it is flushed. Set
+AUDIT_SYNC_DECISIONS=1 to write AUTO_ROUTED records in the request transaction (analyst actions
+stay batched), so every worker sees a decision as soon as /ai_decision returns.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from .actions import CaseAction, CaseDecision, DecisionSignal, decision_context, decision_row_from_context
+
+try:
+    import fcntl   # POSIX only; without it (Windows) run one writer process per WAL directory
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# async | sync
+AUDIT_WRITER_MODE = os.getenv("AUDIT_WRITER_MODE", "async").lower()
+AUDIT_WAL_DIR = Path(os.getenv("AUDIT_WAL_DIR", str(REPO_ROOT / "db" / "audit_wal")))
+
+# Flush whenever this many records are pending, or at least this often
+AUDIT_FLUSH_BATCH_SIZE = int(os.getenv("AUDIT_FLUSH_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "0.2"))
+
+# fsync each append before acknowledging (off = faster, but a power loss can drop acked records)
+AUDIT_WAL_FSYNC = os.getenv("AUDIT_WAL_FSYNC", "1") == "1"
+
+# Truncate the WAL once everything in it is committed and it has grown past this
+AUDIT_WAL_COMPACT_BYTES = int(os.getenv("AUDIT_WAL_COMPACT_BYTES", str(16 * 1024 * 1024)))
+
+# Write AUTO_ROUTED records synchronously (needed for read-your-writes across API workers)
+AUDIT_SYNC_DECISIONS = os.getenv("AUDIT_SYNC_DECISIONS", "0") == "1"
+
+# Records that can't be inserted on their own (JSON lines: record, error, failed_at)
+AUDIT_DEAD_LETTER_FILE = os.getenv("AUDIT_DEAD_LETTER_FILE", "audit-deadletter.jsonl")
+
+
+def _try_lock(f) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+# Older WAL records carried the whole AI context in an AUTO_ROUTED row's extra_data
+def _normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    if record.get("action") == "AUTO_ROUTED" and "decision" not in record and record.get("extra_data"):
+        return {**record, "decision": record["extra_data"], "extra_data": None}
+    return record
+
+
+# Insert records that aren't in case_actions yet (matched on audit_uid), in one transaction.
+# An AUTO_ROUTED record's decision goes to case_decisions (+ decision_signals) under its audit_uid;
+# analyst records point at a decision by decision_uid, resolved to case_decisions.id here.
+def _insert_records(db: Session, records: List[Dict[str, Any]], commit: bool = True) -> int:
+    if not records:
+        return 0
+    uids = [r["audit_uid"] for r in records]
+    existing = {uid for (uid,) in db.query(CaseAction.audit_uid).filter(CaseAction.audit_uid.in_(uids))}
+    new = [_normalize_record(r) for r in records if r["audit_uid"] not in existing]
+
+    decision_ids: Dict[str, int] = {}
+    with_decision = [r for r in new if r.get("decision") is not None]
+    if with_decision:
+        db.execute(insert(CaseDecision), [
+            {
+                **decision_row_from_context(r["decision"]),
+                "decision_uid": r["audit_uid"],
+                "origin": "ai_decision",
+                "case_id": r["case_id"],
+                "account_id": r["account_id"],
+                "created_at": datetime.fromisoformat(r["created_at"]),
+            }
+            for r in with_decision
+        ])
+
+    wanted = {r["audit_uid"] for r in with_decision} | {r["decision_uid"] for r in new if r.get("decision_uid")}
+    if wanted:
+        decision_ids = dict(
+            db.query(CaseDecision.decision_uid, CaseDecision.id).filter(CaseDecision.decision_uid.in_(wanted))
+        )
+
+    signal_rows = [
+        {
+            "decision_id": decision_ids[r["audit_uid"]],
+            "signal_name": name,
+            "position": position,
+            "hits": (r["decision"].get("signal_counts") or {}).get(name),
+        }
+        for r in with_decision
+        for position, name in enumerate(r["decision"].get("fired_signals") or [])
+    ]
+    if signal_rows:
+        db.execute(insert(DecisionSignal), signal_rows)
+
+    rows = [
+        {
+            "audit_uid": r["audit_uid"],
+            "case_id": r["case_id"],
+            "account_id": r["account_id"],
+            "action": r["action"],
+            "reason": r["reason"],
+            "created_at": datetime.fromisoformat(r["created_at"]),
+            "extra_data": r.get("extra_data"),
+            "decision_id": decision_ids.get(r["audit_uid"] if r.get("decision") is not None else r.get("decision_uid")),
+        }
+        for r in new
+    ]
+    if rows:
+        db.execute(insert(CaseAction), rows)
+    if commit:
+        db.commit()
+    return len(rows)
+
+
+# Records after the checkpoint offset. A torn last line (crash mid-append) is skipped.
+def _read_wal(wal_path: Path, offset: int) -> List[Dict[str, Any]]:
+    records = []
+    with open(wal_path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning("Skipping unreadable audit WAL line in %s", wal_path)
+    return records
+
+
+def _read_checkpoint(path: Path) -> int:
+    try:
+        return int(json.loads(path.read_text(encoding="utf-8")).get("offset", 0))
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_checkpoint(path: Path, offset: int) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"offset": offset}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        wal_dir: Path = AUDIT_WAL_DIR,
+        mode: str = AUDIT_WRITER_MODE,
+        batch_size: int = AUDIT_FLUSH_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+        fsync: bool = AUDIT_WAL_FSYNC,
+    ):
+        self.wal_dir = wal_dir
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._wal = None
+        self._wal_path: Optional[Path] = None
+        self._checkpoint_path: Optional[Path] = None
+        self._pending: List[Tuple[Dict[str, Any], int]] = []   # (record, WAL offset after it)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.flush_errors = 0
+        self.dead_lettered = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # Replay WALs left by dead processes, open this process's WAL, start the flusher
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        self._session_factory = session_factory
+        if self.mode != "async" or self.running:
+            return
+        self.wal_dir.mkdir(parents=True, exist_ok=True)
+        self.recover()
+
+        self._wal_path = self.wal_dir / f"audit-{os.getpid()}-{uuid.uuid4().hex[:8]}.wal"
+        self._checkpoint_path = self._wal_path.with_suffix(".ckpt")
+        self._wal = open(self._wal_path, "xb")   # always a new, empty file
+        _try_lock(self._wal)
+        _write_checkpoint(self._checkpoint_path, 0)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    # Flush what's pending and close the WAL. It is deleted when everything committed;
+    # otherwise (DB unreachable) it stays for the next start to replay.
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+        with self._lock:
+            self._wal.close()
+            self._wal = None
+            if not self._pending:
+                self._wal_path.unlink(missing_ok=True)
+                self._checkpoint_path.unlink(missing_ok=True)
+
+    # Replay every WAL in the directory whose owner is gone; returns records inserted
+    def recover(self) -> int:
+        inserted = 0
+        for wal_path in sorted(self.wal_dir.glob("audit-*.wal")):
+            checkpoint_path = wal_path.with_suffix(".ckpt")
+            with open(wal_path, "ab") as f:
+                if not _try_lock(f):
+                    continue   # a live process owns it
+                records = _read_wal(wal_path, _read_checkpoint(checkpoint_path))
+                done, dead = self._commit_records(records)
+                inserted += done - dead
+                if done < len(records):
+                    logger.warning("Database unavailable; keeping %s to replay on the next start", wal_path.name)
+                    continue
+            try:
+                wal_path.unlink()
+                checkpoint_path.unlink(missing_ok=True)
+            except OSError:
+                continue   # still open in another process (no fcntl); its rows are in anyway
+            if records:
+                logger.info("Recovered %d audit records from %s", len(records), wal_path.name)
+        return inserted
+
+    # Record an audit action. Returns its audit_uid.
+    # async: durable in the WAL on return, in case_actions within ~flush_interval.
+    # sync (or writer not running, or an AUTO_ROUTED record with AUDIT_SYNC_DECISIONS): added to
+    # db, committed with the caller's transaction.
+    def submit(
+        self,
+        db: Session,
+        case_id: str,
+        account_id: str,
+        action: str,
+        reason: Optional[str] = None,
+        extra_data: Optional[Dict[str, Any]] = None,
+        decision: Optional[Dict[str, Any]] = None,
+        decision_uid: Optional[str] = None,
+    ) -> str:
+        # decision: the AI context of an AUTO_ROUTED action (stored in case_decisions)
+        # decision_uid: the decision an analyst action is about (from latest_auto_routed)
+        record = {
+            "audit_uid": uuid.uuid4().hex,
+            "case_id": case_id,
+            "account_id": account_id,
+            "action": action,
+            "reason": reason,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "extra_data": extra_data,
+            "decision": decision,
+            "decision_uid": decision_uid,
+        }
+
+        if self.mode != "async" or not self.running or (action == "AUTO_ROUTED" and AUDIT_SYNC_DECISIONS):
+            _insert_records(db, [record], commit=False)
+            return record["audit_uid"]
+
+        line = json.dumps(record, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        with self._lock:
+            self._wal.write(line)
+            self._wal.flush()
+            if self.fsync:
+                os.fsync(self._wal.fileno())
+            self._pending.append((record, self._wal.tell()))
+            queued = len(self._pending)
+        if queued >= self.batch_size:
+            self._wake.set()
+        return record["audit_uid"]
+
+    # case_actions.id of a record, or None while it is still buffered
+    def action_id(self, db: Session, audit_uid: str) -> Optional[int]:
+        row = db.query(CaseAction.id).filter(CaseAction.audit_uid == audit_uid).first()
+        return row[0] if row else None
+
+    # (decision_uid, AI context) of the newest AUTO_ROUTED action for a case, including ones not
+    # flushed yet. Pending records are checked first: they only leave the buffer after their commit.
+    # Other processes' buffers aren't visible (see AUDIT_SYNC_DECISIONS).
+    def latest_auto_routed(self, db: Session, case_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            for record, _ in reversed(self._pending):
+                if record["case_id"] == case_id and record["action"] == "AUTO_ROUTED":
+                    return record["audit_uid"], record.get("decision") or {}
+
+        decision = (
+            db.query(CaseDecision)
+            .join(CaseAction, CaseAction.decision_id == CaseDecision.id)
+            .filter(CaseAction.case_id == case_id)
+            .filter(CaseAction.action == "AUTO_ROUTED")
+            .order_by(CaseAction.created_at.desc(), CaseAction.id.desc())
+            .first()
+        )
+        if decision is None:
+            return None
+        signals = [
+            name for (name,) in
+            db.query(DecisionSignal.signal_name)
+            .filter(DecisionSignal.decision_id == decision.id)
+            .order_by(DecisionSignal.position)
+        ]
+        return decision.decision_uid, decision_context(decision, signals)
+
+    # (decision_uid, decided_at, AI context) of the account's newest AI decision, across case
+    # versions, pending records first. Used to re-decide a case incrementally (app.redecision).
+    def latest_decision_for_account(self, db: Session, account_id: str) -> Optional[Tuple[str, datetime, Dict[str, Any]]]:
+        with self._lock:
+            for record, _ in reversed(self._pending):
+                if record["account_id"] == account_id and record.get("decision") is not None:
+                    return record["audit_uid"], datetime.fromisoformat(record["created_at"]), record["decision"]
+
+        decision = (
+            db.query(CaseDecision)
+            .filter(CaseDecision.account_id == account_id)
+            .filter(CaseDecision.origin == "ai_decision")
+            .order_by(CaseDecision.id.desc())
+            .first()
+        )
+        if decision is None:
+            return None
+        signals = [
+            name for (name,) in
+            db.query(DecisionSignal.signal_name)
+            .filter(DecisionSignal.decision_id == decision.id)
+            .order_by(DecisionSignal.position)
+        ]
+        return decision.decision_uid, decision.created_at, decision_context(decision, signals)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "pending": pending,
+            "flushed": self.flushed,
+            "flush_errors": self.flush_errors,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            while self._flush_batch():
+                pass   # drain everything that is pending, one grouped transaction per batch
+            if stopping:
+                return
+
+    # Commit up to batch_size pending records; True if a full batch went out (more may be waiting)
+    def _flush_batch(self) -> bool:
+        with self._lock:
+            batch = self._pending[:self.batch_size]
+        if not batch:
+            return False
+
+        done, dead = self._commit_records([record for record, _ in batch])
+        if not done:
+            return False
+
+        with self._lock:
+            del self._pending[:done]
+            self.flushed += done - dead
+            _write_checkpoint(self._checkpoint_path, batch[done - 1][1])
+
+            # Everything committed: start the WAL over once it's big
+            if not self._pending and self._wal.tell() >= AUDIT_WAL_COMPACT_BYTES:
+                self._wal.truncate(0)
+                self._wal.seek(0)
+                _write_checkpoint(self._checkpoint_path, 0)
+        return done == self.batch_size
+
+    # Insert records in one transaction, falling back to one at a time if that fails.
+    # Returns (records done, of which dead-lettered); done counts from the front of `records`
+    # and stops at the first record that failed because the database is unavailable.
+    def _commit_records(self, records: List[Dict[str, Any]]) -> Tuple[int, int]:
+        if not records:
+            return 0, 0
+        db = self._session_factory()
+        try:
+            _insert_records(db, records)
+            return len(records), 0
+        except OperationalError:
+            db.rollback()
+            self.flush_errors += 1
+            logger.exception("Audit flush of %d records failed; will retry", len(records))
+            return 0, 0
+        except Exception:
+            db.rollback()
+            self.flush_errors += 1
+            logger.exception("Audit flush of %d records failed; retrying them one at a time", len(records))
+        finally:
+            db.close()
+
+        done = dead = 0
+        for record in records:
+            db = self._session_factory()
+            try:
+                _insert_records(db, [record])
+            except OperationalError:
+                db.rollback()
+                logger.exception("Audit record %s not written; will retry", record.get("audit_uid"))
+                break
+            except Exception as exc:
+                db.rollback()
+                self._dead_letter(record, exc)
+                dead += 1
+            finally:
+                db.close()
+            done += 1
+        return done, dead
+
+    # Durably park a record that can't be inserted; the WAL checkpoint moves past it afterwards
+    def _dead_letter(self, record: Dict[str, Any], exc: Exception) -> None:
+        entry = {
+            "record": record,
+            "error": f"{type(exc).__name__}: {exc}",
+            "failed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        line = json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        self.wal_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.wal_dir / AUDIT_DEAD_LETTER_FILE, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.dead_lettered += 1
+        logger.error(
+            "Audit record %s (%s on %s) moved to %s: %s",
+            record.get("audit_uid"), record.get("action"), record.get("case_id"), AUDIT_DEAD_LETTER_FILE, entry["error"],
+        )
+
+
+# Process-wide writer used by the API
+audit_writer = AuditWriter()
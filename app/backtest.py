@@ -0,0 +1,356 @@
+"""
+Backtests signal weights, band thresholds and the confidence floor against historical AI decisions
+and analyst outcomes.
+- Loads every AI decision (signal hit counts, the AI's proposed path and confidence, the path it was
+  routed to, where the analyst finally sent it) into NumPy arrays, collapsed to distinct rows with a
+  multiplicity, and keeps them until new decisions or actions arrive
+- Scores thousands of candidate configs as matrix operations: bands from distinct signal vectors @
+  weights.T, then the guardrails as one "forced to REVIEW" matrix over (vector, proposal, confidence
+  bucket) groups x configs, and every metric as a product with that matrix
+- The AI's proposal and confidence are taken as given (the model isn't re-run); a config changes the
+  routed path through the guardrails (confidence floor, HIGH band never MONITOR)
+"""
+
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.orm import Session
+
+from .actions import CaseAction, CaseDecision, DecisionSignal
+from .feedback_schemas import BacktestConfig, BacktestOut, BacktestRequest, BacktestResult
+from .risk import LOW_MAX, MEDIUM_MAX, current_signal_weights
+from .router import CONFIDENCE_FLOOR
+
+PATHS = ["MONITOR", "REQUEST_INFO", "REVIEW", "ESCALATE"]
+PATH_CODE = {p: i for i, p in enumerate(PATHS)}
+MONITOR, REVIEW = PATH_CODE["MONITOR"], PATH_CODE["REVIEW"]
+UNKNOWN_PATH = len(PATHS)           # outcome/historical path we can't map (e.g. override without a target)
+NOT_REVIEWED = -1
+BANDS = ["LOW", "MEDIUM", "HIGH"]
+UNKNOWN_SIGNAL_WEIGHT = 5           # same default as risk.score_signals
+
+BACKTEST_MAX_CONFIGS = int(os.getenv("BACKTEST_MAX_CONFIGS", "50000"))
+BACKTEST_CHUNK_CELLS = int(os.getenv("BACKTEST_CHUNK_CELLS", "4000000"))   # rows x configs per matrix step
+
+
+# ---------- loading ----------
+
+class CaseMatrix:
+    """
+    Historical AI decisions as arrays, one entry per distinct (signal vector, AI proposal, AI
+    confidence, routed path, analyst outcome) with its multiplicity in `count`.
+    Signal hit vectors are stored once in `vectors` (columns follow `signal_names`); rows point at them.
+    """
+
+    def __init__(self, signal_names: List[str], vectors: np.ndarray, vec_idx: np.ndarray, proposed: np.ndarray,
+                 confidence: np.ndarray, routed: np.ndarray, outcome: np.ndarray, count: np.ndarray):
+        self.signal_names = signal_names
+        self.vectors = vectors
+        self.vec_idx = vec_idx
+        self.proposed = proposed
+        self.confidence = confidence
+        self.routed = routed
+        self.outcome = outcome
+        self.count = count
+
+
+# Path name -> code, mapped inside SQLite so rows arrive as plain numbers
+def _path_code(column, default: int):
+    return case(PATH_CODE, value=column, else_=default)
+
+
+# All-numeric rows of a select as a float64 matrix, streamed from the DBAPI cursor straight into
+# NumPy (SQLAlchemy Row objects cost more than the query itself at a million rows)
+def _fetch_matrix(db: Session, stmt, n_columns: int) -> np.ndarray:
+    compiled = stmt.compile(dialect=db.get_bind().dialect)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(str(compiled), [compiled.params[name] for name in compiled.positiontup or []])
+        flat = np.fromiter(itertools.chain.from_iterable(cursor), dtype=np.float64)
+    finally:
+        cursor.close()
+    return flat.reshape(-1, n_columns)
+
+
+# Distinct rows of a small non-negative int matrix: (unique rows, row -> unique index, multiplicities).
+# Rows are packed into one int64 key (mixed radix) so this is a 1-D unique, not a slow axis=0 one.
+def _distinct_rows(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ints = matrix.astype(np.int64)
+    if not len(ints):
+        return ints, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    radix = ints.max(axis=0) + 1
+    if float(np.prod(radix.astype(np.float64))) >= 2 ** 62:   # doesn't fit: slow path
+        unique, inverse, counts = np.unique(ints, axis=0, return_inverse=True, return_counts=True)
+        return unique, inverse.reshape(-1), counts
+    key = np.zeros(len(ints), dtype=np.int64)
+    for j in range(ints.shape[1]):
+        key = key * radix[j] + ints[:, j]
+    _, first, inverse, counts = np.unique(key, return_index=True, return_inverse=True, return_counts=True)
+    return ints[first], inverse.reshape(-1), counts
+
+
+# Each query is a plain indexed scan; joining, "latest action wins" and dedup happen in numpy
+# (a SQL GROUP BY over a million joined rows is several times slower on SQLite).
+def load_cases(db: Session) -> CaseMatrix:
+    decisions = _fetch_matrix(db, (
+        select(
+            CaseDecision.id,
+            _path_code(CaseDecision.workflow_path, REVIEW),          # apply_guardrails defaults to REVIEW
+            func.coalesce(CaseDecision.ai_confidence, 0.0),
+            _path_code(CaseDecision.routed_path, UNKNOWN_PATH),
+        )
+        .where(CaseDecision.origin == "ai_decision")   # migrated copies duplicate a decision already counted
+        .order_by(CaseDecision.id)
+    ), 4)
+    ids = decisions[:, 0].astype(np.int64)
+    proposed, confidence, routed = decisions[:, 1].astype(np.int64), decisions[:, 2], decisions[:, 3].astype(np.int64)
+
+    def locate(decision_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(ids):
+            return decision_ids[:0].astype(np.int64), np.zeros(len(decision_ids), dtype=bool)
+        pos = np.minimum(np.searchsorted(ids, decision_ids), len(ids) - 1)
+        found = ids[pos] == decision_ids
+        return pos[found], found
+
+    # ---- signal hit counts (legacy rows without counts count once) ----
+    signal_names = sorted(n for (n,) in db.execute(select(DecisionSignal.signal_name).distinct()) if n is not None)
+    signals = _fetch_matrix(db, select(
+        DecisionSignal.decision_id,
+        case({n: i for i, n in enumerate(signal_names)}, value=DecisionSignal.signal_name, else_=-1)
+        if signal_names else literal(-1),   # a CASE needs at least one WHEN
+        func.coalesce(DecisionSignal.hits, 1),
+    ).where(DecisionSignal.signal_name.isnot(None)), 3)
+    hits = np.zeros((len(ids), len(signal_names)), dtype=np.float32)
+    pos, found = locate(signals[:, 0].astype(np.int64))
+    np.add.at(hits, (pos, signals[found, 1].astype(np.int64)), signals[found, 2])
+
+    # ---- analyst outcome: where the latest analyst action on the decision sent the case ----
+    final_path = func.json_extract(CaseAction.extra_data, "$.human_final_path")
+    actions = _fetch_matrix(db, (
+        select(
+            CaseAction.decision_id,
+            case(
+                (CaseAction.action == "APPROVE", -2),                      # keeps the routed path (filled in below)
+                (CaseAction.action == "OVERRIDE", _path_code(final_path, UNKNOWN_PATH)),
+                else_=_path_code(CaseAction.action, UNKNOWN_PATH),
+            ),
+        )
+        .where(CaseAction.action != "AUTO_ROUTED")
+        .where(CaseAction.decision_id.isnot(None))
+        .order_by(CaseAction.id)
+    ), 2)
+    outcome = np.full(len(ids), NOT_REVIEWED, dtype=np.int64)
+    pos, found = locate(actions[:, 0].astype(np.int64))
+    if len(pos):
+        codes = actions[found, 1].astype(np.int64)
+        last = len(pos) - 1 - np.unique(pos[::-1], return_index=True)[1]   # latest action per decision
+        outcome[pos[last]] = codes[last]
+        outcome = np.where(outcome == -2, routed, outcome)
+
+    # ---- collapse identical cases ----
+    vectors, vec_idx, _ = _distinct_rows(hits)
+    conf_values, conf_idx = np.unique(confidence, return_inverse=True)
+    rows, _, count = _distinct_rows(np.column_stack([vec_idx, proposed, conf_idx.reshape(-1), routed, outcome + 1]))
+    return CaseMatrix(
+        signal_names=signal_names,
+        vectors=vectors.astype(np.float32).reshape(len(vectors), len(signal_names)),
+        vec_idx=rows[:, 0],
+        proposed=rows[:, 1],
+        confidence=conf_values[rows[:, 2]],
+        routed=rows[:, 3],
+        outcome=rows[:, 4] - 1,
+        count=count.astype(np.float64),
+    )
+
+
+# The loaded history is reused until a decision or analyst action is added
+_cache_lock = threading.Lock()
+_cache: Dict[str, Any] = {"version": None, "cases": None}
+
+
+def cached_cases(db: Session) -> CaseMatrix:
+    version = (db.query(func.max(CaseDecision.id)).scalar(), db.query(func.max(CaseAction.id)).scalar())
+    with _cache_lock:
+        if _cache["version"] != version or _cache["cases"] is None:
+            _cache["cases"] = load_cases(db)
+            _cache["version"] = version
+        return _cache["cases"]
+
+
+# ---------- candidate configs ----------
+
+def _baseline() -> Dict[str, Any]:
+    return {
+        "weights": dict(current_signal_weights()),
+        "low_max": LOW_MAX,
+        "medium_max": MEDIUM_MAX,
+        "confidence_floor": CONFIDENCE_FLOOR,
+    }
+
+
+# Grid product of the requested values plus random perturbations of the baseline (baseline first)
+def candidate_configs(request: BacktestRequest) -> List[Dict[str, Any]]:
+    base = _baseline()
+    configs = [base]
+
+    grid_signals = sorted(request.weights)
+    axes = (
+        [request.weights[s] or [base["weights"].get(s, UNKNOWN_SIGNAL_WEIGHT)] for s in grid_signals]
+        + [request.low_max or [base["low_max"]], request.medium_max or [base["medium_max"]],
+           request.confidence_floor or [base["confidence_floor"]]]
+    )
+    grid_size = 1
+    for values in axes:
+        grid_size *= len(values)
+    if grid_size + request.random_samples > BACKTEST_MAX_CONFIGS:
+        raise ValueError(f"{grid_size + request.random_samples} configs requested; the limit is {BACKTEST_MAX_CONFIGS}")
+
+    if grid_signals or request.low_max or request.medium_max or request.confidence_floor:
+        for combo in itertools.product(*axes):
+            weights = {**base["weights"], **dict(zip(grid_signals, combo[:len(grid_signals)]))}
+            low, medium, floor = combo[len(grid_signals):]
+            configs.append({"weights": weights, "low_max": low, "medium_max": medium, "confidence_floor": floor})
+
+    rng = np.random.default_rng(request.seed)
+    for _ in range(request.random_samples):
+        configs.append({
+            "weights": {s: int(round(w * rng.uniform(0.5, 1.5))) for s, w in base["weights"].items()},
+            "low_max": base["low_max"] + int(rng.integers(-10, 11)),
+            "medium_max": base["medium_max"] + int(rng.integers(-10, 11)),
+            "confidence_floor": round(float(base["confidence_floor"] + rng.uniform(-0.1, 0.1)), 2),
+        })
+
+    return [c for c in configs if c["low_max"] < c["medium_max"]]
+
+
+# ---------- scoring ----------
+
+# Metrics for every config, as arrays over configs.
+# The guardrails only ever keep the AI's proposal or force REVIEW, so with R[g, j] = "group g is forced
+# to REVIEW under config j" every metric is (mass per group) @ R or @ (1 - R): two matrix products.
+def evaluate(cases: CaseMatrix, configs: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    n_paths, n_hist = len(PATHS), len(PATHS) + 1          # historical path can also be UNKNOWN
+    weights = np.array(
+        [[c["weights"].get(s, UNKNOWN_SIGNAL_WEIGHT) for s in cases.signal_names] for c in configs], dtype=np.float32
+    ).reshape(len(configs), len(cases.signal_names))
+    low = np.array([c["low_max"] for c in configs], dtype=np.float32)
+    medium = np.array([c["medium_max"] for c in configs], dtype=np.float32)
+    floor = np.array([c["confidence_floor"] for c in configs], dtype=np.float64)
+
+    # Bands only depend on the signal vector: score the distinct vectors, not the cases
+    scores = cases.vectors @ weights.T                                             # vectors x configs
+    band = (scores > low).astype(np.int8) + (scores > medium)                      # 0 LOW, 1 MEDIUM, 2 HIGH
+    vector_mass = np.bincount(cases.vec_idx, weights=cases.count, minlength=len(cases.vectors))
+    bands = np.stack([vector_mass @ (band == b) for b in range(len(BANDS))], axis=1)
+
+    # Confidence only matters relative to the floors being tried: bucket it, then regroup by
+    # (vector, proposal, bucket). conf < floors[i]  <=>  i >= bucket
+    floors = np.unique(floor)
+    floor_idx = np.searchsorted(floors, floor)
+    bucket = np.searchsorted(floors, cases.confidence, side="right")
+    groups, g = np.unique(np.stack([cases.vec_idx, cases.proposed, bucket], axis=1), axis=0, return_inverse=True)
+    g = g.reshape(-1)
+    g_vec, g_proposed, g_bucket = groups[:, 0], groups[:, 1], groups[:, 2]
+
+    mass_hist = np.zeros((len(groups), n_hist))                                    # by historical routed path
+    np.add.at(mass_hist, (g, cases.routed), cases.count)
+    mass_outcome = np.zeros((len(groups), n_hist))                                 # reviewed cases by analyst path
+    reviewed = cases.outcome != NOT_REVIEWED
+    np.add.at(mass_outcome, (g[reviewed], cases.outcome[reviewed]), cases.count[reviewed])
+    rows = np.arange(len(groups))
+
+    # Columns weighted by R (routed to REVIEW) and by 1 - R (kept the proposal)
+    to_review = np.column_stack(
+        [mass_hist.sum(axis=1), mass_outcome[:, REVIEW], mass_hist[:, REVIEW]] + [mass_hist[:, h] for h in range(n_hist)]
+    )
+    kept_paths = [p for p in range(n_paths) if p != REVIEW]
+    kept = np.column_stack(
+        [mass_hist.sum(axis=1) * (g_proposed == p) for p in kept_paths]
+        + [mass_outcome[rows, g_proposed], mass_hist[rows, g_proposed]]
+        + [mass_hist[:, h] * (g_proposed == p) for p in kept_paths for h in range(n_hist)]
+    )
+
+    n_configs = len(configs)
+    review_sums = np.zeros((to_review.shape[1], n_configs))
+    kept_sums = np.zeros((kept.shape[1], n_configs))
+    step = max(1, BACKTEST_CHUNK_CELLS // max(len(groups), 1))
+    for start in range(0, n_configs, step):
+        sl = slice(start, min(start + step, n_configs))
+        forced = (floor_idx[sl] >= g_bucket[:, None]) | (g_proposed == REVIEW)[:, None]          # low confidence
+        forced |= (g_proposed == MONITOR)[:, None] & (band[g_vec, sl] == 2)                     # HIGH band never MONITOR
+        forced = forced.astype(np.float32)
+        review_sums[:, sl] = to_review.T.astype(np.float32) @ forced
+        kept_sums[:, sl] = kept.T.astype(np.float32) @ (1.0 - forced)
+
+    total, total_reviewed = cases.count.sum(), cases.count[reviewed].sum()
+    n_kept = len(kept_paths)
+    routed = np.zeros((n_configs, n_paths))
+    routed[:, REVIEW] = review_sums[0]
+    for i, p in enumerate(kept_paths):
+        routed[:, p] = kept_sums[i]
+    agreed = review_sums[1] + kept_sums[n_kept]            # reviewed cases where the new route is the analyst's path
+    unchanged = review_sums[2] + kept_sums[n_kept + 1]     # cases routed where they were actually routed
+
+    transitions = np.zeros((n_configs, n_hist, n_paths))   # historical path x new path
+    transitions[:, :, REVIEW] = review_sums[3:3 + n_hist].T
+    for i, p in enumerate(kept_paths):
+        transitions[:, :, p] = kept_sums[n_kept + 2 + i * n_hist:n_kept + 2 + (i + 1) * n_hist].T
+    for p in range(n_paths):
+        transitions[:, p, p] = 0                           # changed routes only
+
+    return {
+        "bands": bands,
+        "routed": routed,
+        "overrides": total_reviewed - agreed,
+        "changes": total - unchanged,
+        "transitions": transitions.reshape(n_configs, -1),
+    }
+
+
+def _result(configs, metrics, i: int, total: float, reviewed: float, baseline_rate: float) -> BacktestResult:
+    rate = round(metrics["overrides"][i] / reviewed * 100, 2) if reviewed else 0.0
+    transitions = {}
+    for cell in np.flatnonzero(metrics["transitions"][i]):
+        old, new = divmod(int(cell), len(PATHS))
+        old_name = PATHS[old] if old < len(PATHS) else "UNKNOWN"
+        transitions[f"{old_name}→{PATHS[new]}"] = int(metrics["transitions"][i][cell])
+    return BacktestResult(
+        config=BacktestConfig(**configs[i]),
+        band_distribution={b: int(metrics["bands"][i][j]) for j, b in enumerate(BANDS)},
+        routed_distribution={p: int(metrics["routed"][i][j]) for j, p in enumerate(PATHS)},
+        predicted_override_rate_pct=rate,
+        override_rate_change_pct=round(rate - baseline_rate, 2),
+        routing_changes=int(metrics["changes"][i]),
+        routing_change_pct=round(metrics["changes"][i] / total * 100, 2) if total else 0.0,
+        routing_transitions=dict(sorted(transitions.items(), key=lambda kv: kv[1], reverse=True)),
+    )
+
+
+def run_backtest(db: Session, request: BacktestRequest) -> BacktestOut:
+    started = time.perf_counter()
+    configs = candidate_configs(request)
+    cases = cached_cases(db)
+    if not len(cases.count):
+        raise ValueError("No AI decisions recorded yet; nothing to backtest against")
+    metrics = evaluate(cases, configs)
+
+    total = float(cases.count.sum())
+    reviewed = float(cases.count[cases.outcome != NOT_REVIEWED].sum())
+    baseline_rate = round(metrics["overrides"][0] / reviewed * 100, 2) if reviewed else 0.0
+    # lowest predicted override rate first; fewer routing changes breaks ties
+    order = np.lexsort((metrics["changes"][1:], metrics["overrides"][1:])) + 1
+
+    return BacktestOut(
+        cases=int(total),
+        reviewed_cases=int(reviewed),
+        unique_case_vectors=len(cases.count),
+        configs_evaluated=len(configs),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        baseline=_result(configs, metrics, 0, total, reviewed, baseline_rate),
+        results=[_result(configs, metrics, int(i), total, reviewed, baseline_rate) for i in order[:request.top_k]],
+    )
@@ -1,59 +1,345 @@
 """
-This builds an on-demand case that:
+This builds a persisted, versioned case that:
 - Replace alerts with cohesive investigation-ready cases.
 - Sums up timeline, signals, and risk into one structured object.
 - Prepare clean input for AI reasoning
+- Stores a snapshot (content hash + version) in the `cases` table so repeat reads are served
+  directly and audit rows can be joined back to the exact case content.
+- Rebuilds incrementally: only new events are fetched and appended to the timeline, then the
+  signals and risk are re-run in memory.
+- Is also rebuilt when other accounts start or stop sharing one of the account's devices or
+  payees (the links marker from app.entity_links), since that changes the cross-account signals.
+  Otherwise only the devices / payees on the new events are looked up in the entity index.
+- Serves heavy accounts in pieces: a summary-only case and a keyset-paginated timeline with
+  optional payload field projection. The full case served over HTTP inlines at most
+  CASE_INLINE_TIMELINE_MAX events plus a cursor into the paginated timeline for the rest.
+- Only the newest version holds the full timeline. Once a newer one is written, a pinned older
+  version keeps its metadata, signals and risk plus the ids of its timeline events (the events
+  themselves stay in the events table), and it is pruned after CASE_PINNED_RETENTION_DAYS.
 """
 
 # import dependencies
-from typing import Dict, Any, List
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Dict, Any, List, Optional, Sequence
 from datetime import datetime, timezone, timedelta
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from .models import Event
-from .signals import build_signals
+from .entity_links import SHARED_SIGNAL_NAMES, entity_of, links_marker, shared_entity_signals
+from .models import Event, CaseSnapshot
+from .signals import EventRecord, compute_signals, rule_registry
 from .risk import assess_risk
 from .signals import LOOKBACK_DAYS  # reuse LOOKBACK_DAYS constant of 30
+from .pagination import encode_cursor, decode_cursor
+
+# Pinned (audited) case versions older than this are pruned when the account gets a new version; 0 keeps them
+CASE_PINNED_RETENTION_DAYS = float(os.getenv("CASE_PINNED_RETENTION_DAYS", "180"))
+# Timeline events inlined in GET /case (mode=full); the rest is paged from /case/{id}/timeline
+CASE_INLINE_TIMELINE_MAX = int(os.getenv("CASE_INLINE_TIMELINE_MAX", "200"))
 
 
 # Define a function that retrives the events for the case builder
 #For each account, using lookback window as logic, querying the db
-def fetch_events_for_case(db: Session, account_id: str) -> List[Event]:   # fetch the event within the last lookback window
+def fetch_events_for_case(db: Session, account_id: str, after_event_id: int = 0) -> List[Event]:   # fetch the event within the last lookback window
     cutoff = datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)
 
     return(
         db.query(Event)
         .filter(Event.account_id == account_id)
         .filter(Event.created_at >= cutoff)  #for lookback days
-        .order_by(Event.created_at.asc())
+        .filter(Event.id > after_event_id)   #only events not yet in the snapshot
+        .order_by(Event.created_at.asc(), Event.id.asc())
         .all()
     )
 
 
-# Main case builder that returns a JSON of timeline, signals, risk assessment and some metadata
-def build_case(db: Session, account_id: str) -> Dict[str, any]:
-    events = fetch_events_for_case(db, account_id)
-    signals = build_signals(db, account_id)
-    risk = assess_risk(account_id=account_id, signals=signals)
+# SQLite hands back naive datetimes; treat them as UTC so they compare with the cutoff
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
 
-    #Build clean timeline of events
-    timeline = [{
+def _timeline_entry(e: Event) -> Dict[str, Any]:
+    return {
         "event_id": e.id,
         "event_type": e.event_type,
-        "created_at": e.created_at,
+        "created_at": e.created_at.isoformat() if e.created_at else None,   # JSON column needs strings
         "payload": e.payload,
-        }
-        for e in events
+    }
+
+
+# Timeline entries (dicts) back into records the signal engine can read
+def _as_signal_events(timeline: List[Dict[str, Any]]) -> List[EventRecord]:
+    return [
+        EventRecord(
+            t["event_id"],
+            t["event_type"],
+            datetime.fromisoformat(t["created_at"]) if t.get("created_at") else None,
+            t.get("payload"),
+        )
+        for t in timeline
     ]
 
+
+def _content_hash(content: Dict[str, Any]) -> str:
+    raw = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# Event ids on a snapshot's timeline, whether it is the full head version or a compacted older one
+def timeline_event_ids(content: Dict[str, Any]) -> List[int]:
+    if "timeline_event_ids" in content:
+        return list(content["timeline_event_ids"])
+    return [t["event_id"] for t in content.get("timeline", [])]
+
+
+# What an older, pinned version keeps once it is no longer the head: everything but the timeline,
+# which shrinks to its event ids
+def _compact_snapshot(content: Dict[str, Any]) -> Dict[str, Any]:
+    if "timeline_event_ids" in content:
+        return content
+    compact = {k: v for k, v in content.items() if k != "timeline"}
+    compact["timeline_event_ids"] = timeline_event_ids(content)
+    return compact
+
+
+def latest_case_snapshot(db: Session, account_id: str) -> Optional[CaseSnapshot]:
+    return (
+        db.query(CaseSnapshot)
+        .filter(CaseSnapshot.account_id == account_id)
+        .order_by(CaseSnapshot.version.desc())
+        .first()
+    )
+
+
+# Bring the account's snapshot up to date and return it.
+# Nothing new and nothing aged out of the lookback window = the stored snapshot is returned as is.
+def refresh_case_snapshot(db: Session, account_id: str) -> CaseSnapshot:
+    latest = latest_case_snapshot(db, account_id)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)
+    links_version = links_marker(db, account_id, cutoff)
+
+    if latest is None:
+        timeline: List[Dict[str, Any]] = []
+        last_event_id = 0
+        stale = True    # force a first build
+    else:
+        old_timeline = (latest.snapshot or {}).get("timeline", [])
+        # Drop events that slid out of the lookback window
+        timeline = [
+            t for t in old_timeline
+            if t.get("created_at") and _as_utc(datetime.fromisoformat(t["created_at"])) >= cutoff
+        ]
+        last_event_id = latest.last_event_id or 0
+        # A reloaded signal rule set or changed cross-account links means the signals must be
+        # re-run even with no new events
+        stale = (
+            len(timeline) != len(old_timeline)
+            or (latest.snapshot or {}).get("rules_version") != rule_registry.version()
+            or (latest.snapshot or {}).get("links_version") != links_version
+        )
+
+    new_events = fetch_events_for_case(db, account_id, after_event_id=last_event_id)
+    if latest is not None and not new_events and not stale:
+        return latest
+
+    # Append new events; only re-sort if one arrived out of order
+    appended = [_timeline_entry(e) for e in new_events]
+    if timeline and appended and appended[0]["created_at"] < timeline[-1]["created_at"]:
+        timeline = sorted(timeline + appended, key=lambda t: (t["created_at"], t["event_id"]))
+    else:
+        timeline = timeline + appended
+    if new_events:
+        last_event_id = max(last_event_id, max(e.id for e in new_events))
+
+    # Re-run signals + risk over the in-memory timeline (no re-query)
+    records = _as_signal_events(timeline)
+    if stale:
+        shared = shared_entity_signals(db, account_id, records)
+    else:
+        # Links unchanged: the old events' cross-account signals still hold
+        previous = [s for s in (latest.snapshot or {}).get("signals", []) if s["signal_name"] in SHARED_SIGNAL_NAMES]
+        changed = {entity_of(e.event_type, e.payload) for e in new_events} - {None}
+        shared = shared_entity_signals(db, account_id, records, previous=previous, changed=changed)
+    signals = compute_signals(records) + shared
+    risk = assess_risk(account_id=account_id, signals=signals)
+    content = {"timeline": timeline, "signals": signals, "risk_assessment": risk}
+    content_hash = _content_hash(content)
+    versions = {"rules_version": rule_registry.version(), "links_version": links_version}
+
+    # Same content (e.g. an event that fired nothing aged out and nothing else changed)
+    if latest is not None and latest.content_hash == content_hash:
+        latest.last_event_id = last_event_id
+        latest.snapshot = {**content, **versions}
+        db.commit()
+        return latest
+
+    version = (latest.version if latest else 0) + 1
+    snapshot = CaseSnapshot(
+        case_id=f"CASE-{account_id}-v{version}",
+        account_id=account_id,
+        version=version,
+        content_hash=content_hash,
+        last_event_id=last_event_id,
+        snapshot={**content, **versions},   # the versions are not part of the hash
+    )
+    db.add(snapshot)
+
+    # Old versions are only kept if an audit row points at them (and then without their timeline)
+    # and only for CASE_PINNED_RETENTION_DAYS
+    retain_after = datetime.now(timezone.utc) - timedelta(days=CASE_PINNED_RETENTION_DAYS)
+    if CASE_PINNED_RETENTION_DAYS > 0:
+        (
+            db.query(CaseSnapshot)
+            .filter(CaseSnapshot.account_id == account_id)
+            .filter(CaseSnapshot.pinned.is_(True))
+            .filter(CaseSnapshot.created_at < retain_after)
+            .filter(CaseSnapshot.version < version - 1)   # the previous head is handled below
+            .delete(synchronize_session=False)
+        )
+    if latest is not None:
+        expired = CASE_PINNED_RETENTION_DAYS > 0 and _as_utc(latest.created_at) < retain_after
+        if not latest.pinned or expired:
+            db.delete(latest)
+        else:
+            latest.snapshot = _compact_snapshot(latest.snapshot or {})
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request wrote this version first; use theirs
+        db.rollback()
+        return latest_case_snapshot(db, account_id)
+
+    db.refresh(snapshot)
+    return snapshot
+
+
+# Keep the exact case version an AI decision was made on (call before committing the audit row)
+def pin_case_version(db: Session, account_id: str, version: int) -> None:
+    (
+        db.query(CaseSnapshot)
+        .filter(CaseSnapshot.account_id == account_id)
+        .filter(CaseSnapshot.version == version)
+        .update({CaseSnapshot.pinned: True}, synchronize_session=False)
+    )
+
+
+# Main case builder that returns a JSON of timeline, signals, risk assessment and some metadata
+def build_case(db: Session, account_id: str) -> Dict[str, Any]:
+    snapshot = refresh_case_snapshot(db, account_id)
+    content = snapshot.snapshot or {}
+
     #JSON case object
     case_object = {
-        "case_id": f"CASE-{account_id}-{int(datetime.now(timezone.utc).timestamp())}",
+        "case_id": snapshot.case_id,
         "account_id": account_id,
-        "created_at": datetime.now(timezone.utc),
-        "timeline": timeline,
-        "signals": signals,
-        "risk_assessment": risk,
+        "created_at": _as_utc(snapshot.created_at),   # when this case version was built
+        "case_version": snapshot.version,
+        "content_hash": snapshot.content_hash,
+        "timeline": content.get("timeline", []),
+        "signals": content.get("signals", []),
+        "risk_assessment": content.get("risk_assessment", {}),
     }
     return case_object
 
 
+# Small version of the case for heavy accounts: no timeline, just event-type counts
+# and the events that signals point to as evidence
+def summarize_case(case_obj: Dict[str, Any]) -> Dict[str, Any]:
+    timeline = case_obj.get("timeline", [])
+    evidence_ids = {
+        event_id
+        for s in case_obj.get("signals", [])
+        for event_id in s.get("evidence_event_ids", [])
+    }
+
+    return {
+        **{k: v for k, v in case_obj.items() if k != "timeline"},
+        "timeline_size": len(timeline),
+        "first_event_at": timeline[0]["created_at"] if timeline else None,
+        "last_event_at": timeline[-1]["created_at"] if timeline else None,
+        "event_type_counts": dict(Counter(t["event_type"] for t in timeline)),
+        "evidence_events": [t for t in timeline if t["event_id"] in evidence_ids],
+    }
+
+
+# The full case with its timeline cut to the first `limit` events. timeline_next_cursor continues
+# from there in fetch_timeline_page (same (created_at, id) order), None when nothing was cut.
+def cap_case_timeline(case_obj: Dict[str, Any], limit: Optional[int] = None) -> Dict[str, Any]:
+    limit = CASE_INLINE_TIMELINE_MAX if limit is None else limit
+    timeline = case_obj.get("timeline", [])
+    shown = timeline[:limit]
+    next_cursor = None
+    if len(timeline) > limit and shown:
+        next_cursor = encode_cursor({"created_at": shown[-1]["created_at"], "id": shown[-1]["event_id"]})
+    return {
+        **case_obj,
+        "timeline": shown,
+        "timeline_size": len(timeline),
+        "timeline_truncated": len(timeline) > limit,
+        "timeline_next_cursor": next_cursor,
+    }
+
+
+# One page of the account's timeline, keyset-paginated on (created_at, id).
+# `fields` projects the payload down to those keys, extracted in SQL so the full JSON isn't shipped.
+# Raises ValueError for a malformed cursor.
+def fetch_timeline_page(
+    db: Session,
+    account_id: str,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)
+    after = decode_cursor(cursor)
+
+    payload_columns = [Event.payload[f] for f in fields] if fields else [Event.payload]
+    query = (
+        db.query(Event.id, Event.event_type, Event.created_at, *payload_columns)
+        .filter(Event.account_id == account_id)
+        .filter(Event.created_at >= cutoff)
+    )
+    if after is not None:
+        try:
+            after_at = datetime.fromisoformat(str(after["created_at"]))
+            after_id = int(after["id"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+        query = query.filter(or_(
+            Event.created_at > after_at,
+            and_(Event.created_at == after_at, Event.id > after_id),
+        ))
+
+    rows = query.order_by(Event.created_at.asc(), Event.id.asc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    events = []
+    for row in rows:
+        event_id, event_type, created_at, *values = row
+        if fields:
+            payload = {f: v for f, v in zip(fields, values) if v is not None}
+        else:
+            payload = values[0]
+        events.append({
+            "event_id": event_id,
+            "event_type": event_type,
+            "created_at": created_at.isoformat() if created_at else None,
+            "payload": payload,
+        })
+
+    next_cursor = None
+    if has_more and events:
+        next_cursor = encode_cursor({"created_at": events[-1]["created_at"], "id": events[-1]["event_id"]})
+
+    return {
+        "account_id": account_id,
+        "limit": limit,
+        "fields": list(fields) if fields else None,
+        "events": events,
+        "next_cursor": next_cursor,
+    }
@@ -3,11 +3,15 @@ Database configuration.
 Using SQLite for simplicity (easy to demo and explain).
 """
 
-from sqlalchemy import create_engine
+import os
+from typing import Optional
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # SQLite file-based DB
-DATABASE_URL = "sqlite:///./compliance.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./compliance.db")
 
 # Engine manages connection pool
 engine = create_engine(
@@ -19,4 +23,30 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base class for ORM models
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+# Create tables, plus any columns/indexes added to existing tables since they were created
+# (create_all skips tables that already exist). New columns on existing tables must be nullable.
+# WAL journal (persistent in the file): readers don't block the writer, e.g. a sweep shard
+# upserting its batch while its own cursor is still streaming events.
+def init_db(bind: Optional[Engine] = None) -> None:
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+    if bind.dialect.name == "sqlite":
+        with bind.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
@@ -0,0 +1,115 @@
+"""
+Idempotent event ingestion. Upstream producers retry on timeouts, so:
+- Every event gets an idempotency key (client-supplied, or derived from
+  account_id / event_type / event_timestamp / payload hash), enforced by a unique index.
+- An in-memory Bloom filter of known keys lets the common "never seen" path skip the
+  DB lookup entirely; only "maybe seen" keys are checked against the table.
+A Bloom filter never says "not seen" for a key it was given, so duplicates can't slip past it.
+Keys written by other workers are caught by the unique index instead (and folded into the filter
+by the engine state catch-up, see app.engine_state).
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+from datetime import timezone
+from typing import Iterable, Tuple
+
+from sqlalchemy.orm import Session
+
+from .models import Event
+from .schemas import EventCreate
+
+# Sizing for the in-memory pre-filter (false-positive rate only costs an extra DB lookup)
+IDEMPOTENCY_BLOOM_CAPACITY = int(os.getenv("IDEMPOTENCY_BLOOM_CAPACITY", "1000000"))
+IDEMPOTENCY_BLOOM_ERROR_RATE = float(os.getenv("IDEMPOTENCY_BLOOM_ERROR_RATE", "0.01"))
+
+
+class BloomFilter:
+    """
+    Bit-array Bloom filter with k positions from double hashing one blake2b digest.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.num_bits = max(8, math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    # count only grows for keys that set a new bit (re-adding a key, e.g. on catch-up, doesn't)
+    def add(self, key: str) -> None:
+        positions = self._positions(key)
+        with self._lock:
+            bits = self.bits
+            new = False
+            for p in positions:
+                mask = 1 << (p & 7)
+                if not bits[p >> 3] & mask:
+                    bits[p >> 3] |= mask
+                    new = True
+            self.count += new
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    # (bit array copy, count), consistent with concurrent adds
+    def snapshot(self) -> Tuple[bytes, int]:
+        with self._lock:
+            return bytes(self.bits), self.count
+
+    # Swap in a saved bit array (a bytearray, or a writable memoryview over a mapped file).
+    # Raises ValueError if it was saved with a different sizing.
+    def restore(self, bits, count: int) -> None:
+        if len(bits) != len(self.bits):
+            raise ValueError(f"Bloom filter has {len(self.bits)} bytes, snapshot has {len(bits)}")
+        with self._lock:
+            self.bits = bits
+            self.count = count
+
+
+# Process-wide filter used by POST /events
+ingest_filter = BloomFilter(IDEMPOTENCY_BLOOM_CAPACITY, IDEMPOTENCY_BLOOM_ERROR_RATE)
+
+
+# Same event content = same key, whichever retry it arrives on
+def derive_idempotency_key(event: EventCreate) -> str:
+    ts = event.event_timestamp
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    payload = json.dumps(event.payload, sort_keys=True, separators=(",", ":"), default=str)
+    raw = f"{event.account_id}|{event.event_type}|{ts.isoformat()}|{payload}"
+    return "sha256:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# Add the keys of events with id > after_id (the whole table for 0). Returns (keys added, highest
+# event id read), so a caller can resume from there next time.
+def catch_up_ingest_filter(db: Session, after_id: int = 0, batch_size: int = 10000) -> Tuple[int, int]:
+    loaded, last_id = 0, after_id
+    rows = (
+        db.query(Event.id, Event.idempotency_key)
+        .filter(Event.id > after_id)
+        .order_by(Event.id)
+        .yield_per(batch_size)
+    )
+    for event_id, key in rows:
+        if key is not None:
+            ingest_filter.add(key)
+            loaded += 1
+        last_id = event_id
+    return loaded, last_id
+
+
+# Load existing keys at startup so the filter covers events stored before this process
+def warm_ingest_filter(db: Session, batch_size: int = 10000) -> int:
+    return catch_up_ingest_filter(db, 0, batch_size)[0]
@@ -0,0 +1,227 @@
+"""
+Snapshot and fast restore of in-memory engine state. Without it, a restart or deploy rebuilds
+the state from the `events` table before it is fast again. Today the state is the ingest Bloom
+filter of idempotency keys (app.dedup), which otherwise reads every key in the table at startup.
+- A snapshot is one file: a fixed header, a JSON index (format, watermark event id, sections),
+  then each section's raw bytes at a page-aligned offset. It is written to a temp file and
+  renamed into place, so a crash never leaves half a snapshot
+- At startup the file is memory-mapped copy-on-write and the filter's bit array becomes a view
+  into the mapping (checksummed, not parsed or copied). Then only events with id > watermark
+  are replayed
+- A background thread catches the filter up with events stored since the watermark (including
+  other workers' events) and writes a new snapshot every ENGINE_STATE_SNAPSHOT_SECONDS, and
+  once more on shutdown
+A missing, corrupt or differently sized snapshot falls back to the full rebuild.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from .dedup import catch_up_ingest_filter, ingest_filter
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ENGINE_STATE_PATH = Path(os.getenv("ENGINE_STATE_PATH", str(REPO_ROOT / "db" / "engine_state.bin")))
+ENGINE_STATE_SNAPSHOT_SECONDS = float(os.getenv("ENGINE_STATE_SNAPSHOT_SECONDS", "300"))
+ENGINE_STATE_SNAPSHOTS = os.getenv("ENGINE_STATE_SNAPSHOTS", "1") == "1"
+
+# magic, format version, JSON index length
+_HEADER = struct.Struct("<8sII")
+_MAGIC = b"CIENGST1"
+FORMAT_VERSION = 1
+
+
+def _align(offset: int) -> int:
+    page = mmap.ALLOCATIONGRANULARITY
+    return (offset + page - 1) // page * page
+
+
+# Write {name: (meta, bytes)} + watermark atomically. Returns the file size.
+def write_snapshot(path: Path, watermark: int, sections: Dict[str, Any]) -> int:
+    index: Dict[str, Any] = {
+        "format": FORMAT_VERSION,
+        "watermark": watermark,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sections": {},
+    }
+    # The header and JSON index get the first page(s); sections start after them
+    reserved = _align(_HEADER.size + 4096)
+    offset = reserved
+    for name, (meta, data) in sections.items():
+        index["sections"][name] = {**meta, "offset": offset, "length": len(data), "crc32": zlib.crc32(data)}
+        offset = _align(offset + len(data))
+    raw_index = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    if _HEADER.size + len(raw_index) > reserved:
+        raise ValueError("Engine state index too large")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")   # workers may snapshot at the same time
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, len(raw_index)))
+        f.write(raw_index)
+        for name, (_, data) in sections.items():
+            f.seek(index["sections"][name]["offset"])
+            f.write(data)
+        f.truncate(max(offset, reserved))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return max(offset, reserved)
+
+
+# Map a snapshot copy-on-write: (index, mapping). Writes to the mapping never reach the file.
+# Raises ValueError for a file that isn't a valid snapshot.
+def open_snapshot(path: Path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            raise ValueError("Engine state snapshot truncated")
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    magic, version, index_len = _HEADER.unpack_from(mapping, 0)
+    if magic != _MAGIC or version != FORMAT_VERSION:
+        mapping.close()
+        raise ValueError(f"Not an engine state snapshot (format {version})")
+    index = json.loads(bytes(mapping[_HEADER.size:_HEADER.size + index_len]))
+    for name, meta in index["sections"].items():
+        if meta["offset"] + meta["length"] > size:
+            mapping.close()
+            raise ValueError(f"Engine state section {name} truncated")
+    return index, mapping
+
+
+class EngineStateSnapshotter:
+    """
+    Owns the snapshot file and the watermark: every event with id <= watermark has its
+    idempotency key in the ingest filter.
+    """
+
+    def __init__(self, path: Path = ENGINE_STATE_PATH, interval_seconds: float = ENGINE_STATE_SNAPSHOT_SECONDS):
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.watermark = 0
+        self.restored: Dict[str, Any] = {}
+        self.last_snapshot: Dict[str, Any] = {}
+        self._mapping: Optional[mmap.mmap] = None   # kept open while the filter's bits point into it
+        self._lock = threading.Lock()               # one catch-up / snapshot at a time
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._session_factory: Optional[Callable[[], Session]] = None
+
+    # Startup: map the snapshot and replay events after its watermark, or rebuild from scratch
+    def restore(self, db: Session) -> Dict[str, Any]:
+        started = time.perf_counter()
+        source, reason = "rebuild", None
+        with self._lock:
+            try:
+                self.watermark = self._load_snapshot()
+                source = "snapshot"
+            except FileNotFoundError:
+                reason = "no snapshot"
+            except (ValueError, KeyError, OSError) as exc:
+                reason = str(exc)
+                logger.warning("Engine state snapshot %s not used (%s); rebuilding from events", self.path, exc)
+            if source == "rebuild":
+                ingest_filter.restore(bytearray(len(ingest_filter.bits)), 0)
+                self.watermark = 0
+            snapshot_watermark = self.watermark
+            replayed, self.watermark = catch_up_ingest_filter(db, self.watermark)
+        self.restored = {
+            "source": source,
+            "reason": reason,
+            "snapshot_watermark": snapshot_watermark,
+            "replayed_events": self.watermark - snapshot_watermark,
+            "replayed_keys": replayed,
+            "watermark": self.watermark,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info("Engine state restored: %s", self.restored)
+        return self.restored
+
+    def _load_snapshot(self) -> int:
+        index, mapping = open_snapshot(self.path)
+        try:
+            meta = index["sections"]["ingest_bloom"]
+            sizing = (meta["num_bits"], meta["num_hashes"], meta["length"])
+            if sizing != (ingest_filter.num_bits, ingest_filter.num_hashes, len(ingest_filter.bits)):
+                raise ValueError("Bloom filter sizing changed since the snapshot")
+        except Exception:
+            mapping.close()
+            raise
+        bits = memoryview(mapping)[meta["offset"]:meta["offset"] + meta["length"]]
+        if zlib.crc32(bits) != meta["crc32"]:
+            bits.release()   # a mapping can't be closed while a view is exported
+            mapping.close()
+            raise ValueError("Bloom filter section checksum mismatch")
+        ingest_filter.restore(bits, meta["count"])
+        self._mapping = mapping
+        return int(index["watermark"])
+
+    # Fold in events stored since the watermark, then write a snapshot at the new watermark
+    def snapshot(self, db: Session) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with self._lock:
+            added, self.watermark = catch_up_ingest_filter(db, self.watermark)
+            bits, count = ingest_filter.snapshot()
+            size = write_snapshot(self.path, self.watermark, {
+                "ingest_bloom": (
+                    {"num_bits": ingest_filter.num_bits, "num_hashes": ingest_filter.num_hashes, "count": count},
+                    bits,
+                ),
+            })
+        self.last_snapshot = {
+            "watermark": self.watermark,
+            "caught_up_keys": added,
+            "bytes": size,
+            "seconds": round(time.perf_counter() - started, 3),
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        return self.last_snapshot
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        if not ENGINE_STATE_SNAPSHOTS or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._session_factory = session_factory
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="engine-state-snapshots", daemon=True)
+        self._thread.start()
+
+    # Stops the thread and writes a final snapshot so the next start replays nothing
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.interval_seconds)
+        self._thread = None
+        self._snapshot_once()
+
+    def _snapshot_once(self) -> None:
+        db = self._session_factory()
+        try:
+            self.snapshot(db)
+        except Exception:
+            logger.exception("Engine state snapshot failed")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self._snapshot_once()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"watermark": self.watermark, "restored": self.restored, "last_snapshot": self.last_snapshot}
+
+
+engine_state = EngineStateSnapshotter()
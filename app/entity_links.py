@@ -0,0 +1,296 @@
+"""
+Cross-account signals. The per-account rules can't see a device or payee shared by many
+accounts (mule networks), and asking the events table would mean scanning every account. So:
+- entity_account_index is an inverted index, device_id -> accounts and counterparty -> accounts,
+  with first/last seen time per pair. POST /events updates it in the same transaction as the
+  event (one upsert), so it never lags the events table
+- SHARED_DEVICE / SHARED_PAYEE_FANIN are answered from it: one windowed query per entity type
+  for all the devices or payees the account used, returning only each entity's accounts within
+  ENTITY_LINK_WINDOW_DAYS (at most ENTITY_LINK_MAX_FANOUT per entity for very hot entities)
+- After an account's own new events, only the entities on those events are looked up again; the
+  rest of the previous result is kept (see shared_entity_signals' `changed`)
+- links_marker() changes when another account starts or stops sharing one of the account's
+  entities, so cached responses and case snapshots notice links their own events don't show
+Accounts that were already linked are updated the next time they are read or scored, not when
+the new account's event is ingested.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Collection, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, bindparam, case, cast, func, insert, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+
+from .models import EntityAccountLink, Event
+
+# event_type -> (entity_type, payload key)
+ENTITY_FIELDS = {
+    "device_login": ("device", "device_id"),
+    "transaction_posted": ("payee", "counterparty"),
+}
+LINK_PAYLOAD_FIELDS = tuple(field for _, field in ENTITY_FIELDS.values())
+
+# Another account's use of the entity counts if it is this recent
+ENTITY_LINK_WINDOW_DAYS = float(os.getenv("ENTITY_LINK_WINDOW_DAYS", "30"))
+
+# Accounts (including this one) that must share the entity for the signal to fire
+SHARED_DEVICE_MIN_ACCOUNTS = int(os.getenv("SHARED_DEVICE_MIN_ACCOUNTS", "3"))
+SHARED_PAYEE_MIN_ACCOUNTS = int(os.getenv("SHARED_PAYEE_MIN_ACCOUNTS", "5"))
+
+# Rows read per entity; a hotter entity is reported as "<cap>+ accounts"
+ENTITY_LINK_MAX_FANOUT = int(os.getenv("ENTITY_LINK_MAX_FANOUT", "100"))
+# Other accounts whose linking event is cited as evidence
+ENTITY_LINK_EVIDENCE_ACCOUNTS = 5
+# Entity values per batched lookup (keeps the IN list under SQLite's bound-parameter limit)
+ENTITY_LINK_LOOKUP_BATCH = 500
+
+# entity_type -> (signal name, min accounts, why template)
+SHARED_SIGNALS = {
+    "device": (
+        "SHARED_DEVICE", SHARED_DEVICE_MIN_ACCOUNTS,
+        "Device '{value}' was also used by {count} other accounts in the last {days:g} days ({accounts}).",
+    ),
+    "payee": (
+        "SHARED_PAYEE_FANIN", SHARED_PAYEE_MIN_ACCOUNTS,
+        "Payee '{value}' also received transfers from {count} other accounts in the last {days:g} days ({accounts}).",
+    ),
+}
+SHARED_SIGNAL_NAMES = {name for name, _, _ in SHARED_SIGNALS.values()}
+
+
+# (entity_type, value) an event links its account to, or None
+def entity_of(event_type: Optional[str], payload: Any) -> Optional[Tuple[str, str]]:
+    spec = ENTITY_FIELDS.get(event_type)
+    if spec is None or not isinstance(payload, dict):
+        return None
+    value = payload.get(spec[1])
+    if not value:
+        return None
+    return spec[0], str(value)
+
+
+def _window_start(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) - timedelta(days=ENTITY_LINK_WINDOW_DAYS)
+
+
+def _link_upsert():
+    table = EntityAccountLink.__table__
+    stmt = sqlite_insert(table)
+    new = stmt.excluded
+    restart = table.c.last_seen_at < bindparam("window_start")
+    return stmt.on_conflict_do_update(
+        index_elements=["entity_type", "entity_value", "account_id"],
+        set_={
+            "first_seen_at": case((restart, new.first_seen_at), else_=func.min(table.c.first_seen_at, new.first_seen_at)),
+            "first_event_id": case((restart, new.first_event_id), else_=func.min(table.c.first_event_id, new.first_event_id)),
+            "last_seen_at": func.max(table.c.last_seen_at, new.last_seen_at),
+            "last_event_id": func.max(table.c.last_event_id, new.last_event_id),
+            "event_count": table.c.event_count + 1,
+        },
+    )
+
+
+# Built once: constructing the statement per event cost as much as running it
+_LINK_UPSERT = _link_upsert()
+
+
+# Add a stored (flushed) event to the index; call before committing the event.
+# A pair unused for a whole window starts over, so its first_event_id stays inside the window.
+def record_event_links(db: Session, event: Event) -> None:
+    entity = entity_of(event.event_type, event.payload)
+    if entity is None:
+        return
+    at = event.created_at or datetime.now(timezone.utc)
+    db.execute(_LINK_UPSERT, {
+        "entity_type": entity[0],
+        "entity_value": entity[1],
+        "account_id": event.account_id,
+        "first_seen_at": at,
+        "last_seen_at": at,
+        "first_event_id": event.id,
+        "last_event_id": event.id,
+        "event_count": 1,
+        "window_start": _window_start(at),
+    })
+
+
+# Build the index from events stored before it existed (no-op once it has rows).
+# One GROUP BY per entity type inside SQLite. Returns the number of pairs written.
+def backfill_entity_index(db: Session) -> int:
+    if db.query(EntityAccountLink.id).first() is not None:
+        return 0
+    since = _window_start()
+    written = 0
+    for event_type, (entity_type, field) in ENTITY_FIELDS.items():
+        value = cast(func.json_extract(Event.payload, f'$."{field}"'), String)
+        rows = (
+            select(
+                literal(entity_type), value, Event.account_id,
+                func.min(Event.created_at), func.max(Event.created_at),
+                func.min(Event.id), func.max(Event.id), func.count(),
+            )
+            .where(Event.event_type == event_type)
+            .where(Event.created_at >= since)
+            .where(value.isnot(None))
+            .where(value != "")
+            .group_by(value, Event.account_id)
+        )
+        written += db.execute(insert(EntityAccountLink).from_select(
+            ["entity_type", "entity_value", "account_id", "first_seen_at", "last_seen_at",
+             "first_event_id", "last_event_id", "event_count"],
+            rows,
+        )).rowcount
+    db.commit()
+    return written
+
+
+# Drop pairs nobody has used for a whole window (lookups already ignore them)
+def prune_entity_index(db: Session) -> int:
+    removed = (
+        db.query(EntityAccountLink)
+        .filter(EntityAccountLink.last_seen_at < _window_start())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return removed
+
+
+# Other accounts that used the entity within the window: [(account_id, first_event_id)], most
+# recently active first, at most ENTITY_LINK_MAX_FANOUT + 1 (reads that many index rows at most)
+def linked_accounts(db: Session, account_id: str, entity_type: str, value: str, since: datetime) -> List[Tuple[str, int]]:
+    rows = (
+        db.query(EntityAccountLink.account_id, EntityAccountLink.first_event_id)
+        .filter(EntityAccountLink.entity_type == entity_type)
+        .filter(EntityAccountLink.entity_value == value)
+        .filter(EntityAccountLink.last_seen_at >= since)
+        .filter(EntityAccountLink.account_id != account_id)
+        .order_by(EntityAccountLink.last_seen_at.desc())
+        .limit(ENTITY_LINK_MAX_FANOUT + 1)
+        .all()
+    )
+    return [(r[0], r[1]) for r in rows]
+
+
+# linked_accounts for many entities at once: {(entity_type, value): [(account_id, first_event_id)]}.
+# One query per entity type and batch; a window function keeps each entity's most recently
+# active ENTITY_LINK_MAX_FANOUT + 1 rows, so a hot entity can't swamp the result.
+def linked_accounts_many(
+    db: Session, account_id: str, entities: Collection[Tuple[str, str]], since: datetime
+) -> Dict[Tuple[str, str], List[Tuple[str, int]]]:
+    by_type: Dict[str, List[str]] = {}
+    for entity_type, value in entities:
+        by_type.setdefault(entity_type, []).append(value)
+
+    found: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}
+    link = EntityAccountLink
+    for entity_type, values in by_type.items():
+        for lo in range(0, len(values), ENTITY_LINK_LOOKUP_BATCH):
+            rank = func.row_number().over(
+                partition_by=link.entity_value,
+                order_by=(link.last_seen_at.desc(), link.id.desc()),
+            ).label("rank")
+            ranked = (
+                select(link.entity_value, link.account_id, link.first_event_id, rank)
+                .where(link.entity_type == entity_type)
+                .where(link.entity_value.in_(values[lo:lo + ENTITY_LINK_LOOKUP_BATCH]))
+                .where(link.last_seen_at >= since)
+                .where(link.account_id != account_id)
+                .subquery()
+            )
+            rows = db.execute(
+                select(ranked.c.entity_value, ranked.c.account_id, ranked.c.first_event_id)
+                .where(ranked.c.rank <= ENTITY_LINK_MAX_FANOUT + 1)
+                .order_by(ranked.c.entity_value, ranked.c.rank)
+            )
+            for value, other, first_event_id in rows:
+                found.setdefault((entity_type, value), []).append((other, first_event_id))
+    return found
+
+
+# SHARED_DEVICE / SHARED_PAYEE_FANIN for the account's events (oldest first, any object with
+# id / event_type / payload), one per entity, in order of the account's first use.
+# Evidence: the account's first use of the entity, then the events that linked the earliest
+# other accounts to it.
+# With `changed`, only those entities are looked up; the others keep their signal from
+# `previous` (the last result for the same events minus new ones, links unchanged since).
+def shared_entity_signals(
+    db: Session,
+    account_id: str,
+    events: Iterable[Any],
+    previous: Optional[List[Dict[str, Any]]] = None,
+    changed: Optional[Collection[Tuple[str, str]]] = None,
+) -> List[Dict[str, Any]]:
+    uses: Dict[Tuple[str, str], int] = {}   # entity -> this account's first event using it
+    for e in events:
+        entity = entity_of(e.event_type, e.payload)
+        if entity is not None and entity not in uses:
+            uses[entity] = e.id
+    if not uses:
+        return []
+
+    by_entity: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    if changed is None:
+        lookup = list(uses)
+    else:
+        lookup = [entity for entity in uses if entity in changed]
+        entity_of_use = {event_id: entity for entity, event_id in uses.items()}
+        for s in previous or []:
+            entity = entity_of_use.get(s["evidence_event_ids"][0])
+            if entity is not None and entity not in changed:
+                by_entity[entity] = s
+
+    linked_by_entity = linked_accounts_many(db, account_id, lookup, _window_start()) if lookup else {}
+    for entity in lookup:
+        entity_type, value = entity
+        name, min_accounts, why = SHARED_SIGNALS[entity_type]
+        linked = linked_by_entity.get(entity, [])
+        if len(linked) + 1 < min_accounts:
+            continue
+        count = f"{ENTITY_LINK_MAX_FANOUT}+" if len(linked) > ENTITY_LINK_MAX_FANOUT else str(len(linked))
+        cited = sorted(linked, key=lambda link: link[1])[:ENTITY_LINK_EVIDENCE_ACCOUNTS]
+        accounts = ", ".join(a for a, _ in cited) + (", ..." if len(linked) > len(cited) else "")
+        by_entity[entity] = {
+            "signal_name": name,
+            "why_it_fired": why.format(value=value, count=count, days=ENTITY_LINK_WINDOW_DAYS, accounts=accounts),
+            "evidence_event_ids": [uses[entity]] + [event_id for _, event_id in cited],
+        }
+    return [by_entity[entity] for entity in uses if entity in by_entity]
+
+
+# Changes when the set of other accounts sharing this account's entities (used since `since`)
+# changes, as far as the signals can see it: per entity, the count and id sum of the other
+# accounts' most recently active ENTITY_LINK_MAX_FANOUT + 1 pairs (the rows
+# linked_accounts_many reads). Each entity is a LIMITed read down the lookup index, so a hot
+# device or payroll payee costs the cap, not its full fan-out. The account's own pairs are left
+# out; its own events are noticed by their ids.
+def links_marker(db: Session, account_id: str, since: datetime) -> str:
+    mine = aliased(EntityAccountLink)
+    other = aliased(EntityAccountLink)
+    top = (
+        select(other.id)
+        .where(other.entity_type == mine.entity_type)
+        .where(other.entity_value == mine.entity_value)
+        .where(other.last_seen_at >= _window_start())
+        .where(other.account_id != account_id)
+        .order_by(other.last_seen_at.desc(), other.id.desc())
+        .limit(ENTITY_LINK_MAX_FANOUT + 1)
+        .correlate(mine)
+        .subquery()
+    )
+    # "<count>:<id sum>" per entity, so each capped read happens once
+    per_entity = select(
+        func.count().op("||")(":").op("||")(func.coalesce(func.sum(top.c.id), 0))
+    ).scalar_subquery()
+    count = id_sum = 0
+    for (part,) in db.execute(
+        select(per_entity)
+        .select_from(mine)
+        .where(mine.account_id == account_id)
+        .where(mine.last_seen_at >= since)
+    ):
+        n, total = str(part).split(":")
+        count += int(n)
+        id_sum += int(total)
+    return f"{count}.{id_sum}"
@@ -0,0 +1,258 @@
+"""
+Bulk export of the audit trail for regulators and the data warehouse.
+- actions: case_actions (AUTO_ROUTED + analyst rows) with the routed decision's headline fields
+- decisions: case_decisions snapshots (the full AI decision context) with their fired signals
+- cases: the persisted case versions (cases table) the decisions were made on, content included
+Rows are read in keyset batches on id (WHERE id > last ORDER BY id LIMIT n), each in its own short
+read, so memory stays flat and a slow download never holds a SQLite read lock that blocks the audit
+writer. Output is NDJSON or CSV, optionally gzip-compressed on the fly.
+An export is pinned to the highest id present when it started (until_id). Its cursor token carries
+that bound plus the filters; passing the token back with after_id=<last id received> resumes it.
+Records still queued in the audit writer appear once flushed (in the next export).
+"""
+
+import csv
+import io
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import JSON, DateTime, func, select
+from sqlalchemy.orm import Session
+
+from .actions import CaseAction, CaseDecision, DecisionSignal
+from .database import SessionLocal
+from .models import CaseSnapshot
+from .pagination import decode_cursor, encode_cursor
+from .serialization import dumps
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+DATASETS = ("actions", "decisions", "cases")
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Exported columns per dataset, in output order
+ACTION_COLUMNS = [
+    CaseAction.id, CaseAction.created_at, CaseAction.case_id, CaseAction.account_id, CaseAction.action,
+    CaseAction.reason, CaseAction.audit_uid, CaseAction.decision_id, CaseAction.extra_data,
+    CaseDecision.routed_path, CaseDecision.workflow_path, CaseDecision.risk_band, CaseDecision.risk_score,
+    CaseDecision.final_confidence,
+]
+DECISION_COLUMNS = [
+    c for c in CaseDecision.__table__.columns if c.name != "extras"
+] + [CaseDecision.extras]
+CASE_COLUMNS = list(CaseSnapshot.__table__.columns)
+FIELDS = {
+    "actions": [c.name for c in ACTION_COLUMNS],
+    "decisions": [c.name for c in DECISION_COLUMNS[:-1]] + ["fired_signals", "extras"],
+    "cases": [c.name for c in CASE_COLUMNS],
+}
+# Table whose id the export is keyed and filtered on
+TABLES = {"actions": CaseAction, "decisions": CaseDecision, "cases": CaseSnapshot}
+# Fields CSV can't write as-is: JSON values are embedded as JSON text, datetimes as ISO-8601
+_ALL_COLUMNS = ACTION_COLUMNS + DECISION_COLUMNS + CASE_COLUMNS
+CSV_JSON_FIELDS = {c.name for c in _ALL_COLUMNS if isinstance(c.type, JSON)} | {"fired_signals"}
+CSV_DATETIME_FIELDS = {c.name for c in _ALL_COLUMNS if isinstance(c.type, DateTime)}
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)   # stored as naive UTC
+
+
+# ---------- export spec + cursor ----------
+
+# Validate the request and pin the export to the current max id. Raises ValueError (-> 400).
+# With a cursor the filters come from the token, so a resumed export can't drift from the original.
+def plan_export(
+    db: Session,
+    dataset: str = "actions",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    account_id: Optional[str] = None,
+    actions: Optional[List[str]] = None,
+    cursor: Optional[str] = None,
+    after_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    token = decode_cursor(cursor)
+    if token is not None:
+        try:
+            spec = {
+                "dataset": str(token["dataset"]),
+                "start": token.get("start"),
+                "end": token.get("end"),
+                "account_id": token.get("account_id"),
+                "actions": list(token.get("actions") or []),
+                "until_id": int(token["until_id"]),
+                "after_id": int(token.get("after_id") or 0),
+            }
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+    else:
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset {dataset!r}; expected one of {list(DATASETS)}")
+        table = TABLES[dataset]
+        spec = {
+            "dataset": dataset,
+            "start": _as_utc(start).isoformat() if start else None,
+            "end": _as_utc(end).isoformat() if end else None,
+            "account_id": account_id,
+            "actions": sorted(actions or []),
+            "until_id": db.query(func.max(table.id)).scalar() or 0,
+            "after_id": 0,
+        }
+    if after_id is not None:
+        spec["after_id"] = after_id
+
+    if spec["dataset"] not in DATASETS:
+        raise ValueError(f"Unknown dataset {spec['dataset']!r}; expected one of {list(DATASETS)}")
+    if spec["actions"] and spec["dataset"] != "actions":
+        raise ValueError("The action filter only applies to the actions dataset")
+    if spec["start"] and spec["end"] and spec["start"] > spec["end"]:
+        raise ValueError("start must be before end")
+    return spec
+
+
+# Token that identifies this export (dataset, filters, id bound); send it back with after_id to resume
+def export_cursor(spec: Dict[str, Any]) -> str:
+    return encode_cursor(spec)
+
+
+# ---------- reading ----------
+
+def _batch_statement(spec: Dict[str, Any], after_id: int):
+    table = TABLES[spec["dataset"]]
+    if spec["dataset"] == "actions":
+        stmt = select(*ACTION_COLUMNS).outerjoin(CaseDecision, CaseDecision.id == CaseAction.decision_id)
+        if spec["actions"]:
+            stmt = stmt.where(CaseAction.action.in_(spec["actions"]))
+    elif spec["dataset"] == "decisions":
+        stmt = select(*DECISION_COLUMNS)
+    else:
+        stmt = select(*CASE_COLUMNS)
+    if spec["account_id"]:
+        stmt = stmt.where(table.account_id == spec["account_id"])
+    if spec["start"]:
+        stmt = stmt.where(table.created_at >= datetime.fromisoformat(spec["start"]))
+    if spec["end"]:
+        stmt = stmt.where(table.created_at < datetime.fromisoformat(spec["end"]))
+    return (
+        stmt.where(table.id > after_id, table.id <= spec["until_id"])
+        .order_by(table.id)
+        .limit(EXPORT_BATCH_ROWS)
+    )
+
+
+def _fired_signals(db: Session, decision_ids: List[int]) -> Dict[int, List[str]]:
+    signals: Dict[int, List[str]] = {i: [] for i in decision_ids}
+    rows = db.execute(
+        select(DecisionSignal.decision_id, DecisionSignal.signal_name)
+        .where(DecisionSignal.decision_id.in_(decision_ids))
+        .order_by(DecisionSignal.decision_id, DecisionSignal.position)
+    )
+    for decision_id, name in rows:
+        signals[decision_id].append(name)
+    return signals
+
+
+# Rows after spec["after_id"] as lists of dicts, one short session per batch
+def iter_batches(spec: Dict[str, Any], session_factory=SessionLocal) -> Iterator[List[Dict[str, Any]]]:
+    fields = FIELDS[spec["dataset"]]
+    after_id = spec["after_id"]
+    while after_id < spec["until_id"]:
+        with session_factory() as db:
+            rows = db.execute(_batch_statement(spec, after_id)).all()
+            if not rows:
+                return
+            if spec["dataset"] == "decisions":
+                signals = _fired_signals(db, [r[0] for r in rows])
+                batch = [
+                    dict(zip(fields, (*r[:-1], signals[r[0]], r[-1])))
+                    for r in rows
+                ]
+            else:
+                batch = [dict(zip(fields, r)) for r in rows]
+        after_id = batch[-1]["id"]
+        yield batch
+
+
+# ---------- encoding ----------
+
+def _json_text(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+class ExportEncoder:
+    """
+    Turns batches of row dicts into NDJSON or CSV bytes, optionally as one gzip member.
+    finish() ends the gzip member; concatenated members are still one valid .gz file.
+    """
+
+    def __init__(self, dataset: str, fmt: str, compress: bool = False, header: bool = True):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}; expected one of {list(FORMATS)}")
+        self.fmt = fmt
+        self.fields = FIELDS[dataset]
+        self.rows = 0
+        self._gzip = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None   # wbits 31 = gzip
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer, lineterminator="\n")
+        self._header = header and fmt == "csv"
+        # only these columns need converting; csv writes None as "" and numbers/str natively
+        self._converters = [
+            (i, _json_text if f in CSV_JSON_FIELDS else datetime.isoformat)
+            for i, f in enumerate(self.fields)
+            if f in CSV_JSON_FIELDS or f in CSV_DATETIME_FIELDS
+        ]
+
+    def _csv_rows(self, batch: List[Dict[str, Any]]) -> Iterator[List[Any]]:
+        fields, converters = self.fields, self._converters
+        for row in batch:
+            values = [row[f] for f in fields]
+            for i, convert in converters:
+                if values[i] is not None:
+                    values[i] = convert(values[i])
+            yield values
+
+    def encode(self, batch: List[Dict[str, Any]]) -> bytes:
+        if self.fmt == "ndjson":
+            data = b"".join(dumps(row) + b"\n" for row in batch)
+        else:
+            if self._header:
+                self._csv.writerow(self.fields)
+                self._header = False
+            self._csv.writerows(self._csv_rows(batch))
+            data = self._buffer.getvalue().encode("utf-8")
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        self.rows += len(batch)
+        return self._gzip.compress(data) if self._gzip else data
+
+    def finish(self) -> bytes:
+        if self._header:   # empty CSV export still gets its header
+            self._header = False
+            self._csv.writerow(self.fields)
+            data = self._buffer.getvalue().encode("utf-8")
+            return (self._gzip.compress(data) + self._gzip.flush()) if self._gzip else data
+        return self._gzip.flush() if self._gzip else b""
+
+
+# Whole export as a byte stream (what GET /export/audit sends)
+def stream_export(spec: Dict[str, Any], fmt: str, compress: bool = False, session_factory=SessionLocal) -> Iterator[bytes]:
+    encoder = ExportEncoder(spec["dataset"], fmt, compress=compress, header=not spec["after_id"])
+    for batch in iter_batches(spec, session_factory):
+        chunk = encoder.encode(batch)
+        if chunk:
+            yield chunk
+    tail = encoder.finish()
+    if tail:
+        yield tail
+
+
+def export_filename(spec: Dict[str, Any], fmt: str, compress: bool) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    return f"audit-{spec['dataset']}-{stamp}.{fmt}" + (".gz" if compress else "")
@@ -9,11 +9,13 @@ Output is used to:
 - Identify over/under-routing patterns
 - Flag signals with high override rates
 - Surface confidence gap anomalies
+Reads the typed case_decisions / decision_signals tables (no per-row JSON parsing).
 """
 
 from typing import List, Dict, Any
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from .actions import CaseAction
+from .actions import CaseAction, CaseDecision, DecisionSignal
 from .feedback_schemas import (
     FeedbackSummaryOut,
     OverridePattern,
@@ -30,26 +32,32 @@ HIGH_GAP_THRESHOLD = 0.3
 
 def get_feedback_summary(db: Session) -> FeedbackSummaryOut:
 
-    # ---- Fetch all analyst actions (excluding the AUTO_ROUTED entries) ----
-    all_actions = (
-        db.query(CaseAction)
+    # ---- Count analyst actions (excluding the AUTO_ROUTED entries) ----
+    total_actions = (
+        db.query(func.count(CaseAction.id))
         .filter(CaseAction.action != "AUTO_ROUTED")
-        .all()
+        .scalar()
     )
 
-    total_actions = len(all_actions)
-    overrides = [a for a in all_actions if a.action == "OVERRIDE"]
+    # Overrides with the path of the AI decision they overrode
+    overrides = (
+        db.query(CaseAction.id, CaseAction.reason, CaseAction.extra_data, CaseDecision.routed_path)
+        .outerjoin(CaseDecision, CaseDecision.id == CaseAction.decision_id)
+        .filter(CaseAction.action == "OVERRIDE")
+        .order_by(CaseAction.id)
+        .all()
+    )
     total_overrides = len(overrides)
     override_rate_pct = round((total_overrides / total_actions * 100), 1) if total_actions > 0 else 0.0
 
     # ---- Override patterns: AI path to human path ----
     pattern_map: Dict[str, Dict[str, Any]] = {}
 
-    for o in overrides:
-        extra = o.extra_data or {}
-        ai_path = extra.get("ai_routed_path") or extra.get("previous_routed_path") or "UNKNOWN"
+    for _, reason, extra, decision_path in overrides:
+        extra = extra or {}
+        ai_path = decision_path or extra.get("previous_routed_path") or "UNKNOWN"
         human_path = extra.get("human_final_path") or "UNKNOWN"
-        reason = o.reason or ""
+        reason = reason or ""
 
         key = f"{ai_path}→{human_path}"
         if key not in pattern_map:
@@ -74,29 +82,30 @@ def get_feedback_summary(db: Session) -> FeedbackSummaryOut:
     # Map signal_name - {total_cases, override_count}
     signal_map: Dict[str, Dict[str, int]] = {}
 
-    # Count total cases per signal from AUTO_ROUTED entries
-    auto_routed = (
-        db.query(CaseAction)
-        .filter(CaseAction.action == "AUTO_ROUTED")
+    # Count total cases per signal from AI decisions (in the order signals were first seen)
+    signal_totals = (
+        db.query(DecisionSignal.signal_name, func.count(DecisionSignal.id))
+        .join(CaseDecision, CaseDecision.id == DecisionSignal.decision_id)
+        .filter(CaseDecision.origin == "ai_decision")
+        .group_by(DecisionSignal.signal_name)
+        .order_by(func.min(DecisionSignal.id))
         .all()
     )
-
-    for ar in auto_routed:
-        extra = ar.extra_data or {}
-        signals = extra.get("fired_signals", [])
-        for sig in signals:
-            if sig not in signal_map:
-                signal_map[sig] = {"total_cases": 0, "override_count": 0}
-            signal_map[sig]["total_cases"] += 1
+    for sig, total in signal_totals:
+        signal_map[sig] = {"total_cases": total, "override_count": 0}
 
     # Count overrides per signal
-    for o in overrides:
-        extra = o.extra_data or {}
-        signals = extra.get("fired_signals", [])
-        for sig in signals:
-            if sig not in signal_map:
-                signal_map[sig] = {"total_cases": 0, "override_count": 0}
-            signal_map[sig]["override_count"] += 1
+    override_signals = (
+        db.query(DecisionSignal.signal_name)
+        .join(CaseAction, CaseAction.decision_id == DecisionSignal.decision_id)
+        .filter(CaseAction.action == "OVERRIDE")
+        .order_by(CaseAction.id, DecisionSignal.position)
+        .all()
+    )
+    for (sig,) in override_signals:
+        if sig not in signal_map:
+            signal_map[sig] = {"total_cases": 0, "override_count": 0}
+        signal_map[sig]["override_count"] += 1
 
     signal_override_rates = [
         SignalOverrideRate(
@@ -111,15 +120,14 @@ def get_feedback_summary(db: Session) -> FeedbackSummaryOut:
     ]
 
     # ---- Confidence gap summary ----
-    gaps = []
-    for ar in auto_routed:
-        extra = ar.extra_data or {}
-        gap = extra.get("confidence_gap")
-        if gap is not None:
-            try:
-                gaps.append(float(gap))
-            except (ValueError, TypeError):
-                pass
+    gaps = [
+        gap for (gap,) in (
+            db.query(CaseDecision.confidence_gap)
+            .filter(CaseDecision.origin == "ai_decision")
+            .filter(CaseDecision.confidence_gap.isnot(None))
+            .order_by(CaseDecision.id)
+        )
+    ]
 
     avg_gap = round(sum(gaps) / len(gaps), 3) if gaps else 0.0
     high_gap_count = sum(1 for g in gaps if g > HIGH_GAP_THRESHOLD)
@@ -2,7 +2,7 @@
 Pydantic schemas for feedback loop summary output.
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, List, Optional
 
 
@@ -50,3 +50,44 @@ class FeedbackSummaryOut(BaseModel):
 
 
 
+
+
+# ---- Weight / threshold backtesting (app.backtest) ----
+
+class BacktestRequest(BaseModel):
+    # Candidate values to try; every combination is scored. Signals/thresholds left out keep the current value.
+    weights: Dict[str, List[int]] = {}
+    low_max: List[int] = []
+    medium_max: List[int] = []
+    confidence_floor: List[float] = []
+    random_samples: int = Field(default=1000, ge=0, le=100000)   # plus this many random perturbations of the current config
+    top_k: int = Field(default=10, ge=1, le=100)
+    seed: int = 0
+
+
+class BacktestConfig(BaseModel):
+    weights: Dict[str, int]
+    low_max: int
+    medium_max: int
+    confidence_floor: float
+
+
+class BacktestResult(BaseModel):
+    config: BacktestConfig
+    band_distribution: Dict[str, int]        # LOW / MEDIUM / HIGH case counts under this config
+    routed_distribution: Dict[str, int]      # routed path counts after replaying the guardrails
+    predicted_override_rate_pct: float       # reviewed cases where the replayed route differs from the analyst's path
+    override_rate_change_pct: float          # vs the current config, in percentage points
+    routing_changes: int                     # cases whose routed path differs from what was actually routed
+    routing_change_pct: float
+    routing_transitions: Dict[str, int]      # "REVIEW→MONITOR": count, changed routes only
+
+
+class BacktestOut(BaseModel):
+    cases: int                   # AI decisions replayed
+    reviewed_cases: int          # of those, with an analyst action
+    unique_case_vectors: int     # distinct (signal hits, AI proposal, confidence, outcome) rows actually scored
+    configs_evaluated: int
+    elapsed_ms: float
+    baseline: BacktestResult     # the config currently in force
+    results: List[BacktestResult]   # best top_k by predicted override rate
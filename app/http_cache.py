@@ -0,0 +1,156 @@
+"""
+Conditional GET support for the per-account read endpoints (/case, /risk, /signals).
+- A cheap per-account change marker (newest + oldest event id in the lookback window, the
+  accounts sharing its devices / payees, policy version, scoring config and signal rule set
+  versions) identifies the current state.
+- ETag / Last-Modified headers are derived from it, and If-None-Match answers 304
+  without rebuilding anything.
+- Serialized bodies are cached server-side, keyed by that marker, so a changed ETag
+  is the only thing that triggers recomputation.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from email.utils import format_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .entity_links import (
+    ENTITY_LINK_WINDOW_DAYS, SHARED_DEVICE_MIN_ACCOUNTS, SHARED_PAYEE_MIN_ACCOUNTS, links_marker,
+)
+from .models import Event
+from .rag import get_policy_version
+from .serialization import dumps
+from .risk import SIGNAL_WEIGHTS, LOW_MAX, MEDIUM_MAX
+from .signals import LOOKBACK_DAYS, LARGE_TXN_THRESHOLD, PROFILE_CHANGE_WINDOW_HOURS, rule_registry
+
+# How many serialized bodies to keep (one per endpoint + account + variant)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+
+
+# Scoring config baked into every marker so a deploy with new weights/thresholds
+# never answers 304 for a body computed with the old ones
+def _scoring_version() -> str:
+    config = {
+        "weights": SIGNAL_WEIGHTS,
+        "bands": [LOW_MAX, MEDIUM_MAX],
+        "signals": [LOOKBACK_DAYS, LARGE_TXN_THRESHOLD, PROFILE_CHANGE_WINDOW_HOURS],
+        "links": [ENTITY_LINK_WINDOW_DAYS, SHARED_DEVICE_MIN_ACCOUNTS, SHARED_PAYEE_MIN_ACCOUNTS],
+    }
+    raw = json.dumps(config, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+
+SCORING_VERSION = _scoring_version()
+
+
+# One aggregate query on the account's events in the lookback window.
+# New events move the max id, events ageing out of the window move the min id.
+# Other accounts' events only show up through the links marker (app.entity_links).
+def account_change_marker(db: Session, account_id: str) -> Tuple[str, Optional[datetime]]:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)
+
+    max_id, min_id, last_created_at = (
+        db.query(func.max(Event.id), func.min(Event.id), func.max(Event.created_at))
+        .filter(Event.account_id == account_id)
+        .filter(Event.created_at >= cutoff)
+        .one()
+    )
+
+    links = links_marker(db, account_id, cutoff)
+    marker = f"{max_id or 0}.{min_id or 0}.{links}.{get_policy_version()}.{SCORING_VERSION}.{rule_registry.version()}"
+    if last_created_at is not None and last_created_at.tzinfo is None:
+        last_created_at = last_created_at.replace(tzinfo=timezone.utc)
+    return marker, last_created_at
+
+
+def make_etag(endpoint: str, account_id: str, variant: str, marker: str) -> str:
+    raw = f"{endpoint}|{account_id}|{variant}|{marker}"
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+# If-None-Match is a list of (possibly weak) ETags. "*" is not honoured: it would answer 304 for
+# any account that has a representation at all, i.e. always
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of serialized bodies. Each (endpoint, account, variant) keeps only the body for
+    its latest marker, so stale entries are replaced rather than piling up.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str, str], marker: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != marker:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[str, str, str], marker: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (marker, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache()
+
+
+# Serve an account-scoped GET with ETag/304 handling and a body cache.
+# `variant` must cover every query parameter the body depends on (mode, cursor, fields, ...): it is
+# part of both the ETag and the cache key. `build` is only called when the marker changed since the
+# last cached body.
+def cached_account_response(
+    request: Request,
+    db: Session,
+    endpoint: str,
+    account_id: str,
+    build: Callable[[], Any],
+    variant: str = "",
+) -> Response:
+    marker, last_modified = account_change_marker(db, account_id)
+    etag = make_etag(endpoint, account_id, variant, marker)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}   # clients may store it but must revalidate
+    if last_modified is not None:
+        # Informational only: events ageing out change the body without a newer timestamp,
+        # so 304s are decided on the ETag, never on If-Modified-Since
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (endpoint, account_id, variant)
+    body = response_cache.get(key, marker)
+    if body is None:
+        body = dumps(build())
+        response_cache.put(key, marker, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
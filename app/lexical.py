@@ -0,0 +1,103 @@
+"""
+In-memory lexical (BM25) retrieval over the policy chunks written by ingest_policies.
+Case queries are literally signal names and risk bands ("risk_band HIGH; signals NEW_DEVICE_LOGIN"),
+which match policy text well on words alone, so this avoids an embedding call + Chroma query.
+- Tokens are lowercase alphanumerics, so NEW_DEVICE_LOGIN matches "new device login"
+- Per-posting BM25 weights are precomputed at build time; a query just sums them
+- Results for repeated queries are memoized (the set of case queries is small and closed)
+"""
+
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that carry no meaning for policy lookup (including the query's own scaffolding)
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in", "is", "it",
+    "of", "on", "or", "the", "to", "when", "with", "within", "signals",
+}
+
+QUERY_CACHE_SIZE = 1024
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index: term -> [(doc index, precomputed BM25 weight)].
+    Each doc is a chunk dict with at least source, chunk_id and text.
+    """
+
+    def __init__(self, docs: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.docs = docs
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._cache: "OrderedDict[Tuple[str, int], List[Tuple[float, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        term_freqs = [Counter(tokenize(d.get("text", ""))) for d in docs]
+        lengths = [sum(tf.values()) for tf in term_freqs]
+        avg_len = (sum(lengths) / len(lengths)) if lengths else 0.0
+        doc_freq: Counter = Counter()
+        for tf in term_freqs:
+            doc_freq.update(tf.keys())
+
+        n = len(docs)
+        for idx, tf in enumerate(term_freqs):
+            norm = k1 * (1 - b + b * (lengths[idx] / avg_len if avg_len else 0.0))
+            for term, freq in tf.items():
+                idf = math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                weight = idf * freq * (k1 + 1) / (freq + norm)
+                self.postings.setdefault(term, []).append((idx, weight))
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # Top-k (score, doc index), best first
+    def search(self, query: str, k: int = 3) -> List[Tuple[float, int]]:
+        key = (query, k)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            for idx, weight in self.postings.get(term, ()):
+                scores[idx] = scores.get(idx, 0.0) + weight
+        ranked = sorted(((s, i) for i, s in scores.items()), key=lambda x: (-x[0], x[1]))[:k]
+
+        with self._lock:
+            self._cache[key] = ranked
+            if len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return ranked
+
+    # Same shape as rag.retrieve_policy_snippets: {source, chunk_id, snippet}
+    def snippets(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        return [
+            {
+                "source": self.docs[i]["source"],
+                "chunk_id": self.docs[i]["chunk_id"],
+                "snippet": self.docs[i]["text"],
+            }
+            for _, i in self.search(query, k)
+        ]
+
+
+# Reciprocal-rank fusion of several ranked snippet lists (keyed by chunk_id)
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k: int, rrf_k: int = 60) -> List[Dict[str, Any]]:
+    scores: Dict[str, float] = {}
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, r in enumerate(results):
+            cid = r["chunk_id"]
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (rrf_k + rank + 1)
+            by_id.setdefault(cid, r)
+    ranked = sorted(scores, key=lambda cid: -scores[cid])
+    return [by_id[cid] for cid in ranked[:k]]
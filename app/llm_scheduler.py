@@ -0,0 +1,356 @@
+"""
+Central scheduler in front of every chat-model call made by app.ai_reasoning (and the embedding
+batches of policy ingestion, see app.rag).
+- Token buckets per model for requests/minute and tokens/minute (LLM_RPM_LIMIT, LLM_TPM_LIMIT,
+  per-model overrides in LLM_RATE_LIMITS), so bulk work can't push us over the OpenAI quota
+- Waiting calls are served strictly by priority class: interactive > HIGH band > MEDIUM band > batch.
+  Non-interactive classes also leave LLM_INTERACTIVE_RESERVE of each bucket untouched, so an
+  analyst's request finds headroom instead of waiting for the next refill
+- A 429 pauses that model's queue (Retry-After, else exponential backoff with jitter) and halves its
+  dispatch rate; each success gives some of it back (AIMD). The call is retried at its old position
+- Queue depth, wait times, 429s, retries and bucket levels per model are exposed through stats()
+LLM_SCHEDULER=0 makes every call a pass-through.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_SCHEDULER = os.getenv("LLM_SCHEDULER", "1") == "1"
+
+# Quota per model (0 = unlimited). LLM_RATE_LIMITS='{"gpt-4o": {"rpm": 500, "tpm": 30000}}'
+LLM_RPM_LIMIT = float(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = float(os.getenv("LLM_TPM_LIMIT", "200000"))
+LLM_RATE_LIMITS: Dict[str, Dict[str, float]] = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+LLM_BURST_SECONDS = float(os.getenv("LLM_BURST_SECONDS", "1"))                # bucket size, in seconds of quota
+LLM_INTERACTIVE_RESERVE = float(os.getenv("LLM_INTERACTIVE_RESERVE", "0.2"))  # bucket share only interactive may use
+
+# Token estimate before the call; corrected with the real usage afterwards
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "500"))
+CHARS_PER_TOKEN = 4
+
+# 429 handling
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "1"))
+LLM_BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "30"))
+RATE_FACTOR_MIN = 0.1
+RATE_FACTOR_RECOVERY = 0.05   # added back per successful call
+
+# Waiting limits: a queued call holds a worker thread, so lower classes can't pile up unbounded
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "120"))
+LLM_MAX_WAITING = int(os.getenv("LLM_MAX_WAITING", "32"))   # per model, non-interactive classes
+
+PRIORITY_CLASSES = ("interactive", "high", "medium", "batch")
+INTERACTIVE, HIGH, MEDIUM, BATCH = range(len(PRIORITY_CLASSES))
+WAIT_SAMPLES = 1000
+
+
+class LLMSchedulerError(RuntimeError):
+    """The call was not sent: queue full or waited too long. Retrying the cascade won't help."""
+
+
+class LLMQueueFull(LLMSchedulerError):
+    pass
+
+
+class LLMQueueTimeout(LLMSchedulerError):
+    pass
+
+
+# Class for a decision request: analyst-facing calls go first, background work by risk band
+def priority_for(case_obj: Dict[str, Any], interactive: bool = True) -> int:
+    if interactive:
+        return INTERACTIVE
+    band = (case_obj.get("risk_assessment") or {}).get("risk_band")
+    return {"HIGH": HIGH, "MEDIUM": MEDIUM}.get(band, BATCH)
+
+
+def estimate_tokens(messages: List[Any]) -> int:
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    return chars // CHARS_PER_TOKEN + LLM_EXPECTED_OUTPUT_TOKENS
+
+
+# OpenAI's RateLimitError (and the fake backend's) carry a 429 status
+def is_rate_limit(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float, factor: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate * factor)
+        self.updated = now
+
+    # Seconds until `amount` is available while keeping `reserve` (a share of capacity) untouched
+    def wait_for(self, amount: float, reserve: float, factor: float) -> float:
+        amount = min(amount, self.capacity * (1 - reserve))   # a request bigger than the bucket runs when it's full
+        missing = amount + self.capacity * reserve - self.level
+        if missing <= 1e-6:   # float residue from the clamp above would otherwise never reach 0
+            return 0.0
+        return missing / (self.rate * factor)
+
+
+class ModelScheduler:
+    """
+    Priority queue + token buckets for one model. Callers block in acquire() until they are the
+    highest-priority waiter and the buckets (and any 429 pause) allow the call.
+    """
+
+    def __init__(self, model: str, rpm: float, tpm: float):
+        self.model = model
+        self.rpm = TokenBucket(rpm, LLM_BURST_SECONDS) if rpm > 0 else None
+        self.tpm = TokenBucket(tpm, LLM_BURST_SECONDS) if tpm > 0 else None
+        self._cond = threading.Condition()
+        self._queue: List[tuple] = []   # (priority, seq) heap
+        self._seq = itertools.count()
+        self.rate_factor = 1.0
+        self.paused_until = 0.0
+        self.consecutive_429 = 0
+        self.in_flight = 0
+        self.waiting = [0] * len(PRIORITY_CLASSES)
+        self.dispatched = [0] * len(PRIORITY_CLASSES)
+        self.waits = [deque(maxlen=WAIT_SAMPLES) for _ in PRIORITY_CLASSES]
+        self.rate_limited = 0
+        self.retries = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _delay(self, priority: int, tokens: int, now: float) -> float:
+        if self.paused_until > now:
+            return self.paused_until - now
+        reserve = 0.0 if priority == INTERACTIVE else LLM_INTERACTIVE_RESERVE
+        delay = 0.0
+        for bucket, amount in ((self.rpm, 1), (self.tpm, tokens)):
+            if bucket is not None:
+                bucket.refill(now, self.rate_factor)
+                delay = max(delay, bucket.wait_for(amount, reserve, self.rate_factor))
+        return delay
+
+    # Block until this call may be sent. Pass the returned seq back when retrying to keep the place in line.
+    def acquire(self, priority: int, tokens: int, seq: Optional[int] = None) -> int:
+        with self._cond:
+            if seq is None:
+                if priority != INTERACTIVE and sum(self.waiting[1:]) >= LLM_MAX_WAITING:
+                    self.rejected += 1
+                    raise LLMQueueFull(f"{self.model}: {LLM_MAX_WAITING} background calls already waiting")
+                seq = next(self._seq)
+            entry = (priority, seq)
+            heapq.heappush(self._queue, entry)
+            self.waiting[priority] += 1
+            started = time.monotonic()
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._delay(priority, tokens, now) if self._queue[0] == entry else 1.0
+                    if self._queue[0] == entry and delay <= 0:
+                        break
+                    remaining = started + LLM_QUEUE_TIMEOUT_S - now
+                    if remaining <= 0:
+                        self._queue.remove(entry)
+                        heapq.heapify(self._queue)
+                        self.timeouts += 1
+                        raise LLMQueueTimeout(f"{self.model}: waited {LLM_QUEUE_TIMEOUT_S:.0f}s for quota")
+                    self._cond.wait(min(delay, remaining))   # woken early when the head of the queue changes
+            finally:
+                self.waiting[priority] -= 1
+                self._cond.notify_all()
+
+            heapq.heappop(self._queue)
+            if self.rpm is not None:
+                self.rpm.level -= 1
+            if self.tpm is not None:
+                self.tpm.level -= tokens
+            self.in_flight += 1
+            self.dispatched[priority] += 1
+            self.waits[priority].append(time.monotonic() - started)
+            return seq
+
+    # Call finished: correct the token estimate (may leave the bucket in debt) and recover the rate
+    def release(self, estimated: int, used: Optional[int] = None, rate_limited: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if self.tpm is not None and used is not None:
+                self.tpm.level += estimated - used
+            if rate_limited is not None:
+                self.rate_limited += 1
+                self.consecutive_429 += 1
+                backoff = _retry_after(rate_limited)
+                if backoff is None:
+                    backoff = min(LLM_BACKOFF_MAX_S, LLM_BACKOFF_BASE_S * 2 ** (self.consecutive_429 - 1))
+                    backoff *= random.uniform(0.5, 1.0)   # jitter, so workers don't retry in lockstep
+                self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+                self.rate_factor = max(RATE_FACTOR_MIN, self.rate_factor / 2)
+                logger.warning("%s rate limited (429 #%d); pausing %.1fs, rate x%.2f",
+                               self.model, self.consecutive_429, backoff, self.rate_factor)
+            elif used is not None:
+                self.consecutive_429 = 0
+                self.rate_factor = min(1.0, self.rate_factor + RATE_FACTOR_RECOVERY)
+            self._cond.notify_all()
+
+    def note_retry(self) -> None:
+        with self._cond:
+            self.retries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            waits = {}
+            for name, samples in zip(PRIORITY_CLASSES, self.waits):
+                ordered = sorted(samples)
+                waits[name] = {
+                    "p50": round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+                    "p95": round(ordered[int(len(ordered) * 0.95)] * 1000, 1) if ordered else None,
+                    "max": round(ordered[-1] * 1000, 1) if ordered else None,
+                }
+            for bucket in (self.rpm, self.tpm):
+                if bucket is not None:
+                    bucket.refill(now, self.rate_factor)
+            return {
+                "limits": {"rpm": self.rpm.rate * 60 if self.rpm else None, "tpm": self.tpm.rate * 60 if self.tpm else None},
+                "available": {"requests": round(self.rpm.level, 2) if self.rpm else None,
+                              "tokens": round(self.tpm.level) if self.tpm else None},
+                "rate_factor": round(self.rate_factor, 3),
+                "paused_for_s": round(max(0.0, self.paused_until - now), 2),
+                "queue_depth": dict(zip(PRIORITY_CLASSES, self.waiting)),
+                "in_flight": self.in_flight,
+                "dispatched": dict(zip(PRIORITY_CLASSES, self.dispatched)),
+                "wait_ms": waits,
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
+
+
+_schedulers: Dict[str, ModelScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+# rpm / tpm are this model's defaults when LLM_RATE_LIMITS has no entry for it (else LLM_*_LIMIT)
+def scheduler_for(model: str, rpm: Optional[float] = None, tpm: Optional[float] = None) -> ModelScheduler:
+    with _schedulers_lock:
+        if model not in _schedulers:
+            limits = LLM_RATE_LIMITS.get(model, {})
+            _schedulers[model] = ModelScheduler(
+                model,
+                float(limits.get("rpm", LLM_RPM_LIMIT if rpm is None else rpm)),
+                float(limits.get("tpm", LLM_TPM_LIMIT if tpm is None else tpm)),
+            )
+        return _schedulers[model]
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    with _schedulers_lock:
+        schedulers = dict(_schedulers)
+    return {"enabled": LLM_SCHEDULER, "models": {name: s.stats() for name, s in schedulers.items()}}
+
+
+def _model_name(model: Any) -> str:
+    return str(getattr(model, "model_name", None) or getattr(model, "model", None) or "default")
+
+
+def _used_tokens(messages: List[Any], result: Any, output_chars: int) -> int:
+    usage = getattr(result, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return int(usage["total_tokens"])
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    return (chars + output_chars) // CHARS_PER_TOKEN
+
+
+# fn() through the scheduler's queue, counted as `tokens`; 429s are retried with backoff.
+# used(result) gives the real token count when known.
+def call(
+    scheduler: ModelScheduler,
+    tokens: int,
+    fn: Callable[[], Any],
+    priority: int = INTERACTIVE,
+    used: Optional[Callable[[Any], int]] = None,
+) -> Any:
+    if not LLM_SCHEDULER:
+        return fn()
+    seq = None
+    for attempt in itertools.count():
+        seq = scheduler.acquire(priority, tokens, seq)
+        try:
+            result = fn()
+        except Exception as exc:
+            if not is_rate_limit(exc):
+                scheduler.release(tokens)
+                raise
+            scheduler.release(tokens, rate_limited=exc)
+            if attempt >= LLM_MAX_RETRIES:
+                raise
+            scheduler.note_retry()
+            continue
+        scheduler.release(tokens, used(result) if used else tokens)
+        return result
+
+
+# model.invoke(messages) through the model's queue
+def invoke(model: Any, messages: List[Any], priority: int = INTERACTIVE) -> Any:
+    if not LLM_SCHEDULER:
+        return model.invoke(messages)
+    return call(
+        scheduler_for(_model_name(model)),
+        estimate_tokens(messages),
+        lambda: model.invoke(messages),
+        priority,
+        used=lambda result: _used_tokens(messages, result, len(str(result.content))),
+    )
+
+
+# model.stream(messages) through the model's queue. A 429 is only retried before the first chunk,
+# since the caller has already seen the chunks sent before it.
+def stream(model: Any, messages: List[Any], priority: int = INTERACTIVE) -> Iterator[Any]:
+    if not LLM_SCHEDULER:
+        yield from model.stream(messages)
+        return
+    scheduler = scheduler_for(_model_name(model))
+    tokens = estimate_tokens(messages)
+    seq = None
+    for attempt in itertools.count():
+        seq = scheduler.acquire(priority, tokens, seq)
+        output_chars = 0
+        outcome: Dict[str, Any] = {}
+        try:
+            for chunk in model.stream(messages):
+                output_chars += len(chunk.content)
+                yield chunk
+            outcome["used"] = _used_tokens(messages, None, output_chars)
+        except Exception as exc:
+            if is_rate_limit(exc):
+                outcome["rate_limited"] = exc
+            raise_now = not is_rate_limit(exc) or output_chars or attempt >= LLM_MAX_RETRIES
+            if raise_now:
+                raise
+        finally:
+            scheduler.release(tokens, outcome.get("used"), outcome.get("rate_limited"))
+        if "used" in outcome:
+            return
+        scheduler.note_retry()
@@ -0,0 +1,223 @@
+"""
+Local stand-ins for the OpenAI chat and embedding models. This lets us:
+- Load-test /ai_decision and the RAG pipeline without calling OpenAI
+- Shape the model latency and error rate to rehearse capacity planning
+- Enforce a requests/minute quota per model (429s) to exercise app.llm_scheduler
+The stand-ins are selected with LLM_BACKEND=fake and EMBEDDING_BACKEND=fake.
+"""
+
+import ast
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Iterator
+
+from .ai_schemas import AIReasoningOut
+
+
+# Which backend the app should use for chat + embeddings ("openai" or "fake")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+
+# Fake chat latency is log-normal: median in ms and sigma (spread of the tail)
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.35"))
+
+# Error distribution (each is a probability between 0 and 1)
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0.0"))                # API error (exception)
+FAKE_LLM_INVALID_JSON_RATE = float(os.getenv("FAKE_LLM_INVALID_JSON_RATE", "0.0"))  # unparseable output
+FAKE_LLM_SCHEMA_ERROR_RATE = float(os.getenv("FAKE_LLM_SCHEMA_ERROR_RATE", "0.0"))  # JSON that fails AIReasoningOut
+
+# Simulated OpenAI quota per model: requests/minute, refilled continuously with 1s of burst (0 = none)
+FAKE_LLM_RPM = float(os.getenv("FAKE_LLM_RPM", "0"))
+
+# Fake embeddings
+FAKE_EMBEDDING_DIM = int(os.getenv("FAKE_EMBEDDING_DIM", "256"))
+FAKE_EMBEDDING_LATENCY_MS = float(os.getenv("FAKE_EMBEDDING_LATENCY_MS", "0"))
+
+# Markers in the prompt built by app.ai_reasoning
+PAYLOAD_MARKER = "Here is the case payload (JSON):"
+CITATIONS_MARKER = "Available citations:"
+
+AI_STOP_TEXT = "AI cannot freeze/restrict accounts or file regulatory reports. Human must decide enforcement."
+
+
+class FakeModelError(RuntimeError):
+    """Simulated upstream API failure."""
+
+
+class FakeRateLimitError(FakeModelError):
+    """Simulated 429 from the quota; shaped like openai.RateLimitError for app.llm_scheduler."""
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("Simulated rate limit (429)")
+        self.retry_after = retry_after
+
+
+class FakeQuota:
+    """
+    Server-side requests/minute bucket shared by all FakeChatModel instances of one model.
+    """
+
+    def __init__(self, rpm: float):
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.level < 1:
+                raise FakeRateLimitError(retry_after=round((1 - self.level) / self.rate, 3))
+            self.level -= 1
+
+
+_quotas: Dict[str, FakeQuota] = {}
+_quotas_lock = threading.Lock()
+
+
+def _quota(model: str) -> FakeQuota:
+    with _quotas_lock:
+        if model not in _quotas:
+            _quotas[model] = FakeQuota(FAKE_LLM_RPM)
+        return _quotas[model]
+
+
+@dataclass
+class FakeMessage:
+    content: str
+
+
+def _sleep_latency(median_ms: float, sigma: float) -> None:
+    if median_ms <= 0:
+        return
+    latency_ms = random.lognormvariate(math.log(median_ms), sigma) if sigma > 0 else median_ms
+    time.sleep(latency_ms / 1000.0)
+
+
+# Pull the case payload + available citations back out of the prompt text
+def _parse_prompt(text: str) -> Dict[str, Any]:
+    parsed: Dict[str, Any] = {"payload": {}, "citations": []}
+
+    idx = text.find(PAYLOAD_MARKER)
+    if idx >= 0:
+        start = text.find("{", idx)
+        try:
+            parsed["payload"], _ = json.JSONDecoder().raw_decode(text, start)
+        except (ValueError, TypeError):
+            pass
+
+    idx = text.find(CITATIONS_MARKER)
+    if idx >= 0:
+        line = text[idx + len(CITATIONS_MARKER):].splitlines()[0].strip()
+        try:
+            parsed["citations"] = list(ast.literal_eval(line))
+        except (ValueError, SyntaxError):
+            pass
+
+    return parsed
+
+
+# Choose a plausible path from the risk band so routing/guardrails get exercised
+def _fake_decision(payload: Dict[str, Any], citations: List[str]) -> AIReasoningOut:
+    band = payload.get("risk_band", "LOW")
+    fired = payload.get("fired_signals", [])
+    timeline = payload.get("timeline") or payload.get("changes_since_prior", {}).get("new_events", [])   # incremental prompts carry only new events
+
+    if band == "HIGH":
+        path = random.choice(["ESCALATE", "REVIEW"])
+    elif band == "MEDIUM":
+        path = random.choice(["REQUEST_INFO", "REVIEW"])
+    else:
+        path = "MONITOR"
+
+    evidence = [e["event_id"] for e in timeline if isinstance(e.get("event_id"), int)][-5:]
+
+    return AIReasoningOut(
+        narrative_summary=(
+            f"Account {payload.get('account_id')} is {band} risk with signals: "
+            f"{', '.join(fired) if fired else 'none'}."
+        ),
+        known_facts=[f"Signal fired: {s}" for s in fired],
+        unknowns=["Stand-in model: no real reasoning performed."],
+        workflow_path=path,
+        why_this_path=[f"Risk band {band} maps to {path} in the local stand-in."],
+        confidence=round(random.uniform(0.5, 0.95), 2),
+        evidence_event_ids=evidence,
+        policy_citations=citations[:2],
+        ai_stop=AI_STOP_TEXT,
+    )
+
+
+class FakeChatModel:
+    """
+    Drop-in for ChatOpenAI.invoke(): returns AIReasoningOut JSON after a simulated delay.
+    """
+
+    def __init__(self, model: str = "fake-chat", temperature: float = 0, **_: Any):
+        self.model_name = model
+        self.temperature = temperature
+
+    def _render(self, messages: List[Any]) -> str:
+        if FAKE_LLM_RPM > 0:
+            _quota(self.model_name).take()   # rejected before any latency, like the real API
+        _sleep_latency(FAKE_LLM_LATENCY_MS, FAKE_LLM_LATENCY_SIGMA)
+
+        roll = random.random()
+        if roll < FAKE_LLM_ERROR_RATE:
+            raise FakeModelError("Simulated model API error")
+        roll -= FAKE_LLM_ERROR_RATE
+        if roll < FAKE_LLM_INVALID_JSON_RATE:
+            return "Sorry, I cannot answer that in JSON."
+        roll -= FAKE_LLM_INVALID_JSON_RATE
+        if roll < FAKE_LLM_SCHEMA_ERROR_RATE:
+            return json.dumps({"narrative_summary": "missing fields", "workflow_path": "SOMETHING_ELSE"})
+
+        text = "\n".join(str(getattr(m, "content", m)) for m in messages)
+        parsed = _parse_prompt(text)
+        return _fake_decision(parsed["payload"], parsed["citations"]).model_dump_json()
+
+    def invoke(self, messages: List[Any]) -> FakeMessage:
+        return FakeMessage(content=self._render(messages))
+
+    # Yield the same output in small chunks, like a streaming chat model
+    def stream(self, messages: List[Any]) -> Iterator[FakeMessage]:
+        raw = self._render(messages)
+        for i in range(0, len(raw), 16):
+            yield FakeMessage(content=raw[i:i + 16])
+
+
+class FakeEmbeddings:
+    """
+    Drop-in for OpenAIEmbeddings: deterministic bag-of-words hash vectors.
+    Texts sharing words get similar vectors, so retrieval still returns sensible chunks.
+    """
+
+    def __init__(self, dim: int = FAKE_EMBEDDING_DIM, **_: Any):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for token in text.lower().replace("_", " ").split():
+            h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) == 0 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        _sleep_latency(FAKE_EMBEDDING_LATENCY_MS, 0)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        _sleep_latency(FAKE_EMBEDDING_LATENCY_MS, 0)
+        return self._embed(text)
@@ -1,43 +1,141 @@
 """
 Main FastAPI application.
 Implements the Event Intake Layer.
+APP_PROFILE picks which endpoints this process serves:
+- full (default): everything
+- ingest: POST /events + /stream/signals
+- scoring: /signals, /risk, /case (deterministic, no RAG / LLM)
+The RAG and LLM stacks are imported on first use (or by the startup warmup in the full profile).
 """
 
 # Import dependencies
-from fastapi import FastAPI, Depends, HTTPException
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import APIRouter, FastAPI, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from .database import engine, SessionLocal, Base
+from .database import SessionLocal, init_db
 from .models import Event
 from .schemas import EventCreate
-from typing import List
+from .dedup import derive_idempotency_key, ingest_filter
+from .engine_state import engine_state
+from .entity_links import backfill_entity_index, prune_entity_index, record_event_links
+from typing import Any, Dict, List, Literal, Optional
 from .signals import build_signals
 from .signal_schemas import SignalOut
 from .risk import assess_risk
 from .risk_schemas import RiskOut
-from .case import build_case
-from .rag import build_policy_query_from_case, retrieve_policy_snippets
+from .case import build_case, cap_case_timeline, pin_case_version, summarize_case, fetch_timeline_page
+from . import ai_reasoning, rag
+from .rag import build_policy_query_from_case, retrieve_policy_snippets_for_case
 from .rag_schemas import PolicyContextOut
-from .ai_reasoning import generate_ai_reasoning
+from .ai_reasoning import generate_ai_reasoning_with_trace, stream_ai_reasoning
+from .llm_scheduler import LLMSchedulerError, priority_for, scheduler_stats
+from .redecision import plan_redecision, plan_summary, reuse_prior_decision
 from .router import apply_guardrails
-from .sla import assign_sla
-from .actions import CaseAction
+from .sla import assign_sla, upsert_case_sla, resolve_case_sla, list_sla_queue, sla_sweeper, supersede_duplicate_slas
+from .sla_schemas import SlaQueueOut
+from .streaming import EVALUATE_SIGNALS_ON_INGEST, ingest_evaluator, stream_events, parse_filter
+from .audit_writer import audit_writer
+from .audit_migration import migrate_case_actions
 from .action_schemas import ActionCreate
-from datetime import datetime, timezone
 from .feedback import get_feedback_summary
-from .feedback_schemas import FeedbackSummaryOut
+from .feedback_schemas import BacktestOut, BacktestRequest, FeedbackSummaryOut
+from .export import MEDIA_TYPES, export_cursor, export_filename, plan_export, stream_export
+from .http_cache import cached_account_response
+from .serialization import FastJSONResponse, dumps
 
 
 
 
-# Create DB tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AI-Native Compliance Intelligence")
+# full | ingest | scoring
+APP_PROFILE = os.getenv("APP_PROFILE", "full").lower()
+APP_PROFILES = {
+    "full": ("ingest", "scoring", "decision"),
+    "ingest": ("ingest",),
+    "scoring": ("scoring",),
+}
+if APP_PROFILE not in APP_PROFILES:
+    raise ValueError(f"Unknown APP_PROFILE {APP_PROFILE!r}; expected one of {sorted(APP_PROFILES)}")
+ENABLED_ROUTERS = APP_PROFILES[APP_PROFILE]
+
+# Import the RAG / LLM stacks in the background after startup so the first /ai_decision doesn't pay for it
+APP_WARMUP = os.getenv("APP_WARMUP", "1") == "1"
+
+# Create DB tables (and any indexes added since)
+init_db()
+
+
+def _warm_up() -> None:
+    try:
+        rag.warm_up()
+        ai_reasoning.warm_up()
+    except Exception:
+        logger.exception("Warmup failed (run scripts/ingest_policies.py); RAG will load on first use")
+
+
+# Background workers live for the lifetime of the app
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if "ingest" in ENABLED_ROUTERS:
+        db = SessionLocal()
+        try:
+            engine_state.restore(db)   # idempotency keys stored before this process started
+            backfill_entity_index(db)   # no-op once the index has rows
+            prune_entity_index(db)
+        finally:
+            db.close()
+        engine_state.start(SessionLocal)
+        if EVALUATE_SIGNALS_ON_INGEST:
+            ingest_evaluator.start(SessionLocal)
+
+    if "decision" in ENABLED_ROUTERS:
+        if APP_WARMUP:
+            threading.Thread(target=_warm_up, name="app-warmup", daemon=True).start()
+        db = SessionLocal()
+        try:
+            migrated = migrate_case_actions(db)   # no-op once legacy audit rows are normalized
+            superseded = supersede_duplicate_slas(db)   # no-op once each account has one open SLA
+        finally:
+            db.close()
+        if any(migrated.values()):
+            logger.info("Normalized legacy audit rows: %s", migrated)
+        if superseded:
+            logger.info("Closed %d SLA row(s) of superseded case versions", superseded)
+        audit_writer.start(SessionLocal)   # replays audit records a crashed process left in its WAL
+        sla_sweeper.start()
+    yield
+    if "decision" in ENABLED_ROUTERS:
+        sla_sweeper.stop()
+        audit_writer.stop()
+    if "ingest" in ENABLED_ROUTERS:
+        ingest_evaluator.stop()
+        engine_state.stop()   # final snapshot, so the next start replays nothing
+
+
+app = FastAPI(title="AI-Native Compliance Intelligence", lifespan=lifespan)
+
+# Endpoint groups, mounted per APP_PROFILE at the bottom of this file
+ingest_router = APIRouter(tags=["ingest"])
+scoring_router = APIRouter(tags=["scoring"])
+decision_router = APIRouter(tags=["decision"])
 
 # Check the status of the site and ensure the service is running
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "audit_writer": audit_writer.stats(),
+        "engine_state": engine_state.stats(),
+        "ingest_evaluator": ingest_evaluator.stats(),
+    }
 
 # Dependency that gets DB session for every request
 def get_db():
@@ -48,76 +146,147 @@ def get_db():
         db.close()
 
 
+# Look up the event already stored under an idempotency key
+def _find_event_id(db: Session, key: str) -> Optional[int]:
+    row = db.query(Event.id).filter(Event.idempotency_key == key).first()
+    return row[0] if row else None
+
+
 #Receives all intake events
-@app.post("/events")
-def create_event(event: EventCreate, db: Session = Depends(get_db)):
+# Retries are safe: the same idempotency key (body field, Idempotency-Key header, or derived
+# from the event content) returns the original event id instead of inserting a duplicate
+@ingest_router.post("/events")
+def create_event(
+    event: EventCreate,
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    key = event.idempotency_key or idempotency_key or derive_idempotency_key(event)
+
+    # Only keys the Bloom filter may have seen need a DB lookup
+    if key in ingest_filter:
+        original_id = _find_event_id(db, key)
+        if original_id is not None:
+            return {"message": "Duplicate event ignored", "event_id": original_id, "duplicate": True}
 
     # Create new Event object
     new_event = Event(
         event_type=event.event_type,
         account_id=event.account_id,
         payload=event.payload,
+        idempotency_key=key,
     )
 
-    # Store in database
+    # Store in database, with its device / payee link in the same transaction
     db.add(new_event)
-    db.commit()
+    try:
+        db.flush()
+        record_event_links(db, new_event)
+        db.commit()
+    except IntegrityError:
+        # Another worker stored the same key first
+        db.rollback()
+        ingest_filter.add(key)
+        return {"message": "Duplicate event ignored", "event_id": _find_event_id(db, key), "duplicate": True}
     db.refresh(new_event)
+    ingest_filter.add(key)
+
+    # New signals / band changes are detected by the background evaluator and pushed to
+    # /stream/signals subscribers; the case rebuild stays off this request
+    if EVALUATE_SIGNALS_ON_INGEST:
+        ingest_evaluator.submit(event.account_id, new_event.id)
 
     return {
         "message": "Event stored successfully",
-        "event_id": new_event.id
+        "event_id": new_event.id,
+        "duplicate": False,
     }
 
 # Checks and computes all account signals based on recent events
-@app.get("/signals/{account_id}", response_model=List[SignalOut])
-def get_signals(account_id: str, db: Session = Depends(get_db)):
-    return build_signals(db, account_id)
+# Polling clients should send If-None-Match: unchanged accounts get a 304 without recomputation
+@scoring_router.get("/signals/{account_id}", response_model=List[SignalOut])
+def get_signals(account_id: str, request: Request, db: Session = Depends(get_db)):
+    def build():
+        return [SignalOut(**s).model_dump() for s in build_signals(db, account_id)]
+    return cached_account_response(request, db, "signals", account_id, build)
 
 
 #Get risk for the account id - assign risk core + band
-@app.get("/risk/{account_id}", response_model=RiskOut)
-def get_risk(account_id: str, db: Session = Depends(get_db)):
-    signals = build_signals(db, account_id)
-    return assess_risk(account_id=account_id, signals=signals)
-
-
-#Endpoint that builds a full-investigation ready case and replaces alerts
-@app.get("/case/{account_id}")
-def get_case(account_id: str, db: Session = Depends(get_db)):
-    return build_case(db, account_id)
+@scoring_router.get("/risk/{account_id}", response_model=RiskOut)
+def get_risk(account_id: str, request: Request, db: Session = Depends(get_db)):
+    def build():
+        signals = build_signals(db, account_id)
+        return RiskOut(**assess_risk(account_id=account_id, signals=signals)).model_dump()
+    return cached_account_response(request, db, "risk", account_id, build)
+
+
+#Endpoint that builds a full-investigation ready case and replaces alerts (encoded with orjson via the body cache)
+# mode=full inlines the first CASE_INLINE_TIMELINE_MAX timeline events; timeline_next_cursor pages the rest
+# from /case/{account_id}/timeline. mode=summary drops the timeline (event-type counts + evidence events instead)
+@scoring_router.get("/case/{account_id}")
+def get_case(
+    account_id: str,
+    request: Request,
+    mode: Literal["full", "summary"] = "full",
+    db: Session = Depends(get_db),
+):
+    def build():
+        case_obj = build_case(db, account_id)
+        return summarize_case(case_obj) if mode == "summary" else cap_case_timeline(case_obj)
+    return cached_account_response(request, db, "case", account_id, build, variant=mode)
+
+
+# Paginated timeline: pass next_cursor back as cursor; fields=amount,currency projects the payload
+@scoring_router.get("/case/{account_id}/timeline")
+def get_case_timeline(
+    account_id: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+    def build():
+        try:
+            return fetch_timeline_page(db, account_id, cursor=cursor, limit=limit, fields=field_list)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    variant = f"{cursor}|{limit}|{','.join(field_list or [])}"
+    return cached_account_response(request, db, "timeline", account_id, build, variant=variant)
 
 
 #Retrieves RAG policies and return the policy snippets relevant to that case
-@app.get("/policy_context/{account_id}", response_model=PolicyContextOut)
-def get_policy_context(account_id: str, db: Session = Depends(get_db)):
+# mode=lexical|vector|hybrid overrides RETRIEVAL_MODE for this call
+@decision_router.get("/policy_context/{account_id}", response_model=PolicyContextOut)
+def get_policy_context(
+    account_id: str,
+    mode: Optional[Literal["lexical", "vector", "hybrid"]] = None,
+    db: Session = Depends(get_db),
+):
     case_obj = build_case(db, account_id)
     query = build_policy_query_from_case(case_obj)
-    snippets = retrieve_policy_snippets(query=query, top_k=3)
+    snippets = retrieve_policy_snippets_for_case(case_obj, top_k=3, mode=mode)
 
     return {"query": query, "top_k": 3, "snippets": snippets}
 
 
 
-# Endpoint for ai decisioning
-@app.get("/ai_decision/{account_id}")
-def get_ai_decision(account_id: str, db: Session = Depends(get_db)):
-    """
-    This endpoint:
-    - Builds case
-    - Retrieves policy snippets (RAG)
-    - Asks AI for structured reasoning + workflow path
-    - Applies guardrails to produce a final routed path
-    """
-    case_obj = build_case(db, account_id)
-
-    # retrieve the policy context
-    query = build_policy_query_from_case(case_obj)
-    policy_snippets = retrieve_policy_snippets(query=query, top_k=3)
-
-    # AI reasoning
-    ai_out = generate_ai_reasoning(case_obj=case_obj, policy_snippets=policy_snippets)
-
+# Guardrails, confidence reconciliation, audit record, SLA -> the /ai_decision response body.
+# Shared by the blocking and streaming endpoints; ai_out must already be a validated AIReasoningOut dict.
+# plan is the app.redecision plan the answer came from (full / incremental / reused).
+def _finalize_ai_decision(
+    db: Session,
+    account_id: str,
+    case_obj: Dict[str, Any],
+    query: str,
+    policy_snippets: List[Dict[str, Any]],
+    ai_out: Dict[str, Any],
+    ai_trace: Dict[str, Any],
+    plan: Dict[str, Any],
+) -> Dict[str, Any]:
     # guardrails router
     risk_band = case_obj.get("risk_assessment", {}).get("risk_band", "UNKNOWN")
     routed = apply_guardrails(ai_out, risk_band=risk_band)
@@ -132,14 +301,26 @@ def get_ai_decision(account_id: str, db: Session = Depends(get_db)):
     final_confidence = round(min(det_conf, ai_conf), 2)
 
     # auto log the case for audit trail as proof of what the AI did
-    case_id = f"CASE-{account_id}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+    # The case_id names the exact persisted case version the AI saw
+    case_id = case_obj["case_id"]
+
+    # which decision this one built on; a reused answer keeps pointing at the case it was made on
+    prior = plan["prior"]
+    reused = plan["mode"] == "reused"
 
-    auto_action = CaseAction(
+    # attach SLA to routed path
+    case_created_at = case_obj.get("created_at")
+    routed_path = routed.get("routed_path", "REVIEW")
+    sla = assign_sla(created_at=case_created_at, routed_path=routed_path)
+
+    # Audit record goes through the WAL-backed writer (flushed in batches off the request path)
+    audit_uid = audit_writer.submit(
+    db,
     case_id=case_id,
     account_id=account_id,
     action="AUTO_ROUTED",
     reason="System auto-routing based on AI decision",
-    extra_data={
+    decision={
     # What the AI outputed/decided
     "ai_routed_path": routed.get("routed_path"),
     "ai_workflow_path": routed.get("workflow_path"),
@@ -151,19 +332,33 @@ def get_ai_decision(account_id: str, db: Session = Depends(get_db)):
     "risk_band": case_obj.get("risk_assessment", {}).get("risk_band"),
     "risk_score": case_obj.get("risk_assessment", {}).get("risk_score"),
     "fired_signals": case_obj.get("risk_assessment", {}).get("fired_signals", []),
+    "signal_counts": dict(Counter(s.get("signal_name") for s in case_obj.get("signals", []))),   # for weight backtests
     "deterministic_confidence": det_conf,
     "ai_confidence": ai_conf,
     "final_confidence": final_confidence,
     "confidence_gap": confidence_gap,
+    # which case content this decision was made on
+    "case_version": case_obj.get("case_version"),
+    "content_hash": case_obj.get("content_hash"),
+    # which model tier answered and what each tier cost
+    "ai_tier": ai_trace["ai_tier"],
+    "ai_model": ai_trace["ai_model"],
+    "ai_tier_latency_ms": ai_trace["ai_tier_latency_ms"],
+    "ai_escalation_reasons": ai_trace["ai_escalation_reasons"],
+    # the model's own answer (reused or summarized by the next re-decision) and what it was based on
+    "ai_output": ai_out,
+    "decision_mode": plan["mode"],
+    "prior_decision_uid": prior["decision_uid"] if prior else None,
+    "redecision_reasons": plan["reasons"],
+    "policy_version": rag.get_policy_version(),
+    "basis_case_version": prior["basis_case_version"] if reused else None,
+    "basis_decided_at": prior["decided_at"].isoformat() if reused and prior["decided_at"] else None,
             },
         )
-    db.add(auto_action)
-    db.commit()
 
-    # attach SLA to routed path
-    case_created_at = case_obj.get("created_at")
-    routed_path = routed.get("routed_path", "REVIEW")
-    sla = assign_sla(created_at=case_created_at, routed_path=routed_path)
+    pin_case_version(db, account_id, case_obj["case_version"])
+    sla = upsert_case_sla(db, case_id, account_id, case_created_at, routed_path, sla)   # as persisted for the SLA queue
+    db.commit()
 
     return {
         "account_id": account_id,
@@ -171,6 +366,9 @@ def get_ai_decision(account_id: str, db: Session = Depends(get_db)):
         "policy_snippets": policy_snippets,
         "ai_decision": routed,
         "case_id": case_id,
+        "audit_uid": audit_uid,
+        "ai_trace": ai_trace,
+        "redecision": plan_summary(plan),
         "sla": sla,
         "confidence": {
         "deterministic_confidence": det_conf,
@@ -181,8 +379,116 @@ def get_ai_decision(account_id: str, db: Session = Depends(get_db)):
     }
 
 
+# Endpoint for ai decisioning
+@decision_router.get("/ai_decision/{account_id}", response_class=FastJSONResponse)
+def get_ai_decision(
+    account_id: str,
+    priority: Literal["interactive", "batch"] = "interactive",
+    mode: Optional[Literal["full", "incremental"]] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    This endpoint:
+    - Builds case
+    - Retrieves policy snippets (RAG)
+    - Asks AI for structured reasoning + workflow path
+    - Applies guardrails to produce a final routed path
+    Bulk callers pass priority=batch: their LLM calls queue behind analysts' (ordered by risk band).
+    With a prior decision for the account, mode=incremental (default, REDECISION_MODE) only sends
+    what changed, or reuses the prior answer when nothing material did; mode=full resends the case.
+    """
+    case_obj = build_case(db, account_id)
+
+    # retrieve the policy context
+    query = build_policy_query_from_case(case_obj)
+    policy_snippets = retrieve_policy_snippets_for_case(case_obj, top_k=3)
+
+    try:
+        plan = plan_redecision(db, case_obj, mode, rag.get_policy_version())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # AI reasoning (fast tier, escalated to the strong tier when needed), unless the prior answer stands
+    try:
+        if plan["mode"] == "reused":
+            ai_out, ai_trace = reuse_prior_decision(plan)
+        else:
+            ai_out, ai_trace = generate_ai_reasoning_with_trace(
+                case_obj=case_obj,
+                policy_snippets=policy_snippets,
+                priority=priority_for(case_obj, interactive=priority == "interactive"),
+                plan=plan,
+            )
+    except LLMSchedulerError as exc:
+        # nothing was sent or audited; the caller should retry later
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
+
+    return FastJSONResponse(_finalize_ai_decision(db, account_id, case_obj, query, policy_snippets, ai_out, ai_trace, plan))
+
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+# SSE body for /ai_decision/{account_id}/stream. Sync generator (run in the threadpool) with its
+# own session, since the request's dependency session is closed before the body is streamed.
+def _ai_decision_events(account_id: str, priority: str = "interactive", mode: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        case_obj = build_case(db, account_id)
+        yield _sse("case", summarize_case(case_obj))
+
+        query = build_policy_query_from_case(case_obj)
+        policy_snippets = retrieve_policy_snippets_for_case(case_obj, top_k=3)
+        yield _sse("policy", {"query": query, "policy_snippets": policy_snippets})
+
+        plan = plan_redecision(db, case_obj, mode, rag.get_policy_version())
+        yield _sse("redecision", plan_summary(plan))
+        if plan["mode"] == "reused":
+            ai_out, ai_trace = reuse_prior_decision(plan)
+            yield _sse("final", _finalize_ai_decision(db, account_id, case_obj, query, policy_snippets, ai_out, ai_trace, plan))
+            return
+
+        llm_priority = priority_for(case_obj, interactive=priority == "interactive")
+        for event in stream_ai_reasoning(case_obj, policy_snippets, priority=llm_priority, plan=plan):
+            if event["type"] == "result":
+                # Only a validated + guardrailed + audited decision is sent as final
+                body = _finalize_ai_decision(
+                    db, account_id, case_obj, query, policy_snippets, event["output"], event["trace"], plan
+                )
+                yield _sse("final", body)
+            else:
+                yield _sse(event["type"], event)
+    except LLMSchedulerError as exc:
+        db.rollback()
+        yield _sse("error", {"detail": f"AI decision not started, retry later: {exc}"})
+    except Exception:
+        db.rollback()
+        logger.exception("Streaming AI decision failed for %s", account_id)
+        yield _sse("error", {"detail": "AI decision failed; nothing was audited"})
+    finally:
+        db.close()
+
+
+# Same pipeline as /ai_decision, streamed as Server-Sent Events so the UI can render each stage:
+# case (case + risk summary) -> policy -> redecision (full / incremental / reused, and why) ->
+# token* (narrative text; escalated if the strong tier takes over) -> final (same body as
+# /ai_decision), or error. A reused decision goes straight to final.
+@decision_router.get("/ai_decision/{account_id}/stream")
+def stream_ai_decision(
+    account_id: str,
+    priority: Literal["interactive", "batch"] = "interactive",
+    mode: Optional[Literal["full", "incremental"]] = None,
+):
+    return StreamingResponse(
+        _ai_decision_events(account_id, priority, mode),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 #Endpoint for analyst action
-@app.post("/cases/actions")
+@decision_router.post("/cases/actions")
 def log_case_action(payload: ActionCreate, db: Session = Depends(get_db)):
 
     # Simple guardrail---- overrides must have a reason
@@ -192,44 +498,64 @@ def log_case_action(payload: ActionCreate, db: Session = Depends(get_db)):
             detail="OVERRIDE requires a reason"
         )
 
-      # Find the most recent AI routing for this case
-    latest_ai = (
-        db.query(CaseAction)
-        .filter(CaseAction.case_id == payload.case_id)
-        .filter(CaseAction.action == "AUTO_ROUTED")
-        .order_by(CaseAction.created_at.desc())
-        .first()
-    )
+      # Find the most recent AI routing for this case (includes audit records not flushed yet)
+    latest_ai = audit_writer.latest_auto_routed(db, payload.case_id)
 
     # Get previous AI context if it exists
-    ai_context = latest_ai.extra_data if latest_ai and latest_ai.extra_data else {}
+    decision_uid, ai_context = latest_ai if latest_ai else (None, {})
 
-  # Build model feedback record
+  # Build model feedback record (the AI context itself is referenced via decision_uid, not copied)
     feedback_context = {
-        **ai_context,  # keep all AI decision data
         "human_action": payload.action,
         "human_reason": payload.reason,
         "previous_routed_path": ai_context.get("routed_path") or ai_context.get("workflow_path"),  #get the actual path of the caseid
         "human_final_path": payload.extra_data.get("override_to_path") if payload.extra_data else None,
     }
 
-    row = CaseAction(
+    audit_uid = audit_writer.submit(
+        db,
         case_id=payload.case_id,
         account_id=payload.account_id,
         action=payload.action,
         reason=payload.reason,
         extra_data=feedback_context,
+        decision_uid=decision_uid,
     )
 
-
-    db.add(row)
+    resolve_case_sla(db, payload.case_id)   # analyst acted, stop the SLA clock
     db.commit()
-    db.refresh(row)
 
-    return {"message": "Action logged", "action_id": row.id}
+    # action_id is null while the record waits in the audit writer; audit_uid always identifies it
+    return {"message": "Action logged", "action_id": audit_writer.action_id(db, audit_uid), "audit_uid": audit_uid}
+
+
+# Live feed of newly fired signals and risk-band changes (Server-Sent Events)
+# e.g. /stream/signals?band=HIGH or ?signal=NEW_PAYEE_LARGE_TRANSFER,PROFILE_CHANGE_AND_TRANSFER_24HR
+@ingest_router.get("/stream/signals")
+async def stream_signals(request: Request, band: Optional[str] = None, signal: Optional[str] = None):
+    return StreamingResponse(
+        stream_events(request, bands=parse_filter(band), signals=parse_filter(signal)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# SLA queue ordered by due time, e.g. ?due_within_hours=2 for "what breaches in the next 2 hours"
+@decision_router.get("/sla/queue", response_model=SlaQueueOut)
+def sla_queue(
+    status: Optional[Literal["ON_TRACK", "DUE_SOON", "BREACHED", "RESOLVED", "SUPERSEDED"]] = None,
+    due_within_hours: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    try:
+        return list_sla_queue(db, status=status, due_within_hours=due_within_hours, cursor=cursor, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 # Feedback loop summary — surfaces AI override patterns and signal drift for model improvement
-@app.get("/feedback/summary", response_model=FeedbackSummaryOut)
+@decision_router.get("/feedback/summary", response_model=FeedbackSummaryOut, response_class=FastJSONResponse)
 def feedback_summary(db: Session = Depends(get_db)):
     """
     Reads analyst override history and returns:
@@ -239,4 +565,66 @@ def feedback_summary(db: Session = Depends(get_db)):
     - Confidence gap summary (flags det vs AI misalignment)
     - Auto-generated recommendation if thresholds are breached
     """
-    return get_feedback_summary(db)
\ No newline at end of file
+    # Already a validated FeedbackSummaryOut; encode it directly instead of re-validating
+    return FastJSONResponse(get_feedback_summary(db).model_dump())
+
+
+# Replay historical AI decisions under candidate signal weights / band thresholds / confidence floor
+@decision_router.post("/feedback/backtest", response_model=BacktestOut, response_class=FastJSONResponse)
+def feedback_backtest(payload: BacktestRequest, db: Session = Depends(get_db)):
+    """
+    Scores every candidate config against all AI decisions with analyst outcomes and returns, per
+    config: band distribution, routed paths after the guardrails, predicted override rate and
+    routing changes vs what was actually routed. Best configs first, plus the current one.
+    """
+    from .backtest import run_backtest   # numpy is only needed here; keep it out of worker startup
+
+    try:
+        return FastJSONResponse(run_backtest(db, payload).model_dump())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+# Bulk export of the audit trail (NDJSON or CSV, optionally gzip), streamed in constant memory.
+# X-Export-Cursor identifies the export; resume an interrupted one with ?cursor=<token>&after_id=<last id>
+@decision_router.get("/export/audit")
+def export_audit(
+    dataset: Literal["actions", "decisions", "cases"] = "actions",
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    account_id: Optional[str] = None,
+    action: Optional[str] = None,
+    cursor: Optional[str] = None,
+    after_id: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+):
+    try:
+        spec = plan_export(
+            db, dataset=dataset, start=start, end=end, account_id=account_id,
+            actions=sorted(parse_filter(action)), cursor=cursor, after_id=after_id,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    headers = {
+        "X-Export-Cursor": export_cursor(spec),
+        "Content-Disposition": f'attachment; filename="{export_filename(spec, format, gzip)}"',
+    }
+    return StreamingResponse(
+        stream_export(spec, format, compress=gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+# LLM scheduler state per model: queue depth and wait times per priority class, 429s, bucket levels
+@decision_router.get("/llm/scheduler")
+def llm_scheduler_stats():
+    return scheduler_stats()
+
+
+# Mount the endpoint groups this profile serves
+for _name, _router in (("ingest", ingest_router), ("scoring", scoring_router), ("decision", decision_router)):
+    if _name in ENABLED_ROUTERS:
+        app.include_router(_router)
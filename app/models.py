@@ -3,21 +3,151 @@ Database models which defines how events are stored.
 """
 
 # Import dependencies
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+import zlib
+from sqlalchemy import Column, Integer, String, DateTime, Float, JSON, Boolean, Index, UniqueConstraint
 from datetime import datetime, timezone
 from .database import Base
 
 
+# crc32 of the account id: stable across processes (hash() is salted per process), so a
+# portfolio sweep can give each worker a contiguous range of it (see app.sweep)
+def account_bucket(account_id: str) -> int:
+    return zlib.crc32((account_id or "").encode("utf-8"))
+
+
+def _event_account_bucket(context) -> int:
+    return account_bucket(context.get_current_parameters().get("account_id"))
+
+
 class Event(Base):
     """
     Represents a raw operational event.The full payload is stored for traceability.
     """
 
     __tablename__ = "events"  # Declare table name
+    __table_args__ = (
+        # Keyset pagination / lookback scans per account: (account_id, created_at, id)
+        Index("ix_events_account_created_id", "account_id", "created_at", "id"),
+        # Sweep shards: one bucket range per worker, read in account order
+        Index("ix_events_bucket_account_created", "account_bucket", "account_id", "created_at", "id"),
+    )
 
     # Define all columns and their properties
     id = Column(Integer, primary_key=True, index=True)
     event_type = Column(String, index=True)
     account_id = Column(String, index=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
-    payload = Column(JSON)  # Full raw event payload as JSON
\ No newline at end of file
+    payload = Column(JSON)  # Full raw event payload as JSON
+    idempotency_key = Column(String, unique=True, index=True, nullable=True)  # dedup key for producer retries
+    account_bucket = Column(Integer, default=_event_account_bucket)  # account_bucket(account_id); NULL on rows stored before it existed
+
+class CaseSnapshot(Base):
+    """
+    A persisted, versioned case for one account (built by app.case).
+    Each content change creates a new version; the content hash lets audit rows be
+    matched back to the exact case the AI saw. Versions referenced by an AI decision are pinned
+    and kept (compacted to timeline event ids, up to CASE_PINNED_RETENTION_DAYS), unpinned older
+    versions are pruned when a newer one is written.
+    """
+
+    __tablename__ = "cases"
+    __table_args__ = (UniqueConstraint("account_id", "version", name="uq_cases_account_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    case_id = Column(String, index=True)               # CASE-<account_id>-v<version>
+    account_id = Column(String, index=True)
+    version = Column(Integer, nullable=False)
+    content_hash = Column(String, nullable=False)      # sha256 of timeline + signals + risk
+    last_event_id = Column(Integer, default=0)         # highest event id folded into this snapshot
+    pinned = Column(Boolean, default=False)            # referenced by an audit row, never pruned
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    snapshot = Column(JSON)                            # {"timeline": [...], "signals": [...], "risk_assessment": {...}}; older versions: "timeline_event_ids" instead of "timeline"
+
+
+class PublishedSignalState(Base):
+    """
+    What /stream/signals has already announced for an account: the signals (by name + evidence
+    ids) and the risk band. app.streaming diffs a refreshed case against this rather than against
+    the previous case snapshot, which any reader may have refreshed in the meantime.
+    """
+
+    __tablename__ = "published_signal_state"
+
+    account_id = Column(String, primary_key=True)
+    signal_keys = Column(JSON)                         # sorted digests of (signal_name, evidence_event_ids)
+    risk_band = Column(String, nullable=True)
+    case_version = Column(Integer, nullable=True)      # case version the state was taken from
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class CaseSla(Base):
+    """
+    Persisted SLA deadline for a routed case (MONITOR cases have none).
+    The sweeper in app.sla moves sla_status ON_TRACK -> DUE_SOON -> BREACHED with one
+    range update on (sla_status, sla_due_at); an analyst action marks it RESOLVED, and a
+    decision on a newer case version of the account marks it SUPERSEDED.
+    """
+
+    __tablename__ = "case_slas"
+    __table_args__ = (
+        Index("ix_case_slas_status_due", "sla_status", "sla_due_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    case_id = Column(String, unique=True, index=True)
+    account_id = Column(String, index=True)
+    routed_path = Column(String)                    # ESCALATE | REVIEW | REQUEST_INFO
+    created_at = Column(DateTime(timezone=True))    # case creation time the SLA counts from
+    sla_due_at = Column(DateTime(timezone=True), index=True)
+    sla_status = Column(String)                     # ON_TRACK | DUE_SOON | BREACHED | RESOLVED | SUPERSEDED
+    status_updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class AccountRisk(Base):
+    """
+    Latest risk assessment per account, written by the portfolio sweep (app.sweep).
+    One row per account; each sweep overwrites the rows of the accounts it scored and
+    drops rows of accounts it didn't see (no events left in the lookback window).
+    """
+
+    __tablename__ = "account_risk"
+
+    account_id = Column(String, primary_key=True)
+    risk_score = Column(Integer)
+    risk_band = Column(String, index=True)
+    confidence = Column(Float)
+    fired_signals = Column(JSON)
+    score_breakdown = Column(JSON)
+    event_count = Column(Integer)                   # events in the lookback window when scored
+    last_event_id = Column(Integer)
+    sweep_id = Column(String, index=True)           # which sweep wrote this row
+    scored_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+class EntityAccountLink(Base):
+    """
+    Cross-account inverted index: one row per (device id or payee, account) pair, with the
+    first/last time and event id the account used it. Kept up to date in the POST /events
+    transaction, so "which other accounts use this device / pay this payee" is an index
+    lookup over that entity's rows instead of a scan of the events table.
+    """
+
+    __tablename__ = "entity_account_index"
+    __table_args__ = (
+        UniqueConstraint("entity_type", "entity_value", "account_id", name="uq_entity_account"),
+        # accounts using one entity within a time bound (the fan-out lookup)
+        Index("ix_entity_account_lookup", "entity_type", "entity_value", "last_seen_at"),
+        # entities one account used within a time bound
+        Index("ix_entity_account_account", "account_id", "last_seen_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String, nullable=False)     # device | payee
+    entity_value = Column(String, nullable=False)    # device_id / counterparty
+    account_id = Column(String, nullable=False)
+    first_seen_at = Column(DateTime(timezone=True))
+    last_seen_at = Column(DateTime(timezone=True))
+    first_event_id = Column(Integer)                 # the event that linked the account to the entity
+    last_event_id = Column(Integer)
+    event_count = Column(Integer, default=1)
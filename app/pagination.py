@@ -0,0 +1,28 @@
+"""
+Opaque cursor tokens for keyset pagination.
+A cursor is the sort key of the last row a client has seen, e.g. (created_at, id),
+base64url-encoded so clients treat it as a token rather than something to build.
+"""
+
+import base64
+import json
+from typing import Any, Dict, Optional
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+# Raises ValueError on a malformed token (callers turn it into a 400)
+def decode_cursor(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
@@ -5,18 +5,34 @@ RAG using LangChain + Chroma.This file:
 - Embeds chunks
 - Stores them in a persisted Chroma DB (local folder)
 - Retrieves top-k relevant chunks for case query
+- Retrieval mode is `vector` (Chroma), `lexical` (in-memory BM25 over the same chunks) or
+  `hybrid` (reciprocal-rank fusion of both), set by RETRIEVAL_MODE or per call
+- LangChain / Chroma / OpenAI are imported inside the functions that use them, so importing
+  this module (and app.main) stays cheap for processes that never touch RAG
+- Precomputes a citation index at ingest (ranked chunks per risk band and per signal), so a
+  case's snippets are a merge of stored lists instead of a live search
+- Ingestion upserts by chunk_id and only embeds what changed: identical texts (headers,
+  disclaimers) are embedded once, stored vectors are reused, and the rest goes out in concurrent
+  batches under app.llm_scheduler's rate limits
 
 """
 
 #Import all dependencies
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 from dotenv import load_dotenv
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain_text_splitters import CharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
 from collections import defaultdict
+from . import llm_scheduler
+from .local_models import EMBEDDING_BACKEND, FAKE_EMBEDDING_DIM, FakeEmbeddings
+from .lexical import BM25Index, reciprocal_rank_fusion
 
 
 
@@ -29,16 +45,72 @@ REPO_ROOT = Path(__file__).resolve().parent.parent
 POLICY_DIR = REPO_ROOT / "policies"
 PERSIST_DIR = REPO_ROOT / "db" / "chroma_policy"
 COLLECTION_NAME = "policy_docs"
+MANIFEST_PATH = PERSIST_DIR / "manifest.json"
+CHUNKS_PATH = PERSIST_DIR / "chunks.json"      # chunk texts + ids for the lexical index
+CITATION_INDEX_PATH = PERSIST_DIR / "citation_index.json"   # band/signal -> ranked chunks
+
+# How many ranked chunks to store per band / signal in the citation index
+CITATION_INDEX_DEPTH = int(os.getenv("CITATION_INDEX_DEPTH", "6"))
+RISK_BANDS = ("LOW", "MEDIUM", "HIGH")
+
+# lexical | vector | hybrid
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+RETRIEVAL_MODES = ("lexical", "vector", "hybrid")
+
+# Embedding during ingestion: texts per request, requests in flight, and the model's quota
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "128"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_RPM_LIMIT = float(os.getenv("EMBED_RPM_LIMIT", "3000"))
+EMBED_TPM_LIMIT = float(os.getenv("EMBED_TPM_LIMIT", "1000000"))
+
+
+# Pick the embedding backend: OpenAI by default, or the local stand-in for load tests
+def _get_embeddings():
+    if EMBEDDING_BACKEND == "fake":
+        return FakeEmbeddings()
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL)
+
+
+# Vectors from different models aren't comparable, so the model is part of a chunk's embed_key
+def _embedding_model_name() -> str:
+    return f"fake-{FAKE_EMBEDDING_DIM}" if EMBEDDING_BACKEND == "fake" else EMBEDDING_MODEL
+
+
+def _embed_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def _batched(items: List[Any], size: int) -> List[List[Any]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# Import the vector store stack ahead of the first request (startup warmup hook)
+def warm_up() -> None:
+    importlib.import_module("langchain_chroma")
+    if EMBEDDING_BACKEND != "fake":
+        importlib.import_module("langchain_openai")
+    if RETRIEVAL_MODE in ("lexical", "hybrid"):
+        get_lexical_index()
+    get_citation_index()
 
 
 
 #-----------POLICY INGESTION PIPELINE--------
 # Define the policy ingestion pipeline that reads policy docs, chunk them, embed and persist them into chroma db
-def ingest_policies() -> None:
+# progress(stats) is called after every embedding batch; returns the final embedding stats
+def ingest_policies(
+    signal_names: Optional[List[str]] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
     #Check if the directory exists
     if not POLICY_DIR.exists():
         raise FileNotFoundError(f"Policy directory not found: {POLICY_DIR}")
 
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+    from langchain_text_splitters import CharacterTextSplitter
+
     #--------LOADING / PARSING-----------
     # Load all the .md and .txt files from policies/
     loader = DirectoryLoader(
@@ -75,16 +147,152 @@ def ingest_policies() -> None:
 
 
     #----------EMBEDDING------------
-    # Create embeddings model (OpenAI)
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-    # Create vector store to 
-    Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=str(PERSIST_DIR),
-        collection_name=COLLECTION_NAME,
-    )
+    # Embed what changed and upsert every chunk into Chroma under its chunk_id
+    stats = _upsert_chunk_vectors(chunks, progress)
+
+    # Same chunks + ids as Chroma, for the in-memory lexical index
+    CHUNKS_PATH.write_text(json.dumps([
+        {"chunk_id": d.metadata["chunk_id"], "source": d.metadata["source_file"], "text": d.page_content}
+        for d in chunks
+    ], ensure_ascii=False), encoding="utf-8")
+
+    #----------MANIFEST------------
+    # Content version of this ingestion so caches and indexes can tell when policies changed
+    digest = hashlib.sha256()
+    for d in chunks:
+        digest.update(d.metadata["chunk_id"].encode("utf-8"))
+        digest.update(d.page_content.encode("utf-8"))
+
+    MANIFEST_PATH.write_text(json.dumps({
+        "version": digest.hexdigest()[:16],
+        "chunk_count": len(chunks),
+        "embedding_model": _embedding_model_name(),
+        "ingested_at": datetime.now(timezone.utc).isoformat(),
+    }, indent=2), encoding="utf-8")
+
+    #----------CITATION INDEX------------
+    # Bands and signal names are a closed set, so rank their chunks once here
+    if signal_names is None:
+        from .risk import current_signal_weights   # rule file + default weights = every known signal
+        signal_names = sorted(current_signal_weights())
+    build_citation_index(signal_names)
+    return stats
+
+
+# Write chunk vectors into the Chroma collection, keyed by chunk_id:
+# - a chunk whose id already holds a vector for the same text (and model) is left alone
+# - identical texts are embedded once and the vector is written to every chunk with that text
+# - a vector already stored for a text under another id is copied instead of re-embedded
+# - the remaining unique texts are embedded EMBED_BATCH_SIZE at a time, EMBED_CONCURRENCY requests
+#   in flight, through the embedding model's rate limits; each batch is written as it returns
+# - ids that are no longer in the policy set (or came from older, randomly keyed ingests) are deleted
+def _upsert_chunk_vectors(chunks: List[Any], progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    import chromadb
+
+    started = time.perf_counter()
+    model_name = _embedding_model_name()
+    client = chromadb.PersistentClient(path=str(PERSIST_DIR))
+    collection = client.get_or_create_collection(COLLECTION_NAME, embedding_function=None)   # as langchain_chroma creates it
+    max_rows = client.get_max_batch_size()
+
+    existing = collection.get(include=["metadatas"])
+    stored_keys = {cid: (meta or {}).get("embed_key") for cid, meta in zip(existing["ids"], existing["metadatas"])}
+
+    pending: Dict[str, List[Any]] = defaultdict(list)   # embed_key -> chunks that need its vector
+    unchanged = 0
+    for d in chunks:
+        d.metadata["embed_key"] = _embed_key(model_name, d.page_content)
+        if stored_keys.get(d.metadata["chunk_id"]) == d.metadata["embed_key"]:
+            unchanged += 1
+        else:
+            pending[d.metadata["embed_key"]].append(d)
+
+    stats = {
+        "chunks": len(chunks),
+        "unchanged": unchanged,
+        "unique_texts": len(pending),
+        "reused": 0,
+        "embedded": 0,
+        "deleted": 0,
+        "elapsed_s": 0.0,
+    }
+
+    def upsert(rows: List[tuple]) -> None:
+        for part in _batched(rows, max_rows):
+            collection.upsert(
+                ids=[d.metadata["chunk_id"] for d, _ in part],
+                embeddings=[vector for _, vector in part],
+                documents=[d.page_content for d, _ in part],
+                metadatas=[d.metadata for d, _ in part],
+            )
+
+    # First chunk with each text is written right away; the copies are written last, in document
+    # order. Hundreds of identical vectors inserted back to back degrade Chroma's HNSW graph
+    # (searches get stuck among the duplicates), interleaving them like a one-shot load avoids that.
+    copies: Dict[str, List[float]] = {}
+
+    def write(keys: List[str], vectors: List[List[float]]) -> None:
+        upsert([(pending[key][0], vector) for key, vector in zip(keys, vectors)])
+        copies.update((key, vector) for key, vector in zip(keys, vectors) if len(pending[key]) > 1)
+
+    # Texts already embedded under some other id
+    owners: Dict[str, str] = {}
+    for cid, key in stored_keys.items():
+        if key in pending:
+            owners.setdefault(key, cid)
+    for keys in _batched(list(owners), max_rows):
+        got = collection.get(ids=[owners[k] for k in keys], include=["embeddings"])
+        by_id = dict(zip(got["ids"], got["embeddings"]))
+        write(keys, [list(by_id[owners[k]]) for k in keys])
+        stats["reused"] += len(keys)
+
+    # Everything else: one request per batch of unique texts, several in flight
+    embeddings = _get_embeddings()
+    scheduler = llm_scheduler.scheduler_for(model_name, rpm=EMBED_RPM_LIMIT, tpm=EMBED_TPM_LIMIT)
+
+    def embed(keys: List[str]) -> List[List[float]]:
+        texts = [pending[k][0].page_content for k in keys]
+        tokens = sum(len(t) for t in texts) // llm_scheduler.CHARS_PER_TOKEN + 1
+        return llm_scheduler.call(scheduler, tokens, lambda: embeddings.embed_documents(texts), priority=llm_scheduler.BATCH)
+
+    to_embed = [k for k in pending if k not in owners]
+    with ThreadPoolExecutor(max_workers=max(1, EMBED_CONCURRENCY), thread_name_prefix="embed") as pool:
+        futures = {pool.submit(embed, keys): keys for keys in _batched(to_embed, max(1, EMBED_BATCH_SIZE))}
+        for future in as_completed(futures):
+            keys = futures[future]
+            write(keys, future.result())   # Chroma writes stay on this thread
+            stats["embedded"] += len(keys)
+            if progress:
+                progress({**stats, "to_embed": len(to_embed), "elapsed_s": round(time.perf_counter() - started, 2)})
+
+    upsert([
+        (d, copies[d.metadata["embed_key"]]) for d in chunks
+        if d.metadata["embed_key"] in copies and d is not pending[d.metadata["embed_key"]][0]
+    ])
+
+    current = {d.metadata["chunk_id"] for d in chunks}
+    stale = [cid for cid in stored_keys if cid not in current]
+    for part in _batched(stale, max_rows):
+        collection.delete(ids=part)
+    stats["deleted"] = len(stale)
+    stats["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+# Version of the currently ingested policy set ("none" before the first ingestion).
+# Re-read only when the manifest file changes.
+_policy_version_cache: Dict[str, Any] = {"mtime": None, "version": "none"}
+
+def get_policy_version() -> str:
+    try:
+        mtime = MANIFEST_PATH.stat().st_mtime
+    except FileNotFoundError:
+        return "none"
+
+    if _policy_version_cache["mtime"] != mtime:
+        manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+        _policy_version_cache.update(mtime=mtime, version=str(manifest.get("version", "none")))
+    return _policy_version_cache["version"]
 
 
 
@@ -92,7 +300,8 @@ def ingest_policies() -> None:
 #--------------RETRIEVAL PIPELINE-------------
 #Load the persisted Chroma DB and return top k.
 def get_retriever(k: int = 3):
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    from langchain_chroma import Chroma
+    embeddings = _get_embeddings()
 
     db = Chroma(
         persist_directory=str(PERSIST_DIR),
@@ -112,9 +321,112 @@ def build_policy_query_from_case(case_obj: Dict[str, Any]) -> str:
     return f"risk_band {risk_band}; signals {fired_text}"
 
 
-# Retrieve what part of the policy that applies to the search. Returns a list with {source, chunk_id, snippet}
-def retrieve_policy_snippets(query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+# Rank the policy chunks for every risk band and signal name and persist them.
+# Stamped with the policy version + retrieval mode so a stale index is never used.
+def build_citation_index(signal_names: List[str], depth: int = CITATION_INDEX_DEPTH, mode: Optional[str] = None) -> Dict[str, Any]:
+    mode = (mode or RETRIEVAL_MODE).lower()
+    index = {
+        "policy_version": get_policy_version(),
+        "retrieval_mode": mode,
+        "depth": depth,
+        "bands": {band: retrieve_policy_snippets(f"risk_band {band}", top_k=depth, mode=mode) for band in RISK_BANDS},
+        "signals": {name: retrieve_policy_snippets(f"signals {name}", top_k=depth, mode=mode) for name in signal_names},
+    }
+    CITATION_INDEX_PATH.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+    return index
+
+
+# The persisted citation index, re-read only when the file changes.
+# None when missing or built for a different policy version.
+_citation_cache: Dict[str, Any] = {"mtime": None, "index": None}
+
+def get_citation_index() -> Optional[Dict[str, Any]]:
+    try:
+        mtime = CITATION_INDEX_PATH.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    if _citation_cache["mtime"] != mtime:
+        _citation_cache.update(mtime=mtime, index=json.loads(CITATION_INDEX_PATH.read_text(encoding="utf-8")))
+
+    index = _citation_cache["index"]
+    if index.get("policy_version") != get_policy_version():
+        return None
+    return index
+
+
+# Policy snippets for a case: merge the precomputed lists for its band and fired signals (RRF).
+# Falls back to a live search for unknown signals, a different mode, or no index.
+def retrieve_policy_snippets_for_case(case_obj: Dict[str, Any], top_k: int = 3, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    mode = (mode or RETRIEVAL_MODE).lower()
+    risk_band = case_obj.get("risk_assessment", {}).get("risk_band", "UNKNOWN")
+    fired = case_obj.get("risk_assessment", {}).get("fired_signals", [])
 
+    index = get_citation_index()
+    if (
+        index is not None
+        and index.get("retrieval_mode") == mode
+        and top_k <= index.get("depth", 0)
+        and risk_band in index["bands"]
+        and all(name in index["signals"] for name in fired)
+    ):
+        ranked_lists = [index["bands"][risk_band]] + [index["signals"][name] for name in fired]
+        return reciprocal_rank_fusion(ranked_lists, k=top_k)
+
+    query = build_policy_query_from_case(case_obj)
+    return retrieve_policy_snippets(query=query, top_k=top_k, mode=mode)
+
+
+# Chunks for the lexical index: chunks.json from ingestion, or read back from Chroma
+# for collections ingested before chunks.json existed
+def load_policy_chunks() -> List[Dict[str, Any]]:
+    if CHUNKS_PATH.exists():
+        return json.loads(CHUNKS_PATH.read_text(encoding="utf-8"))
+
+    from langchain_chroma import Chroma
+    db = Chroma(persist_directory=str(PERSIST_DIR), collection_name=COLLECTION_NAME)
+    stored = db.get(include=["documents", "metadatas"])
+    return [
+        {
+            "chunk_id": str(meta.get("chunk_id", "unknown")),
+            "source": str(meta.get("source", "unknown")).split("/")[-1].split("\\")[-1],
+            "text": text,
+        }
+        for text, meta in zip(stored["documents"], stored["metadatas"])
+    ]
+
+
+# BM25 index over the policy chunks, rebuilt when the policy version changes
+_lexical_state: Dict[str, Any] = {"version": None, "index": None}
+_lexical_lock = threading.Lock()
+
+def get_lexical_index() -> BM25Index:
+    version = get_policy_version()
+    if _lexical_state["index"] is None or _lexical_state["version"] != version:
+        with _lexical_lock:
+            if _lexical_state["index"] is None or _lexical_state["version"] != version:
+                _lexical_state["index"] = BM25Index(load_policy_chunks())
+                _lexical_state["version"] = version
+    return _lexical_state["index"]
+
+
+# Retrieve what part of the policy that applies to the search. Returns a list with {source, chunk_id, snippet}
+def retrieve_policy_snippets(query: str, top_k: int = 3, mode: str | None = None) -> List[Dict[str, Any]]:
+    mode = (mode or RETRIEVAL_MODE).lower()
+
+    if mode == "lexical":
+        return get_lexical_index().snippets(query, top_k)
+    if mode == "hybrid":
+        # Fuse deeper lists from both retrievers, then cut to top_k
+        return reciprocal_rank_fusion(
+            [get_lexical_index().snippets(query, top_k * 2), _vector_snippets(query, top_k * 2)],
+            k=top_k,
+        )
+    return _vector_snippets(query, top_k)
+
+
+# Embedding + Chroma similarity search
+def _vector_snippets(query: str, top_k: int) -> List[Dict[str, Any]]:
     retriever = get_retriever(k=top_k)
     docs = retriever.invoke(query)
 
@@ -8,7 +8,7 @@ from typing import List
 
 class PolicySnippet(BaseModel):
     source: str      # policy file name
-    chunk_id: int    # the chunk number within that file
+    chunk_id: str    # stable chunk id, e.g. escalation.md#chunk_0
     snippet: str     # chunk text
 
 
@@ -0,0 +1,177 @@
+"""
+Incremental re-decisioning for accounts that already have an AI decision.
+Instead of rebuilding and resending the whole case on every /ai_decision:
+- The prior decision is loaded from the audit trail (including records the audit writer hasn't
+  flushed yet), with the pinned case version it was made on
+- The delta between that case and the current one is computed: new events, events that aged out,
+  newly fired / no longer fired signals, band and score change
+- An immaterial delta reuses the prior decision (no model call); it is audited again against the
+  new case version with decision_mode "reused"
+- A material delta sends the model a compact "prior decision + delta" prompt ("incremental")
+- No usable prior, a large delta or mode=full falls back to the full case prompt ("full")
+Every decision records the decision it was based on (prior_decision_uid).
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .audit_writer import audit_writer
+from .case import timeline_event_ids
+from .models import CaseSnapshot
+
+# full | incremental (default mode of /ai_decision; mode=... per request overrides it)
+REDECISION_MODE = os.getenv("REDECISION_MODE", "incremental").lower()
+DECISION_MODES = ("full", "incremental")
+
+# What makes a delta material (the model is asked again)
+REDECISION_SCORE_DELTA = int(os.getenv("REDECISION_SCORE_DELTA", "10"))          # risk score points vs the prior basis
+REDECISION_MAX_AGE_HOURS = float(os.getenv("REDECISION_MAX_AGE_HOURS", "24"))    # older priors are always re-run
+
+# More new events than this and the delta prompt saves little: send the full case
+REDECISION_MAX_DELTA_EVENTS = int(os.getenv("REDECISION_MAX_DELTA_EVENTS", "20"))
+
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+# The account's newest AI decision + the case content it was based on, or None.
+# A reused decision points at the case its answer was actually made on (basis_case_version), so
+# small immaterial deltas can't pile up unnoticed across a chain of reuses.
+def load_prior_decision(db: Session, account_id: str) -> Optional[Dict[str, Any]]:
+    latest = audit_writer.latest_decision_for_account(db, account_id)
+    if latest is None:
+        return None
+    decision_uid, decided_at, context = latest
+    decided_at = context.get("basis_decided_at") or decided_at   # age of the answer, not of its latest reuse
+    basis_version = context.get("basis_case_version") or context.get("case_version")
+    if not context.get("ai_output") or basis_version is None:
+        return None   # written before ai_output was stored, nothing to reuse or summarize
+
+    basis = (
+        db.query(CaseSnapshot)
+        .filter(CaseSnapshot.account_id == account_id)
+        .filter(CaseSnapshot.version == int(basis_version))
+        .first()
+    )
+    if basis is None:
+        return None   # snapshot pruned (not pinned); can't diff against it
+    return {
+        "decision_uid": decision_uid,
+        "decided_at": _as_utc(decided_at),
+        "context": context,
+        "basis_case_version": int(basis_version),
+        "basis": basis.snapshot or {},
+    }
+
+
+# What changed between the case a prior decision saw and the current one
+def compute_delta(basis: Dict[str, Any], case_obj: Dict[str, Any]) -> Dict[str, Any]:
+    old_ids = set(timeline_event_ids(basis))   # older versions only keep the ids
+    timeline = case_obj.get("timeline", [])
+    new_ids = {t["event_id"] for t in timeline}
+
+    old_risk = basis.get("risk_assessment", {})
+    risk = case_obj.get("risk_assessment", {})
+    old_fired = old_risk.get("fired_signals", [])
+    fired = risk.get("fired_signals", [])
+
+    return {
+        "new_events": [t for t in timeline if t["event_id"] not in old_ids],
+        "expired_event_ids": sorted(old_ids - new_ids),
+        "signals_added": [s for s in fired if s not in old_fired],
+        "signals_removed": [s for s in old_fired if s not in fired],
+        "risk_band": {"from": old_risk.get("risk_band"), "to": risk.get("risk_band")},
+        "risk_score": {"from": old_risk.get("risk_score"), "to": risk.get("risk_score")},
+    }
+
+
+# Why a delta needs a new model answer (empty list = the prior decision still stands)
+def material_reasons(prior: Dict[str, Any], delta: Dict[str, Any], policy_version: str) -> List[str]:
+    context = prior["context"]
+    reasons = []
+    if delta["risk_band"]["from"] != delta["risk_band"]["to"]:
+        reasons.append(f"risk band {delta['risk_band']['from']} -> {delta['risk_band']['to']}")
+    if delta["signals_added"]:
+        reasons.append(f"new signals {delta['signals_added']}")
+    if delta["signals_removed"]:
+        reasons.append(f"signals no longer firing {delta['signals_removed']}")
+    score_change = abs((delta["risk_score"]["to"] or 0) - (delta["risk_score"]["from"] or 0))
+    if score_change >= REDECISION_SCORE_DELTA:
+        reasons.append(f"risk score moved {score_change} points")
+    expired_evidence = set(delta["expired_event_ids"]) & set(context.get("evidence_event_ids") or [])
+    if expired_evidence:
+        reasons.append(f"evidence events aged out {sorted(expired_evidence)}")
+    if context.get("policy_version") != policy_version:
+        reasons.append("policy documents changed")
+    if float(context["ai_output"].get("confidence", 0.0)) <= 0.0:
+        reasons.append("prior AI answer was the fail-safe (invalid model output)")
+    decided_at = prior["decided_at"]
+    if decided_at is None or datetime.now(timezone.utc) - decided_at > timedelta(hours=REDECISION_MAX_AGE_HOURS):
+        reasons.append(f"prior decision older than {REDECISION_MAX_AGE_HOURS:g}h")
+    return reasons
+
+
+# How to decide this case: {"mode": full | incremental | reused, "reasons", "prior", "delta"}.
+# Raises ValueError for an unknown mode (-> 400).
+def plan_redecision(db: Session, case_obj: Dict[str, Any], mode: Optional[str], policy_version: str) -> Dict[str, Any]:
+    mode = (mode or REDECISION_MODE).lower()
+    if mode not in DECISION_MODES:
+        raise ValueError(f"Unknown decision mode {mode!r}; expected one of {list(DECISION_MODES)}")
+    prior = load_prior_decision(db, case_obj["account_id"])
+    if mode == "full":
+        return {"mode": "full", "reasons": ["full re-decision requested"], "prior": prior, "delta": None}
+    if prior is None:
+        return {"mode": "full", "reasons": ["no prior decision to build on"], "prior": None, "delta": None}
+    return plan_from_prior(prior, case_obj, policy_version)
+
+
+# The incremental / reused / full choice for a loaded prior decision (no DB access)
+def plan_from_prior(prior: Dict[str, Any], case_obj: Dict[str, Any], policy_version: str) -> Dict[str, Any]:
+    delta = compute_delta(prior["basis"], case_obj)
+    reasons = material_reasons(prior, delta, policy_version)
+    if not reasons:
+        return {"mode": "reused", "reasons": [], "prior": prior, "delta": delta}
+    if len(delta["new_events"]) > REDECISION_MAX_DELTA_EVENTS:
+        reasons.append(f"{len(delta['new_events'])} new events; sending the full case")
+        return {"mode": "full", "reasons": reasons, "prior": prior, "delta": delta}
+    return {"mode": "incremental", "reasons": reasons, "prior": prior, "delta": delta}
+
+
+# (prior AI answer, trace) in the shape generate_ai_reasoning_with_trace returns; no model is called.
+# Guardrails still run on it against the current case.
+def reuse_prior_decision(plan: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    context = plan["prior"]["context"]
+    trace = {
+        "ai_tier": context.get("ai_tier"),     # who made the answer being reused
+        "ai_model": context.get("ai_model"),
+        "ai_tier_latency_ms": {},
+        "ai_escalation_reasons": [],
+    }
+    return dict(context["ai_output"]), trace
+
+
+# Small, JSON-safe description of a plan for the response and the audit row
+def plan_summary(plan: Dict[str, Any]) -> Dict[str, Any]:
+    prior, delta = plan["prior"], plan["delta"]
+    return {
+        "decision_mode": plan["mode"],
+        "prior_decision_uid": prior["decision_uid"] if prior else None,
+        "basis_case_version": prior["basis_case_version"] if prior else None,
+        "reasons": plan["reasons"],
+        "delta": {
+            "new_event_ids": [t["event_id"] for t in delta["new_events"]],
+            "expired_event_ids": delta["expired_event_ids"],
+            "signals_added": delta["signals_added"],
+            "signals_removed": delta["signals_removed"],
+            "risk_band": delta["risk_band"],
+            "risk_score": delta["risk_score"],
+        } if delta else None,
+    }
@@ -6,14 +6,18 @@ Risk scoring engine. Guardrails for auditability:
 """
 
 from typing import Dict, Any, List, Tuple
+from .signals import rule_registry
 
 # Define the weight of each signal
+# (defaults; weights in rules/signal_rules.yaml take precedence when the rule file is loaded)
 SIGNAL_WEIGHTS: Dict[str, int] = {
     "NEW_DEVICE_LOGIN": 25,
     "PROFILE_CHANGE": 15,
     "LARGE_TRANSACTION": 25,
     "NEW_PAYEE_LARGE_TRANSFER": 30,
     "PROFILE_CHANGE_AND_TRANSFER_24HR": 35,
+    "SHARED_DEVICE": 30,         # cross-account (app.entity_links)
+    "SHARED_PAYEE_FANIN": 30,
 }
 
 
@@ -23,16 +27,25 @@ LOW_MAX = 39
 MEDIUM_MAX = 69
 
 
+# Weights currently in force: the rule file's weights over the defaults above
+def current_signal_weights() -> Dict[str, int]:
+    ruleset = rule_registry.current()
+    if ruleset is None:
+        return SIGNAL_WEIGHTS
+    return {**SIGNAL_WEIGHTS, **ruleset.weights}
+
+
 # Convert the signals to a score, and return total score, breakdown and which signal(s) was fired
 def score_signals(signals: List[Dict[str, Any]]) -> Tuple[int, Dict[str, int], List[str]]:
     
     breakdown: Dict[str, int] = {}
     fired: List[str] = []  # for each fired signal
+    weights = current_signal_weights()
 
     #Loop through each signal and its weight
     for s in signals:
         name = s.get("signal_name", "UNKNOWN_SIGNAL")   # if the signal is unknown--to prevent crashes
-        points = SIGNAL_WEIGHTS.get(name, 5)  # Unknown signals will be assigned small default weight
+        points = weights.get(name, 5)  # Unknown signals will be assigned small default weight
 
         # Add the weight for each signal that occurred to breakdown dict
         breakdown[name] = breakdown.get(name, 0) + points  #Duplicate signals will increase score
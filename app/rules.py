@@ -0,0 +1,322 @@
+"""
+Declarative signal rules (rules/signal_rules.yaml) compiled into a single-pass evaluator.
+- Rules are data: per-event predicates, first-seen sets and windowed sequences
+- Compilation turns each rule into small closures and groups them by event_type, so evaluating
+  N rules is one pass over the events with a dict lookup per event (not N passes / N if-branches)
+- The registry reloads the rule file when it changes; a broken edit keeps the last good rule set
+The output format is the same as the built-in engine in app.signals (signal_name, why_it_fired,
+evidence_event_ids), and scripts/verify_signal_rules.py checks they agree.
+"""
+
+import hashlib
+import json
+import logging
+import operator
+import string
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+RULE_TYPES = ("event", "first_seen", "sequence")
+DEFAULT_WEIGHT = 5   # same as risk.score_signals for unknown signals
+
+
+class RuleError(ValueError):
+    """Invalid rule definition."""
+
+
+# Handler signature: (event, payload, per-rule state list, output list) -> None
+Handler = Callable[[Any, Dict[str, Any], List[Any], List[Dict[str, Any]]], None]
+
+
+class _TemplateContext(dict):
+    # Missing template fields render as "None", like an f-string over payload.get(...)
+    def __missing__(self, key: str) -> None:
+        return None
+
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float))
+
+
+_COMPARE = {"gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+def _resolve(value: Any, params: Dict[str, Any]) -> Any:
+    if isinstance(value, str) and value.startswith("$"):
+        name = value[1:]
+        if name not in params:
+            raise RuleError(f"Unknown param reference: {value}")
+        return params[name]
+    return value
+
+
+def _compile_condition(cond: Dict[str, Any], params: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    if not isinstance(cond, dict) or "field" not in cond or "op" not in cond:
+        raise RuleError(f"Condition needs 'field' and 'op': {cond}")
+    name, op = cond["field"], cond["op"]
+    value = _resolve(cond.get("value"), params)
+
+    if op in _COMPARE:
+        compare = _COMPARE[op]
+        return lambda p: _is_number(p.get(name)) and compare(p.get(name), value)
+    if op == "eq":
+        return lambda p: p.get(name) == value
+    if op == "ne":
+        return lambda p: p.get(name) != value
+    if op == "in":
+        allowed = set(value or [])
+        return lambda p: p.get(name) in allowed
+    if op == "not_in":
+        blocked = set(value or [])
+        return lambda p: p.get(name) not in blocked
+    if op == "exists":
+        return lambda p: bool(p.get(name))
+    if op == "is_number":
+        return lambda p: _is_number(p.get(name))
+    if op == "contains":
+        return lambda p: isinstance(p.get(name), (list, str)) and value in p.get(name)
+    raise RuleError(f"Unknown condition op: {op}")
+
+
+def _compile_conditions(conds: Optional[List[Dict[str, Any]]], params: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    checks = [_compile_condition(c, params) for c in (conds or [])]
+    if not checks:
+        return lambda p: True
+    if len(checks) == 1:
+        return checks[0]
+    return lambda p: all(check(p) for check in checks)
+
+
+def _condition_fields(conds: Optional[List[Dict[str, Any]]]) -> Set[str]:
+    return {c["field"] for c in (conds or []) if isinstance(c, dict) and "field" in c}
+
+
+def _template_fields(template: str) -> Set[str]:
+    return {f for _, f, _, _ in string.Formatter().parse(template) if f}
+
+
+@dataclass
+class CompiledRuleSet:
+    version: str                                   # content hash of the rule file
+    params: Dict[str, Any]
+    weights: Dict[str, int]                        # signal_name -> risk weight
+    rule_names: List[str]
+    dispatch: Dict[str, List[Handler]]             # event_type -> handlers, in rule order
+    state_factories: List[Callable[[], Any]]       # fresh per-rule state for each evaluation
+    payload_fields: Set[str] = field(default_factory=set)   # payload keys any rule reads
+
+    # One pass over the events (oldest first)
+    def evaluate(self, events: Iterable[Any]) -> List[Dict[str, Any]]:
+        state = [factory() for factory in self.state_factories]
+        out: List[Dict[str, Any]] = []
+        dispatch = self.dispatch
+
+        for e in events:
+            handlers = dispatch.get(e.event_type)
+            if not handlers:
+                continue
+            payload = e.payload if isinstance(e.payload, dict) else {}
+            for handler in handlers:
+                handler(e, payload, state, out)
+
+        # Cleanup to remove duplicates, same as the built-in engine
+        deduped = []
+        seen = set()
+        for s in out:
+            key = (s["signal_name"], tuple(s["evidence_event_ids"]))
+            if key not in seen:
+                seen.add(key)
+                deduped.append(s)
+        return deduped
+
+
+def _why(template: str, payload: Dict[str, Any], defaults: Dict[str, Any], constants: Dict[str, Any]) -> str:
+    ctx = _TemplateContext(constants)
+    ctx.update(defaults)
+    ctx.update(payload)
+    return template.format_map(ctx)
+
+
+def compile_ruleset(spec: Dict[str, Any], constants: Optional[Dict[str, Any]] = None, version: str = "inline") -> CompiledRuleSet:
+    if not isinstance(spec, dict) or not isinstance(spec.get("rules"), list):
+        raise RuleError("Rule file must have a 'rules' list")
+
+    params = dict(spec.get("params") or {})
+    template_constants = {**(constants or {}), **params}
+    dispatch: Dict[str, List[Handler]] = {}
+    state_factories: List[Callable[[], Any]] = []
+    weights: Dict[str, int] = {}
+    names: List[str] = []
+    payload_fields: Set[str] = set()
+
+    def register(event_type: str, handler: Handler) -> None:
+        dispatch.setdefault(event_type, []).append(handler)
+
+    for idx, rule in enumerate(spec["rules"]):
+        if not isinstance(rule, dict):
+            raise RuleError(f"Rule #{idx} must be a mapping")
+        name = rule.get("name")
+        kind = rule.get("type")
+        if not name or kind not in RULE_TYPES:
+            raise RuleError(f"Rule #{idx} needs a name and a type in {RULE_TYPES}")
+        if name in weights:
+            raise RuleError(f"Duplicate rule name: {name}")
+
+        weights[name] = int(rule.get("weight", DEFAULT_WEIGHT))
+        names.append(name)
+        defaults = dict(rule.get("defaults") or {})
+        template = str(rule.get("why", name + " fired."))
+        payload_fields |= _template_fields(template) - set(template_constants)
+
+        # ----- per-event predicate -----
+        if kind == "event":
+            if not rule.get("event_type"):
+                raise RuleError(f"{name}: 'event' rules need an event_type")
+            matches = _compile_conditions(rule.get("when"), params)
+            payload_fields |= _condition_fields(rule.get("when"))
+            state_factories.append(lambda: None)
+
+            def handler(e, payload, state, out, name=name, matches=matches, template=template, defaults=defaults):
+                if matches(payload):
+                    out.append({
+                        "signal_name": name,
+                        "why_it_fired": _why(template, payload, defaults, template_constants),
+                        "evidence_event_ids": [e.id],
+                    })
+            register(rule["event_type"], handler)
+
+        # ----- first time a key value is seen -----
+        elif kind == "first_seen":
+            key = rule.get("key")
+            if not rule.get("event_type") or not key:
+                raise RuleError(f"{name}: 'first_seen' rules need an event_type and a key")
+            matches = _compile_conditions(rule.get("when"), params)
+            tracks = _compile_conditions(rule.get("track_when"), params)
+            payload_fields |= {key} | _condition_fields(rule.get("when")) | _condition_fields(rule.get("track_when"))
+            state_factories.append(set)
+
+            def handler(e, payload, state, out, idx=idx, name=name, key=key, matches=matches, tracks=tracks,
+                        template=template, defaults=defaults):
+                value = payload.get(key)
+                if not value or not tracks(payload):
+                    return
+                known = state[idx]
+                if value not in known and matches(payload):
+                    out.append({
+                        "signal_name": name,
+                        "why_it_fired": _why(template, payload, defaults, template_constants),
+                        "evidence_event_ids": [e.id],
+                    })
+                known.add(value)
+            register(rule["event_type"], handler)
+
+        # ----- `then` within a window after the most recent `first` -----
+        else:
+            first, then = rule.get("first") or {}, rule.get("then") or {}
+            if not first.get("event_type") or not then.get("event_type"):
+                raise RuleError(f"{name}: 'sequence' rules need first.event_type and then.event_type")
+            window = timedelta(hours=float(_resolve(rule.get("within_hours", 24), params)))
+            first_matches = _compile_conditions(first.get("when"), params)
+            then_matches = _compile_conditions(then.get("when"), params)
+            payload_fields |= _condition_fields(first.get("when")) | _condition_fields(then.get("when"))
+            state_factories.append(lambda: [None, None])   # (created_at, event id) of the latest `first`
+
+            # `then` is registered before `first` so an event never pairs with itself
+            def then_handler(e, payload, state, out, idx=idx, name=name, window=window, matches=then_matches,
+                             template=template, defaults=defaults):
+                first_at, first_id = state[idx]
+                if first_at is None or first_id is None or e.created_at is None or not matches(payload):
+                    return
+                if e.created_at - first_at <= window:
+                    out.append({
+                        "signal_name": name,
+                        "why_it_fired": _why(template, payload, defaults, template_constants),
+                        "evidence_event_ids": [first_id, e.id],
+                    })
+
+            def first_handler(e, payload, state, out, idx=idx, matches=first_matches):
+                if matches(payload):
+                    state[idx] = [e.created_at, e.id]
+
+            register(then["event_type"], then_handler)
+            register(first["event_type"], first_handler)
+
+    return CompiledRuleSet(
+        version=version,
+        params=params,
+        weights=weights,
+        rule_names=names,
+        dispatch=dispatch,
+        state_factories=state_factories,
+        payload_fields=payload_fields,
+    )
+
+
+# Parse a YAML or JSON rule file and compile it
+def load_ruleset(path: Path, constants: Optional[Dict[str, Any]] = None) -> CompiledRuleSet:
+    raw = path.read_bytes()
+    if path.suffix.lower() in (".yaml", ".yml"):
+        import yaml   # only needed when rules are written in YAML
+        spec = yaml.safe_load(raw)
+    else:
+        spec = json.loads(raw)
+    version = hashlib.sha256(raw).hexdigest()[:12]
+    return compile_ruleset(spec, constants=constants, version=version)
+
+
+class RuleRegistry:
+    """
+    Holds the active compiled rule set and hot-reloads it when the file's mtime changes
+    (checked at most every `check_interval` seconds). No file = None (callers use the built-in engine).
+    """
+
+    def __init__(self, path: Path, constants: Optional[Dict[str, Any]] = None, check_interval: float = 2.0):
+        self.path = path
+        self.constants = constants or {}
+        self.check_interval = check_interval
+        self._ruleset: Optional[CompiledRuleSet] = None
+        self._mtime: Optional[int] = None
+        self._last_check = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[CompiledRuleSet]:
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self._maybe_reload()
+        return self._ruleset
+
+    def version(self) -> str:
+        ruleset = self.current()
+        return ruleset.version if ruleset is not None else "builtin"
+
+    def _maybe_reload(self) -> None:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            if self._ruleset is not None:
+                logger.warning("Signal rule file %s removed; using built-in signals", self.path)
+            self._ruleset, self._mtime = None, None
+            return
+
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                ruleset = load_ruleset(self.path, self.constants)
+            except Exception:
+                # Keep serving the last good rules; retry only once the file changes again
+                logger.exception("Failed to load signal rules from %s; keeping previous rule set", self.path)
+            else:
+                logger.info("Loaded signal rules %s (version %s, %d rules)", self.path, ruleset.version, len(ruleset.rule_names))
+                self._ruleset = ruleset
+            self._mtime = mtime
@@ -3,7 +3,7 @@ Pydantic schemas to validate all requests and ensure they have the required stru
 """
 
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 
@@ -11,4 +11,5 @@ class EventCreate(BaseModel):
     event_type: str
     account_id: str
     event_timestamp: datetime
-    payload: Dict[str, Any]
\ No newline at end of file
+    payload: Dict[str, Any]
+    idempotency_key: Optional[str] = None   # producer retry key; derived from the event content if omitted
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Fast JSON response path for large payloads (cases with big timelines, AI decisions, feedback summary).
+- orjson encodes dicts/lists/datetimes natively in C (same ISO-8601 output as FastAPI's encoder)
+- Endpoints return FastJSONResponse for dicts we built ourselves, which skips FastAPI's
+  jsonable_encoder walk and response_model re-validation
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+# Types orjson doesn't handle natively
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
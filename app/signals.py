@@ -2,21 +2,114 @@
 Signal extraction engine. The goal is:
 - Convert raw events into explainable signals.
 - Output the signals with event IDs as evidence so that a human can verify and make informed decisions.
+- Add the cross-account signals (SHARED_DEVICE, SHARED_PAYEE_FANIN) from the entity index in
+  app.entity_links; the rules themselves only ever see one account's events.
+- Read events as light EventRecords (only the columns and payload keys the rules use, pulled out
+  of the JSON by SQLite) instead of full ORM objects.
 """
 
 
 # Import dependencies
+import json
+import os
+import sqlite3
+import sys
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, List, Set, Tuple
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Set, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import String, desc, literal, select
+from .entity_links import LINK_PAYLOAD_FIELDS, shared_entity_signals
 from .models import Event
+from .rules import RuleRegistry
 
 # Define thresholds
+# (used by the built-in engine below; the declarative rule file carries its own copies in `params`)
 LARGE_TXN_THRESHOLD = 3000 # This is in CAD
 LOOKBACK_DAYS = 30  # How far back in (days) the AI should check for
 PROFILE_CHANGE_WINDOW_HOURS = 24  # Check if profile was changed (24 hours)
 
+# Declarative rules (see rules/signal_rules.yaml), hot-reloaded when the file changes.
+# If the file is missing, the built-in engine below is used.
+RULES_PATH = Path(os.getenv(
+    "SIGNAL_RULES_PATH",
+    str(Path(__file__).resolve().parent.parent / "rules" / "signal_rules.yaml"),
+))
+rule_registry = RuleRegistry(RULES_PATH, constants={"lookback_days": LOOKBACK_DAYS})
+
+
+# Payload keys the built-in engine reads
+BUILTIN_PAYLOAD_FIELDS = ("device_id", "amount", "currency", "counterparty", "changed_fields")
+
+# SQLite's `->` operator (3.38+) returns a key's JSON text, or NULL when the key is missing, so
+# missing and JSON null stay distinct. Older SQLite falls back to loading the whole payload.
+JSON_ARROW_SUPPORTED = sqlite3.sqlite_version_info >= (3, 38, 0)
+
+
+class EventRecord:
+    """
+    The four attributes the signal engine reads, without ORM identity-map/state tracking.
+    `payload` only holds the keys the rules use.
+    """
+
+    __slots__ = ("id", "event_type", "created_at", "payload")
+
+    def __init__(self, id: int, event_type: str, created_at: Optional[datetime], payload: Optional[Dict[str, Any]]):
+        self.id = id
+        self.event_type = event_type
+        self.created_at = created_at
+        self.payload = payload
+
+
+# Payload keys the active rules read (rule file if loaded, else the built-in engine's),
+# plus the device / payee keys the cross-account signals look up
+def signal_payload_fields() -> Tuple[str, ...]:
+    ruleset = rule_registry.current()
+    if ruleset is None:
+        return BUILTIN_PAYLOAD_FIELDS   # already has them
+    return tuple(sorted(set(ruleset.payload_fields) | set(LINK_PAYLOAD_FIELDS)))
+
+
+# Columns to select for EventRecords: id, event_type, created_at, then one column per payload key
+def event_record_columns(fields: Sequence[str]) -> List[Any]:
+    columns = [Event.id, Event.event_type, Event.created_at]
+    if not JSON_ARROW_SUPPORTED:
+        return columns + [Event.payload]
+    return columns + [
+        Event.payload.op("->", return_type=String)(literal('$."' + f.replace('"', '""') + '"')).label(f"p_{i}")
+        for i, f in enumerate(fields)
+    ]
+
+
+# Build an EventRecord from a row selected with event_record_columns (extra leading columns allowed)
+def to_event_record(row: Sequence[Any], fields: Sequence[str], offset: int = 0) -> EventRecord:
+    event_id, event_type, created_at = row[offset], row[offset + 1], row[offset + 2]
+    values = row[offset + 3:]
+    if not JSON_ARROW_SUPPORTED:
+        full = values[0] if isinstance(values[0], dict) else {}
+        payload = {f: full[f] for f in fields if f in full}
+    else:
+        payload = {}
+        for f, raw in zip(fields, values):
+            if raw is not None:
+                value = json.loads(raw)
+                payload[f] = sys.intern(value) if isinstance(value, str) else value
+    # event types, currencies, device ids and payees repeat across events: share one str each
+    return EventRecord(event_id, sys.intern(event_type) if event_type else event_type, created_at, payload)
+
+
+# Lightweight version of fetch_recent_events: same events and order, as EventRecords
+def fetch_recent_event_records(db: Session, account_id: str) -> List[EventRecord]:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)
+    fields = signal_payload_fields()
+    rows = db.execute(
+        select(*event_record_columns(fields))
+        .where(Event.account_id == account_id)
+        .where(Event.created_at >= cutoff)
+        .order_by(Event.created_at.asc())
+    )
+    return [to_event_record(row, fields) for row in rows]
+
 
 # Define a helper function to read from payload
 def _safe_get (payload: Dict [str, Any], key: str, default = None):
@@ -37,8 +130,22 @@ def fetch_recent_events(db: Session, account_id: str) -> List[Event]:
 
 # Function to build all the signals and return a dictionary format for the API
 def build_signals(db: Session, account_id: str) -> List[Dict[str, Any]]:
-    events = fetch_recent_events(db, account_id)
+    events = fetch_recent_event_records(db, account_id)
+    return compute_signals(events) + shared_entity_signals(db, account_id, events)
+
+
+# Run the signal rules over events already in memory (ORM rows or case timeline records),
+# oldest first. Each event only needs id, event_type, created_at and payload.
+def compute_signals(events: Iterable[Any]) -> List[Dict[str, Any]]:
+    ruleset = rule_registry.current()
+    if ruleset is not None:
+        return ruleset.evaluate(events)
+    return compute_signals_builtin(events)
+
 
+# The original hardcoded five signals. Fallback when no rule file is present, and the
+# reference the compiled rules are verified against (scripts/verify_signal_rules.py).
+def compute_signals_builtin(events: Iterable[Any]) -> List[Dict[str, Any]]:
     # Track known devices and counterparties seen hostorically (within Lookback period of 30 days)
     known_devices: Set[str] = set()
     known_recipients: Set[str] = set()
@@ -4,10 +4,27 @@ What this does is:
 - Make the system operational, especially if account needs freezing or SAR needs to be filed immediately.
 - Assign deadlines based on workflow path.
 - Compute SLA status (on track / due soon / breached).
+- Persist due times per routed case and sweep statuses in the background, so the queue
+  ("what breaches in the next 2 hours?") is one indexed query instead of re-running decisions.
+- Keep one open SLA per account: a decision on a newer case version supersedes the older
+  versions' open rows and inherits the earliest of their deadlines, so new events never push
+  the clock back. Closed rows (RESOLVED / SUPERSEDED) are never reopened.
 """
 
+import logging
+import os
+import threading
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import CaseSla
+from .pagination import encode_cursor, decode_cursor
+
+logger = logging.getLogger(__name__)
 
 # SLA rules by routed workflow path
 # Hours allowed before breach
@@ -21,6 +38,13 @@ SLA_BY_PATH_HOURS = {
 # If due within <= 2 hours, mark as DUE_SOON
 DUE_SOON_HOURS = 2
 
+# How often the background sweeper updates persisted SLA statuses
+SLA_SWEEP_INTERVAL_SECONDS = float(os.getenv("SLA_SWEEP_INTERVAL_SECONDS", "30"))
+
+OPEN_STATUSES = ("ON_TRACK", "DUE_SOON", "BREACHED")
+# RESOLVED: an analyst acted. SUPERSEDED: a newer case version of the account took over.
+CLOSED_STATUSES = ("RESOLVED", "SUPERSEDED")
+
 
 #SLA compute fields for case: sla due at and sla status of on_track, due_soon, breached or no_sla
 def assign_sla(created_at: datetime, routed_path: str) -> Dict[str, Any]:
@@ -57,4 +81,212 @@ def assign_sla(created_at: datetime, routed_path: str) -> Dict[str, Any]:
     return {
         "sla_due_at": sla_due_at,
         "sla_status": status
-    }
\ No newline at end of file
+    }
+
+
+#-----------PERSISTED SLA QUEUE--------
+def _as_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt.replace(tzinfo=timezone.utc) if dt is not None and dt.tzinfo is None else dt
+
+
+def _status_at(sla_due_at: datetime, now: datetime) -> str:
+    if now > sla_due_at:
+        return "BREACHED"
+    return "DUE_SOON" if sla_due_at - now <= timedelta(hours=DUE_SOON_HOURS) else "ON_TRACK"
+
+
+# Store (or update) the SLA for a routed case and return the SLA as stored. Caller commits,
+# together with the audit row.
+# Other open rows of the account (older case versions) are marked SUPERSEDED, and the case keeps
+# the earliest of their deadlines. MONITOR has no SLA, so it only closes the open rows.
+# A closed row (analyst already acted) is left alone and returned as is.
+def upsert_case_sla(db: Session, case_id: str, account_id: str, created_at: datetime, routed_path: str, sla: Dict[str, Any]) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    existing = db.query(CaseSla).filter(CaseSla.case_id == case_id).first()
+    if existing is not None and (existing.resolved_at is not None or existing.sla_status in CLOSED_STATUSES):
+        return {"sla_due_at": _as_utc(existing.sla_due_at), "sla_status": existing.sla_status}
+
+    older: List[CaseSla] = (
+        db.query(CaseSla)
+        .filter(CaseSla.account_id == account_id)
+        .filter(CaseSla.case_id != case_id)
+        .filter(CaseSla.sla_status.in_(OPEN_STATUSES))
+        .all()
+    )
+    for row in older:
+        row.sla_status = "SUPERSEDED"
+        row.status_updated_at = now
+
+    # MONITOR has no SLA; a re-decision to MONITOR clears any open deadline
+    if sla.get("sla_due_at") is None:
+        if existing is not None:
+            db.delete(existing)
+        return sla
+
+    due_at, counted_from = sla["sla_due_at"], created_at
+    earliest = min(older, key=lambda row: _as_utc(row.sla_due_at), default=None)
+    if earliest is not None and _as_utc(earliest.sla_due_at) < due_at:
+        due_at, counted_from = _as_utc(earliest.sla_due_at), earliest.created_at
+
+    if existing is None:
+        existing = CaseSla(case_id=case_id, account_id=account_id)
+        db.add(existing)
+
+    existing.routed_path = routed_path
+    existing.created_at = counted_from
+    existing.sla_due_at = due_at
+    existing.sla_status = _status_at(due_at, now)
+    existing.status_updated_at = now
+    return {"sla_due_at": due_at, "sla_status": existing.sla_status}
+
+
+# An analyst acted on the case, so the account's SLA clock stops (the case's own row, plus the
+# open row of a newer version if the analyst worked from an older one). Caller commits.
+def resolve_case_sla(db: Session, case_id: str) -> None:
+    row = db.query(CaseSla.account_id).filter(CaseSla.case_id == case_id).first()
+    if row is None:
+        return
+    now = datetime.now(timezone.utc)
+    (
+        db.query(CaseSla)
+        .filter(CaseSla.account_id == row[0])
+        .filter(CaseSla.sla_status.in_(OPEN_STATUSES))
+        .update(
+            {CaseSla.sla_status: "RESOLVED", CaseSla.resolved_at: now, CaseSla.status_updated_at: now},
+            synchronize_session=False,
+        )
+    )
+
+
+# One-off cleanup for rows written before SLAs were kept one per account: every open row except
+# each account's newest is marked SUPERSEDED. Returns the number of rows closed.
+def supersede_duplicate_slas(db: Session) -> int:
+    newest = (
+        db.query(func.max(CaseSla.id))
+        .filter(CaseSla.sla_status.in_(OPEN_STATUSES))
+        .group_by(CaseSla.account_id)
+    )
+    closed = (
+        db.query(CaseSla)
+        .filter(CaseSla.sla_status.in_(OPEN_STATUSES))
+        .filter(CaseSla.id.notin_(newest.scalar_subquery()))
+        .update(
+            {CaseSla.sla_status: "SUPERSEDED", CaseSla.status_updated_at: datetime.now(timezone.utc)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return closed
+
+
+# One range update per tick on (sla_status, sla_due_at): anything open and due within
+# DUE_SOON_HOURS moves to DUE_SOON, anything past due moves to BREACHED.
+def sweep_sla_statuses(db: Session, now: Optional[datetime] = None) -> int:
+    now = now or datetime.now(timezone.utc)
+    soon = now + timedelta(hours=DUE_SOON_HOURS)
+
+    updated = (
+        db.query(CaseSla)
+        .filter(CaseSla.sla_status.in_(("ON_TRACK", "DUE_SOON")))
+        .filter(CaseSla.sla_due_at <= soon)
+        .filter(or_(CaseSla.sla_status == "ON_TRACK", CaseSla.sla_due_at < now))   # skip DUE_SOON rows that stay DUE_SOON
+        .update(
+            {
+                CaseSla.sla_status: case((CaseSla.sla_due_at < now, "BREACHED"), else_="DUE_SOON"),
+                CaseSla.status_updated_at: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return updated
+
+
+# Open SLAs ordered by due time (keyset pagination on sla_due_at, id)
+# Raises ValueError for a malformed cursor.
+def list_sla_queue(
+    db: Session,
+    status: Optional[str] = None,
+    due_within_hours: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    query = db.query(CaseSla)
+    query = query.filter(CaseSla.sla_status == status) if status else query.filter(CaseSla.sla_status.in_(OPEN_STATUSES))
+    if due_within_hours is not None:
+        query = query.filter(CaseSla.sla_due_at <= datetime.now(timezone.utc) + timedelta(hours=due_within_hours))
+
+    after = decode_cursor(cursor)
+    if after is not None:
+        try:
+            after_due = datetime.fromisoformat(str(after["sla_due_at"]))
+            after_id = int(after["id"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+        query = query.filter(or_(
+            CaseSla.sla_due_at > after_due,
+            and_(CaseSla.sla_due_at == after_due, CaseSla.id > after_id),
+        ))
+
+    rows = query.order_by(CaseSla.sla_due_at.asc(), CaseSla.id.asc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor({"sla_due_at": rows[-1].sla_due_at.isoformat(), "id": rows[-1].id})
+
+    return {
+        "items": [
+            {
+                "case_id": r.case_id,
+                "account_id": r.account_id,
+                "routed_path": r.routed_path,
+                "created_at": r.created_at,
+                "sla_due_at": r.sla_due_at,
+                "sla_status": r.sla_status,
+            }
+            for r in rows
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+class SlaSweeper:
+    """
+    Background thread that runs sweep_sla_statuses every SLA_SWEEP_INTERVAL_SECONDS.
+    """
+
+    def __init__(self, interval_seconds: float = SLA_SWEEP_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sla-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                updated = sweep_sla_statuses(db)
+                if updated:
+                    logger.info("SLA sweep updated %d case(s)", updated)
+            except Exception:
+                logger.exception("SLA sweep failed")
+                db.rollback()
+            finally:
+                db.close()
+            self._stop.wait(self.interval_seconds)
+
+
+sla_sweeper = SlaSweeper()
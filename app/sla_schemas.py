@@ -0,0 +1,21 @@
+"""
+Pydantic schemas for the persisted SLA queue.
+"""
+
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+
+class SlaQueueItem(BaseModel):
+    case_id: str
+    account_id: str
+    routed_path: str
+    created_at: Optional[datetime]
+    sla_due_at: datetime
+    sla_status: str              # ON_TRACK | DUE_SOON | BREACHED | RESOLVED | SUPERSEDED
+
+
+class SlaQueueOut(BaseModel):
+    items: List[SlaQueueItem]    # ordered by sla_due_at (soonest first)
+    next_cursor: Optional[str]   # pass back as cursor for the next page
@@ -0,0 +1,299 @@
+"""
+Real-time signal push. Instead of waiting for someone to poll /signals/{account_id}:
+- Each ingested event marks its account for evaluation; background workers refresh the account's
+  case snapshot (incremental, see app.case), off the request path
+- Events that arrive for an account while it waits or is being evaluated are folded into its
+  next refresh, so a busy account costs one refresh per worker pass, not one per event
+- Newly fired signals and risk-band transitions are published to subscribers. "New" is relative
+  to what the stream already announced for the account (published_signal_state), not to the
+  previous case snapshot: a /case or /ai_decision call can refresh the snapshot first
+- Subscribers connect over Server-Sent Events (GET /stream/signals), filtered by band/signal
+Slow consumers never block ingestion: each subscriber has a bounded queue, the oldest
+messages are dropped when it is full, and the client is told how many it missed.
+The broker is in-process, so each API worker streams the events it ingested.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+from .case import latest_case_snapshot, refresh_case_snapshot
+from .models import PublishedSignalState
+
+logger = logging.getLogger(__name__)
+
+# Evaluate signals for ingested events (keeps case snapshots warm too)
+EVALUATE_SIGNALS_ON_INGEST = os.getenv("EVALUATE_SIGNALS_ON_INGEST", "1") == "1"
+
+# Background threads doing that evaluation; one account is only ever evaluated by one of them
+INGEST_EVAL_WORKERS = int(os.getenv("INGEST_EVAL_WORKERS", "2"))
+
+# Per-subscriber buffer before the oldest messages are dropped
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "1000"))
+
+# Seconds between SSE keep-alive comments on an idle stream
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, bands: Set[str], signals: Set[str], max_queue: int):
+        self.loop = loop
+        self.bands = bands
+        self.signals = signals
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def wants(self, message: Dict[str, Any]) -> bool:
+        if self.bands and message.get("risk_band") not in self.bands:
+            return False
+        if self.signals and message.get("signal_name") not in self.signals:
+            return False   # a signal filter also hides band_change messages
+        return True
+
+    # Runs on the subscriber's event loop
+    def _put(self, message: Dict[str, Any]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()   # drop oldest, the client gets a "lagged" notice
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class SignalBroker:
+    """
+    Fan-out of detection messages to SSE subscribers. publish() is safe to call from
+    the threadpool that runs sync endpoints.
+    """
+
+    def __init__(self, max_queue: int = STREAM_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, bands: Set[str], signals: Set[str]) -> Subscriber:
+        sub = Subscriber(asyncio.get_running_loop(), bands, signals, self.max_queue)
+        with self._lock:
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        with self._lock:
+            targets = [s for s in self._subscribers if s.wants(message)]
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, message)
+            except RuntimeError:
+                self.unsubscribe(sub)   # its event loop is gone
+
+
+signal_broker = SignalBroker()
+
+
+def _signal_key(s: Dict[str, Any]) -> str:
+    raw = json.dumps([s.get("signal_name"), s.get("evidence_event_ids", [])], separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# (signal keys, band) already announced for the account. Without a stored state, the case as it
+# was before these events is used if no reader has refreshed it since; otherwise nothing, so
+# everything in the case is announced once.
+def _published_baseline(db: Session, account_id: str, first_event_id: int) -> Tuple[Set[str], Optional[str]]:
+    state = db.get(PublishedSignalState, account_id)
+    if state is not None:
+        return set(state.signal_keys or []), state.risk_band
+    before = latest_case_snapshot(db, account_id)
+    if before is not None and (before.last_event_id or 0) < first_event_id:
+        content = before.snapshot or {}
+        return {_signal_key(s) for s in content.get("signals", [])}, content.get("risk_assessment", {}).get("risk_band")
+    return set(), None
+
+
+# Refresh the case after events land and publish what the stream hasn't announced yet.
+# `first_event_id` / `event_id` are the oldest / latest of the events being evaluated.
+# Returns the messages published (empty when nothing new fired).
+def evaluate_ingested_event(
+    db: Session, account_id: str, event_id: int, first_event_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    before_keys, before_band = _published_baseline(db, account_id, first_event_id or event_id)
+
+    after = refresh_case_snapshot(db, account_id)
+    content = after.snapshot or {}
+    risk = content.get("risk_assessment", {})
+    band = risk.get("risk_band")
+    detected_at = datetime.now(timezone.utc).isoformat()
+
+    common = {
+        "account_id": account_id,
+        "case_id": after.case_id,
+        "event_id": event_id,
+        "risk_band": band,
+        "risk_score": risk.get("risk_score"),
+        "detected_at": detected_at,
+    }
+
+    messages: List[Dict[str, Any]] = []
+    keys: List[str] = []
+    for s in content.get("signals", []):
+        key = _signal_key(s)
+        keys.append(key)
+        if key not in before_keys:
+            messages.append({"type": "signal", **common, **s})
+
+    # A first-ever state only counts as a transition if it isn't LOW
+    if band != before_band and (before_band is not None or band != "LOW"):
+        messages.append({"type": "band_change", **common, "from_band": before_band, "to_band": band})
+
+    for m in messages:
+        signal_broker.publish(m)
+
+    state = db.get(PublishedSignalState, account_id) or PublishedSignalState(account_id=account_id)
+    state.signal_keys = sorted(set(keys))
+    state.risk_band = band
+    state.case_version = after.version
+    state.updated_at = datetime.now(timezone.utc)
+    db.add(state)
+    db.commit()
+    return messages
+
+
+class IngestEvaluator:
+    """
+    Runs evaluate_ingested_event off the request path. submit() only records the account and the
+    range of its event ids; worker threads take accounts in arrival order and skip any another
+    worker is still on. An account submitted again while waiting is evaluated once for all of them.
+    """
+
+    def __init__(self, workers: int = INGEST_EVAL_WORKERS):
+        self.workers = max(1, workers)
+        self._pending: Dict[str, Tuple[int, int]] = {}   # account -> (first, latest) event id; insertion order = arrival
+        self._busy: Set[str] = set()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self.evaluated = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        if self._threads:
+            return
+        self._session_factory = session_factory
+        self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"ingest-eval-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # Accounts still waiting are dropped; their snapshots catch up on the next read or sweep
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            dropped = len(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        if dropped:
+            logger.info("Stopped ingest evaluation with %d account(s) still pending", dropped)
+
+    def submit(self, account_id: str, event_id: int) -> None:
+        with self._cond:
+            first, latest = event_id, event_id
+            if account_id in self._pending:
+                self.coalesced += 1
+                first, latest = self._pending[account_id]
+                first, latest = min(first, event_id), max(latest, event_id)
+            self._pending[account_id] = (first, latest)
+            self._cond.notify()
+
+    # Oldest waiting account no worker is on, or None once stopping
+    def _next(self) -> Optional[Tuple[str, Tuple[int, int]]]:
+        with self._cond:
+            while not self._stopping:
+                account_id = next((a for a in self._pending if a not in self._busy), None)
+                if account_id is not None:
+                    self._busy.add(account_id)
+                    return account_id, self._pending.pop(account_id)
+                self._cond.wait()
+            return None
+
+    def _run(self) -> None:
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            account_id, (first_event_id, event_id) = item
+            db = self._session_factory()
+            try:
+                evaluate_ingested_event(db, account_id, event_id, first_event_id)
+                self.evaluated += 1
+            except Exception:
+                self.failed += 1
+                db.rollback()
+                logger.exception("Signal evaluation failed for account %s (event %s)", account_id, event_id)
+            finally:
+                db.close()
+                with self._cond:
+                    self._busy.discard(account_id)
+                    self._cond.notify_all()   # the account may have been submitted again meanwhile
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "workers": len(self._threads),
+            "pending_accounts": pending,
+            "evaluated": self.evaluated,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+        }
+
+
+ingest_evaluator = IngestEvaluator()
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# SSE body for one subscriber; unsubscribes when the client disconnects
+async def stream_events(request: Request, bands: Set[str], signals: Set[str]) -> AsyncIterator[str]:
+    sub = signal_broker.subscribe(bands, signals)
+    try:
+        yield ": connected\n\n"
+        while not await request.is_disconnected():
+            try:
+                message = await asyncio.wait_for(sub.queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            if sub.dropped:
+                yield _sse("lagged", {"dropped": sub.dropped})
+                sub.dropped = 0
+            yield _sse(message["type"], message)
+    finally:
+        signal_broker.unsubscribe(sub)
+
+
+def parse_filter(value: Optional[str]) -> Set[str]:
+    return {v.strip().upper() for v in value.split(",") if v.strip()} if value else set()
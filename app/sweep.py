@@ -0,0 +1,259 @@
+"""
+Portfolio-wide scoring sweep: build_signals + assess_risk for every account with events in the
+lookback window, results stored in account_risk.
+- Every event stores account_bucket = crc32(account_id). Shard s of N owns the bucket range
+  [s * 2^32 / N, (s + 1) * 2^32 / N), and shards run on a process pool, so the sweep scales with
+  cores instead of running on one
+- Each worker opens its own engine and range-scans only its shard's events on the (account_bucket,
+  account_id, created_at, id) index, one account in memory at a time; the cross-account signals
+  are looked up in the entity index over a second connection
+- Results are upserted into account_risk in batches; after each batch the shard writes a JSON
+  checkpoint (last account done), so an interrupted sweep resumes where every shard stopped
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from multiprocessing import get_context
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event, func, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import sessionmaker
+
+from .database import DATABASE_URL, init_db
+from .entity_links import shared_entity_signals
+from .models import AccountRisk, Event, account_bucket
+from .risk import assess_risk
+from .signals import LOOKBACK_DAYS, compute_signals, event_record_columns, signal_payload_fields, to_event_record
+
+logger = logging.getLogger(__name__)
+
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", str(os.cpu_count() or 1)))
+SWEEP_CHECKPOINT_DIR = Path(os.getenv(
+    "SWEEP_CHECKPOINT_DIR",
+    str(Path(__file__).resolve().parent.parent / "db" / "sweeps"),
+))
+SWEEP_BATCH_ACCOUNTS = int(os.getenv("SWEEP_BATCH_ACCOUNTS", "500"))   # accounts per upsert + checkpoint
+SWEEP_PROGRESS_SECONDS = float(os.getenv("SWEEP_PROGRESS_SECONDS", "2"))
+
+
+_BUCKETS = 1 << 32
+SWEEP_SHARDING = "bucket-range"   # recorded in the manifest; a resume must shard the same way
+
+
+# [lo, hi) account_bucket range of a shard
+def shard_range(shard: int, shards: int) -> Tuple[int, int]:
+    return -(-shard * _BUCKETS // shards), -(-(shard + 1) * _BUCKETS // shards)
+
+
+# Shard an account belongs to (the one whose range holds its bucket)
+def shard_of(account_id: Optional[str], shards: int) -> int:
+    return account_bucket(account_id) * shards >> 32
+
+
+def _make_engine(database_url: str):
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        dbapi_conn.create_function("account_bucket", 1, account_bucket, deterministic=True)
+        dbapi_conn.execute("PRAGMA busy_timeout = 30000")   # workers take turns writing
+
+    return engine
+
+
+# Fill account_bucket on events stored before the column existed. Inside SQLite, and a no-op
+# (one index probe) once done.
+def backfill_account_buckets(engine) -> int:
+    with engine.begin() as conn:
+        return conn.execute(
+            update(Event)
+            .where(Event.account_bucket.is_(None))
+            .values(account_bucket=func.account_bucket(Event.account_id))
+        ).rowcount
+
+
+# ---------- checkpoints ----------
+
+def _sweep_dir(sweep_id: str) -> Path:
+    return SWEEP_CHECKPOINT_DIR / sweep_id
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)   # atomic, a crash never leaves half a checkpoint
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def _shard_path(sweep_id: str, shard: int) -> Path:
+    return _sweep_dir(sweep_id) / f"shard-{shard:03d}.json"
+
+
+def read_progress(sweep_id: str) -> Dict[str, Any]:
+    manifest = _read_json(_sweep_dir(sweep_id) / "sweep.json")
+    if manifest is None:
+        raise FileNotFoundError(f"No sweep {sweep_id} in {SWEEP_CHECKPOINT_DIR}")
+    shards = [_read_json(_shard_path(sweep_id, s)) or {} for s in range(manifest["shards"])]
+    return {
+        **manifest,
+        "shards_done": sum(1 for s in shards if s.get("done")),
+        "accounts_done": sum(s.get("accounts_done", 0) for s in shards),
+        "events_done": sum(s.get("events_done", 0) for s in shards),
+    }
+
+
+# ---------- worker ----------
+
+# Score one shard. Runs in a pool process; resumes after the shard's checkpointed account.
+def sweep_shard(database_url: str, sweep_id: str, shard: int, shards: int, cutoff_iso: str) -> Dict[str, Any]:
+    path = _shard_path(sweep_id, shard)
+    checkpoint = _read_json(path) or {
+        "shard": shard, "last_account_id": None, "accounts_done": 0, "events_done": 0, "done": False,
+    }
+    if checkpoint["done"]:
+        return checkpoint
+
+    engine = _make_engine(database_url)
+    SessionShard = sessionmaker(bind=engine)
+    cutoff = datetime.fromisoformat(cutoff_iso)
+
+    fields = signal_payload_fields()
+    lo, hi = shard_range(shard, shards)
+    stmt = (
+        select(Event.account_id, *event_record_columns(fields))
+        .where(Event.account_bucket >= lo)
+        .where(Event.account_bucket < hi)
+        .where(Event.created_at >= cutoff)
+        .order_by(Event.account_bucket, Event.account_id, Event.created_at, Event.id)
+    )
+    if checkpoint["last_account_id"] is not None:
+        last = checkpoint["last_account_id"]
+        stmt = stmt.where(tuple_(Event.account_bucket, Event.account_id) > (account_bucket(last), last))
+
+    batch: List[Dict[str, Any]] = []
+    events_in_batch = 0
+
+    def flush() -> None:
+        nonlocal events_in_batch
+        if not batch:
+            return
+        with SessionShard() as db:
+            insert = sqlite_insert(AccountRisk).values(batch)
+            db.execute(insert.on_conflict_do_update(
+                index_elements=[AccountRisk.account_id],
+                set_={c: insert.excluded[c] for c in batch[0] if c != "account_id"},
+            ))
+            db.commit()
+        checkpoint["last_account_id"] = batch[-1]["account_id"]
+        checkpoint["accounts_done"] += len(batch)
+        checkpoint["events_done"] += events_in_batch
+        _write_json(path, checkpoint)
+        batch.clear()
+        events_in_batch = 0
+
+    try:
+        with engine.connect() as conn, SessionShard() as links_db:
+            rows = conn.execution_options(stream_results=True, yield_per=2000).execute(stmt)
+            for account_id, group in groupby(rows, key=itemgetter(0)):
+                events = [to_event_record(row, fields, offset=1) for row in group]
+                signals = compute_signals(events) + shared_entity_signals(links_db, account_id, events)
+                risk = assess_risk(account_id, signals)
+                batch.append({
+                    "account_id": account_id,
+                    "risk_score": risk["risk_score"],
+                    "risk_band": risk["risk_band"],
+                    "confidence": risk["confidence"],
+                    "fired_signals": risk["fired_signals"],
+                    "score_breakdown": risk["score_breakdown"],
+                    "event_count": len(events),
+                    "last_event_id": max(e.id for e in events),
+                    "sweep_id": sweep_id,
+                    "scored_at": datetime.now(timezone.utc),
+                })
+                events_in_batch += len(events)
+                if len(batch) >= SWEEP_BATCH_ACCOUNTS:
+                    flush()   # separate connection; WAL lets it commit while this cursor is still reading
+        flush()
+    finally:
+        engine.dispose()
+
+    checkpoint["done"] = True
+    _write_json(path, checkpoint)
+    return checkpoint
+
+
+# ---------- runner ----------
+
+# Run (or resume) a sweep. Returns the final progress dict (see read_progress).
+def run_sweep(
+    database_url: str = DATABASE_URL,
+    workers: int = SWEEP_WORKERS,
+    shards: Optional[int] = None,
+    sweep_id: Optional[str] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    engine = _make_engine(database_url)
+    init_db(engine)
+    backfilled = backfill_account_buckets(engine)
+    if backfilled:
+        logger.info("Filled account_bucket on %d older event(s)", backfilled)
+
+    manifest = _read_json(_sweep_dir(sweep_id) / "sweep.json") if sweep_id else None
+    if manifest is None:
+        # new sweep; the cutoff is fixed once so every shard (and every resume) scores the same window
+        sweep_id = sweep_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        manifest = {
+            "sweep_id": sweep_id,
+            "shards": shards or workers,
+            "cutoff": (datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)).isoformat(),
+            "sharding": SWEEP_SHARDING,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        }
+        _sweep_dir(sweep_id).mkdir(parents=True, exist_ok=True)
+        _write_json(_sweep_dir(sweep_id) / "sweep.json", manifest)
+    elif manifest.get("sharding") != SWEEP_SHARDING:
+        raise ValueError(f"Sweep {sweep_id} was sharded by an older scheme; start a new sweep")
+    elif shards and shards != manifest["shards"]:
+        raise ValueError(f"Sweep {sweep_id} was started with {manifest['shards']} shards, not {shards}")
+
+    n_shards = manifest["shards"]
+    started = time.perf_counter()
+    last_report = 0.0
+
+    with ProcessPoolExecutor(max_workers=min(workers, n_shards), mp_context=get_context("spawn")) as pool:
+        pending = {
+            pool.submit(sweep_shard, database_url, sweep_id, shard, n_shards, manifest["cutoff"])
+            for shard in range(n_shards)
+        }
+        while pending:
+            done, pending = wait(pending, timeout=SWEEP_PROGRESS_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                future.result()   # re-raise a worker's error; finished shards keep their checkpoints
+            if progress and (time.perf_counter() - last_report >= SWEEP_PROGRESS_SECONDS or not pending):
+                last_report = time.perf_counter()
+                progress({**read_progress(sweep_id), "elapsed_s": round(last_report - started, 1)})
+
+    # Every shard finished: accounts this sweep didn't score have no events left in the window
+    with engine.begin() as conn:
+        stale = conn.execute(AccountRisk.__table__.delete().where(AccountRisk.sweep_id != sweep_id)).rowcount
+    engine.dispose()
+
+    result = {**read_progress(sweep_id), "elapsed_s": round(time.perf_counter() - started, 2), "stale_removed": stale}
+    _write_json(_sweep_dir(sweep_id) / "result.json", result)
+    logger.info("Sweep %s finished: %s", sweep_id, result)
+    return result
@@ -0,0 +1,83 @@
+"""
+Backtest signal weights / band thresholds / confidence floor against historical AI decisions.
+
+    python scripts/backtest_weights.py --random-samples 2000
+    python scripts/backtest_weights.py --weight LARGE_TRANSACTION=15,20,25,30 --low-max 35 39 45 --confidence-floor 0.6 0.65 0.7
+
+Same engine as POST /feedback/backtest (app/backtest.py). Prints the current config and the best
+candidates by predicted override rate; --json prints the full BacktestOut instead.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.backtest import run_backtest  # noqa: E402
+from app.database import SessionLocal, init_db  # noqa: E402
+from app.feedback_schemas import BacktestRequest, BacktestResult  # noqa: E402
+
+
+def parse_weight(spec: str):
+    name, _, values = spec.partition("=")
+    if not name or not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=w1,w2,... got {spec!r}")
+    return name, [int(v) for v in values.split(",")]
+
+
+def describe(label: str, r: BacktestResult) -> str:
+    c = r.config
+    weights = " ".join(f"{name}={w}" for name, w in sorted(c.weights.items()))
+    bands = " ".join(f"{b}={n}" for b, n in r.band_distribution.items())
+    top = ", ".join(f"{t} {n}" for t, n in list(r.routing_transitions.items())[:3]) or "none"
+    return (
+        f"{label}: override {r.predicted_override_rate_pct}% ({r.override_rate_change_pct:+} pts), "
+        f"routing changes {r.routing_changes} ({r.routing_change_pct}%)\n"
+        f"    low_max={c.low_max} medium_max={c.medium_max} floor={c.confidence_floor} {weights}\n"
+        f"    bands {bands}; top changes: {top}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weight", type=parse_weight, action="append", default=[], metavar="NAME=w1,w2")
+    parser.add_argument("--low-max", type=int, nargs="+", default=[])
+    parser.add_argument("--medium-max", type=int, nargs="+", default=[])
+    parser.add_argument("--confidence-floor", type=float, nargs="+", default=[])
+    parser.add_argument("--random-samples", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    request = BacktestRequest(
+        weights=dict(args.weight),
+        low_max=args.low_max,
+        medium_max=args.medium_max,
+        confidence_floor=args.confidence_floor,
+        random_samples=args.random_samples,
+        top_k=args.top_k,
+        seed=args.seed,
+    )
+    init_db()
+    db = SessionLocal()
+    try:
+        out = run_backtest(db, request)
+    finally:
+        db.close()
+
+    if args.json:
+        print(out.model_dump_json(indent=2))
+        return
+    print(
+        f"{out.cases} cases ({out.reviewed_cases} reviewed, {out.unique_case_vectors} distinct), "
+        f"{out.configs_evaluated} configs in {out.elapsed_ms / 1000:.2f}s"
+    )
+    print(describe("current", out.baseline))
+    for i, r in enumerate(out.results, 1):
+        print(describe(f"#{i}", r))
+
+
+if __name__ == "__main__":
+    main()
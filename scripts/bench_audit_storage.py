@@ -0,0 +1,228 @@
+"""
+Benchmark + check: legacy audit layout (AI context copied into every case_actions row) vs the
+normalized layout (case_decisions + decision_signals, actions reference the decision).
+
+    python scripts/bench_audit_storage.py --decisions 5000 --actions-per-decision 2
+
+Builds a synthetic legacy audit trail in a temporary SQLite file, measures its size and the
+legacy feedback summary time, runs app.audit_migration, VACUUMs, then measures the normalized
+size and the new get_feedback_summary time. Exits non-zero if the two summaries differ.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert, text  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from app.actions import CaseAction  # noqa: E402
+from app.audit_migration import migrate_case_actions  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.feedback import HIGH_GAP_THRESHOLD, OVERRIDE_RATE_ALERT_THRESHOLD, get_feedback_summary  # noqa: E402
+from app.feedback_schemas import (  # noqa: E402
+    ConfidenceGapSummary,
+    FeedbackSummaryOut,
+    OverridePattern,
+    SignalOverrideRate,
+)
+
+SIGNALS = ["NEW_DEVICE_LOGIN", "PROFILE_CHANGE", "LARGE_TRANSACTION", "NEW_PAYEE_LARGE_TRANSFER", "PROFILE_CHANGE_AND_TRANSFER_24HR"]
+PATHS = ["MONITOR", "REQUEST_INFO", "REVIEW", "ESCALATE"]
+
+
+# AUTO_ROUTED extra_data as app.main wrote it before normalization
+def legacy_context(rng: random.Random, case_id: str) -> Dict[str, Any]:
+    fired = sorted(rng.sample(SIGNALS, rng.randint(0, 4)))
+    det, ai = round(rng.random(), 2), round(rng.uniform(0.4, 0.95), 2)
+    return {
+        "ai_routed_path": rng.choice(PATHS),
+        "ai_workflow_path": rng.choice(PATHS),
+        "ai_confidence": ai,
+        "ai_stop": "AI cannot freeze/restrict accounts or file regulatory reports. Human must decide enforcement.",
+        "policy_citations": [f"escalation.md#chunk_escalation.md#chunk_{i}" for i in range(2)],
+        "evidence_event_ids": [rng.randint(1, 10**6) for _ in range(rng.randint(1, 6))],
+        "risk_band": rng.choice(["LOW", "MEDIUM", "HIGH"]),
+        "risk_score": rng.randint(0, 130),
+        "fired_signals": fired,
+        "deterministic_confidence": det,
+        "final_confidence": min(det, ai),
+        "confidence_gap": round(abs(det - ai), 2),
+        "case_version": rng.randint(1, 9),
+        "content_hash": "%064x" % rng.getrandbits(256),
+        "ai_tier": "fast",
+        "ai_model": "gpt-4o-mini",
+        "ai_tier_latency_ms": {"fast": round(rng.uniform(300, 900), 1)},
+        "ai_escalation_reasons": [],
+    }
+
+
+def build_legacy(db: Session, decisions: int, actions_per_decision: int, seed: int) -> None:
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    rows = []
+    for i in range(decisions):
+        case_id = f"CASE-ACC{i % (decisions // 3 + 1)}-v{i}"
+        context = legacy_context(rng, case_id)
+        at = start + timedelta(seconds=i * 60)
+        rows.append({"case_id": case_id, "account_id": case_id.split("-")[1], "action": "AUTO_ROUTED",
+                     "reason": "System auto-routing based on AI decision", "created_at": at, "extra_data": context})
+        for j in range(actions_per_decision):
+            action = rng.choice(["APPROVE", "OVERRIDE", "REQUEST_INFO", "ESCALATE"])
+            rows.append({
+                "case_id": case_id, "account_id": case_id.split("-")[1], "action": action,
+                "reason": rng.choice(["Customer confirmed", "False positive", "Known payee", ""]) if action == "OVERRIDE" else None,
+                "created_at": at + timedelta(seconds=j + 1),
+                "extra_data": {
+                    **context,
+                    "human_action": action,
+                    "human_reason": None,
+                    "previous_routed_path": None,
+                    "human_final_path": rng.choice(PATHS) if action == "OVERRIDE" else None,
+                },
+            })
+    db.execute(insert(CaseAction), rows)
+    db.commit()
+
+
+# get_feedback_summary as it was before normalization (reads the JSON copies)
+def legacy_feedback_summary(db: Session) -> FeedbackSummaryOut:
+    all_actions = db.query(CaseAction).filter(CaseAction.action != "AUTO_ROUTED").all()
+    total_actions = len(all_actions)
+    overrides = [a for a in all_actions if a.action == "OVERRIDE"]
+    total_overrides = len(overrides)
+    override_rate_pct = round((total_overrides / total_actions * 100), 1) if total_actions > 0 else 0.0
+
+    pattern_map: Dict[str, Dict[str, Any]] = {}
+    for o in overrides:
+        extra = o.extra_data or {}
+        ai_path = extra.get("ai_routed_path") or extra.get("previous_routed_path") or "UNKNOWN"
+        human_path = extra.get("human_final_path") or "UNKNOWN"
+        reason = o.reason or ""
+        key = f"{ai_path}→{human_path}"
+        if key not in pattern_map:
+            pattern_map[key] = {"ai_path": ai_path, "human_path": human_path, "count": 0, "example_reasons": []}
+        pattern_map[key]["count"] += 1
+        if reason and len(pattern_map[key]["example_reasons"]) < 3:
+            pattern_map[key]["example_reasons"].append(reason)
+    override_patterns = [OverridePattern(**v) for v in sorted(pattern_map.values(), key=lambda x: x["count"], reverse=True)]
+
+    signal_map: Dict[str, Dict[str, int]] = {}
+    auto_routed = db.query(CaseAction).filter(CaseAction.action == "AUTO_ROUTED").all()
+    for ar in auto_routed:
+        for sig in (ar.extra_data or {}).get("fired_signals", []):
+            signal_map.setdefault(sig, {"total_cases": 0, "override_count": 0})["total_cases"] += 1
+    for o in overrides:
+        for sig in (o.extra_data or {}).get("fired_signals", []):
+            signal_map.setdefault(sig, {"total_cases": 0, "override_count": 0})["override_count"] += 1
+    signal_override_rates = [
+        SignalOverrideRate(
+            signal_name=sig,
+            total_cases=vals["total_cases"],
+            override_count=vals["override_count"],
+            override_rate_pct=round(vals["override_count"] / vals["total_cases"] * 100, 1) if vals["total_cases"] > 0 else 0.0,
+        )
+        for sig, vals in sorted(signal_map.items(), key=lambda x: x[1]["override_count"], reverse=True)
+    ]
+
+    gaps = []
+    for ar in auto_routed:
+        gap = (ar.extra_data or {}).get("confidence_gap")
+        if gap is not None:
+            try:
+                gaps.append(float(gap))
+            except (ValueError, TypeError):
+                pass
+    avg_gap = round(sum(gaps) / len(gaps), 3) if gaps else 0.0
+    high_gap_count = sum(1 for g in gaps if g > HIGH_GAP_THRESHOLD)
+
+    recommendation = None
+    if override_rate_pct >= OVERRIDE_RATE_ALERT_THRESHOLD * 100:
+        recommendation = (
+            f"Override rate is {override_rate_pct}% — above the {int(OVERRIDE_RATE_ALERT_THRESHOLD * 100)}% threshold. "
+            "Review the most common override patterns and consider adjusting signal weights or the system prompt."
+        )
+    elif high_gap_count > 5:
+        recommendation = (
+            f"{high_gap_count} cases had a confidence gap above {HIGH_GAP_THRESHOLD}. "
+            "Deterministic and AI confidence are frequently misaligned — review scoring weights."
+        )
+    elif total_overrides == 0 and total_actions > 10:
+        recommendation = "No overrides recorded. Either the system is performing well or analysts are not reviewing closely enough."
+
+    return FeedbackSummaryOut(
+        total_actions=total_actions,
+        total_overrides=total_overrides,
+        override_rate_pct=override_rate_pct,
+        override_patterns=override_patterns,
+        signal_override_rates=signal_override_rates,
+        confidence_gap_summary=ConfidenceGapSummary(avg_gap=avg_gap, high_gap_count=high_gap_count, high_gap_threshold=HIGH_GAP_THRESHOLD),
+        recommendation=recommendation,
+    )
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decisions", type=int, default=5000)
+    parser.add_argument("--actions-per-decision", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "audit_bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        SessionBench = sessionmaker(bind=engine)
+
+        def vacuum_size() -> int:
+            with engine.connect() as conn:
+                conn.execute(text("VACUUM"))
+            return os.path.getsize(path)
+
+        db = SessionBench()
+        build_legacy(db, args.decisions, args.actions_per_decision, args.seed)
+        legacy_size = vacuum_size()
+        legacy_out = legacy_feedback_summary(db)
+        legacy_time = best_time(lambda: legacy_feedback_summary(db), args.repeat)
+
+        t0 = time.perf_counter()
+        counts = migrate_case_actions(db)
+        migrate_time = time.perf_counter() - t0
+        normalized_size = vacuum_size()
+        new_out = get_feedback_summary(db)
+        new_time = best_time(lambda: get_feedback_summary(db), args.repeat)
+        db.close()
+
+    rows = args.decisions * (1 + args.actions_per_decision)
+    print(f"{rows} audit rows ({args.decisions} AI decisions), migrated in {migrate_time:.2f}s: {counts}")
+    print(f"{'layout':>12}{'DB MB':>10}{'feedback ms':>14}")
+    print(f"{'legacy':>12}{legacy_size / 1e6:>10.2f}{legacy_time * 1000:>14.1f}")
+    print(f"{'normalized':>12}{normalized_size / 1e6:>10.2f}{new_time * 1000:>14.1f}")
+    print(f"storage {legacy_size / normalized_size:.1f}x smaller, feedback {legacy_time / new_time:.1f}x faster")
+
+    if legacy_out.model_dump() != new_out.model_dump():
+        print("MISMATCH: feedback summaries differ")
+        sys.exit(1)
+    print("feedback summaries identical")
+
+
+if __name__ == "__main__":
+    main()
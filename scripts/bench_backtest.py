@@ -0,0 +1,141 @@
+"""
+Benchmark: POST /feedback/backtest engine (app/backtest.py) on a large synthetic decision history.
+
+    python scripts/bench_backtest.py --cases 1000000 --configs 2000
+
+Builds a temporary SQLite DB with --cases AI decisions (signal hit counts, AI path/confidence,
+routed path) and analyst actions on a share of them, then times loading and scoring. Also checks
+the vectorized scores against risk.score_signals/band_from_score and router.apply_guardrails for
+a sample of cases under a few random configs.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import risk, router  # noqa: E402
+from app.actions import CaseAction, CaseDecision, DecisionSignal  # noqa: E402
+from app.backtest import BANDS, NOT_REVIEWED, PATHS, CaseMatrix, candidate_configs, evaluate, load_cases, run_backtest  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.feedback_schemas import BacktestRequest  # noqa: E402
+
+SIGNALS = ["NEW_DEVICE_LOGIN", "PROFILE_CHANGE", "LARGE_TRANSACTION", "NEW_PAYEE_LARGE_TRANSFER", "PROFILE_CHANGE_AND_TRANSFER_24HR"]
+
+
+def build(database_url: str, n: int, seed: int) -> None:
+    rng = random.Random(seed)
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    chunk = 100000
+    for start in range(0, n, chunk):
+        decisions, signals, actions = [], [], []
+        for i in range(start + 1, min(start + chunk, n) + 1):
+            fired = rng.sample(SIGNALS, rng.choice([0, 1, 1, 2, 2, 3, 4]))
+            proposed = rng.choice(PATHS)
+            confidence = round(rng.uniform(0.4, 0.95), 2)
+            routed = "REVIEW" if confidence < 0.65 else proposed
+            decisions.append({"id": i, "decision_uid": f"d{i}", "origin": "ai_decision", "case_id": f"CASE-{i}",
+                              "account_id": f"ACC{i}", "workflow_path": proposed, "ai_confidence": confidence,
+                              "routed_path": routed})
+            for position, name in enumerate(fired):
+                hits = rng.choice([1, 1, 1, 2, 3]) if name in ("LARGE_TRANSACTION", "PROFILE_CHANGE") else 1
+                signals.append({"decision_id": i, "signal_name": name, "position": position, "hits": hits})
+            actions.append({"case_id": f"CASE-{i}", "account_id": f"ACC{i}", "action": "AUTO_ROUTED", "decision_id": i})
+            if rng.random() < 0.4:
+                action = rng.choice(["APPROVE", "APPROVE", "OVERRIDE", "ESCALATE", "REQUEST_INFO"])
+                extra = {"human_final_path": rng.choice(PATHS)} if action == "OVERRIDE" else {}
+                actions.append({"case_id": f"CASE-{i}", "account_id": f"ACC{i}", "action": action,
+                                "decision_id": i, "extra_data": extra})
+        with engine.begin() as conn:
+            conn.execute(insert(CaseDecision), decisions)
+            conn.execute(insert(DecisionSignal), signals)
+            conn.execute(insert(CaseAction), actions)
+    engine.dispose()
+
+
+# Reference: score each sampled case one at a time with the real scoring + guardrail code
+def check(cases: CaseMatrix, configs, metrics_fn, sample: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(cases.count), size=min(sample, len(cases.count)), replace=False)
+    for config in configs:
+        sub = CaseMatrix(cases.signal_names, cases.vectors, **{
+            attr: getattr(cases, attr)[rows] for attr in ("vec_idx", "proposed", "confidence", "routed", "outcome", "count")
+        })
+        got = metrics_fn(sub, [config])
+        bands, routed = np.zeros(len(BANDS)), np.zeros(len(PATHS))
+        overrides = changes = 0.0
+        with mock.patch.object(risk, "LOW_MAX", config["low_max"]), mock.patch.object(risk, "MEDIUM_MAX", config["medium_max"]), \
+                mock.patch.object(router, "CONFIDENCE_FLOOR", config["confidence_floor"]), \
+                mock.patch.object(risk, "current_signal_weights", lambda: config["weights"]):
+            for r in rows:
+                hits = cases.vectors[cases.vec_idx[r]]
+                signals = [{"signal_name": n} for j, n in enumerate(cases.signal_names) for _ in range(int(hits[j]))]
+                score, _, _ = risk.score_signals(signals)
+                band = risk.band_from_score(score)
+                path = router.apply_guardrails(
+                    {"workflow_path": PATHS[cases.proposed[r]], "confidence": cases.confidence[r]}, band
+                )["routed_path"]
+                bands[BANDS.index(band)] += cases.count[r]
+                routed[PATHS.index(path)] += cases.count[r]
+                code = PATHS.index(path)
+                overrides += cases.count[r] * (cases.outcome[r] != NOT_REVIEWED and cases.outcome[r] != code)
+                changes += cases.count[r] * (cases.routed[r] != code)
+        expected = (bands, routed, overrides, changes, changes)
+        actual = (got["bands"][0], got["routed"][0], got["overrides"][0], got["changes"][0], got["transitions"][0].sum())
+        if not all(np.allclose(a, e) for a, e in zip(actual, expected)):
+            print(f"MISMATCH for {config}: vectorized {actual} vs reference {expected}")
+            sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=1000000)
+    parser.add_argument("--configs", type=int, default=2000)
+    parser.add_argument("--check", type=int, default=2000, help="sampled distinct rows to verify per config")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'backtest_bench.db')}"
+        t0 = time.perf_counter()
+        build(database_url, args.cases, args.seed)
+        print(f"built {args.cases} decisions in {time.perf_counter() - t0:.1f}s")
+
+        engine = create_engine(database_url)
+        db = sessionmaker(bind=engine)()
+        request = BacktestRequest(random_samples=args.configs, top_k=3, seed=args.seed)
+
+        t0 = time.perf_counter()
+        cases = load_cases(db)
+        load_s = time.perf_counter() - t0
+        configs = candidate_configs(request)
+        t0 = time.perf_counter()
+        evaluate(cases, configs)
+        score_s = time.perf_counter() - t0
+        print(f"load + collapse: {load_s:.2f}s -> {len(cases.count)} distinct rows")
+        print(f"score {len(configs)} configs: {score_s:.2f}s ({len(configs) / score_s:,.0f} configs/s)")
+
+        for label in ("cold (loads history)", "warm (history cached)"):
+            out = run_backtest(db, request)
+            print(f"run_backtest {label}: {out.elapsed_ms / 1000:.2f}s; current override rate "
+                  f"{out.baseline.predicted_override_rate_pct}%, best {out.results[0].predicted_override_rate_pct}%")
+
+        check(cases, configs[:1] + random.Random(args.seed).sample(configs[1:], min(4, len(configs) - 1)), evaluate, args.check, args.seed)
+        print("vectorized bands/routes/overrides/changes match score_signals + band_from_score + apply_guardrails on the sample")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark: "which other accounts used this device / paid this payee" from the entity index
+(app.entity_links) vs a cross-account query on the events table.
+
+    python scripts/bench_entity_links.py --accounts 20000 --events-per-account 15 --lookups 300
+
+Builds a temporary SQLite DB with a few mule rings (devices and payees shared by many accounts)
+hidden in ordinary traffic, fills the index with backfill_entity_index, then:
+- answers --lookups random device / payee questions, plus each ring's, both ways and checks
+  they agree
+- times SHARED_DEVICE / SHARED_PAYEE_FANIN for sampled accounts
+- times ingesting events with and without the index upsert
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, func, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.entity_links import ENTITY_FIELDS, _window_start, backfill_entity_index, linked_accounts, record_event_links  # noqa: E402
+from app.models import Event  # noqa: E402
+from app.signals import build_signals  # noqa: E402
+
+
+def build_events(engine, accounts: int, per_account: int, rings: int, seed: int) -> None:
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(days=20)
+    ring_of = {a: rng.randrange(rings) for a in rng.sample(range(accounts), min(accounts, rings * 12))}
+    rows = []
+    for a in range(accounts):
+        at = start
+        for _ in range(per_account):
+            at += timedelta(minutes=rng.choice([5, 60, 600, 1500]))
+            kind = rng.choice(["device_login", "device_login", "transaction_posted", "transaction_posted", "profile_change"])
+            ring = ring_of.get(a)
+            if kind == "device_login":
+                device = f"ring-dev-{ring}" if ring is not None and rng.random() < 0.5 else f"d{a}-{rng.randint(1, 3)}"
+                payload = {"device_id": device}
+            elif kind == "profile_change":
+                payload = {"changed_fields": ["email"]}
+            else:
+                payee = f"ring-payee-{ring}" if ring is not None and rng.random() < 0.5 else f"p{a}-{rng.randint(1, 3)}"
+                payload = {"amount": rng.choice([50, 900, 3500]), "currency": "CAD", "counterparty": payee}
+            rows.append({"account_id": f"ACC{a:07d}", "event_type": kind, "created_at": at, "payload": payload})
+        if len(rows) >= 50000:
+            with engine.begin() as conn:
+                conn.execute(insert(Event), rows)
+            rows = []
+    if rows:
+        with engine.begin() as conn:
+            conn.execute(insert(Event), rows)
+
+
+# The query the index replaces: every account's events of that type, filtered on the payload
+def scan_linked(db, account_id: str, entity_type: str, value: str, since: datetime) -> set:
+    event_type, field = next((t, f) for t, (e, f) in ENTITY_FIELDS.items() if e == entity_type)
+    rows = (
+        db.query(Event.account_id)
+        .filter(Event.event_type == event_type)
+        .filter(Event.created_at >= since)
+        .filter(func.json_extract(Event.payload, f"$.{field}") == value)
+        .filter(Event.account_id != account_id)
+        .distinct()
+        .all()
+    )
+    return {r[0] for r in rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=20000)
+    parser.add_argument("--events-per-account", type=int, default=15)
+    parser.add_argument("--rings", type=int, default=20)
+    parser.add_argument("--lookups", type=int, default=300)
+    parser.add_argument("--ingest", type=int, default=2000, help="events to ingest with / without the index upsert")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed + 1)   # not the generator's sequence (that would sample ring members)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        started = time.perf_counter()
+        build_events(engine, args.accounts, args.events_per_account, args.rings, args.seed)
+        n_events = args.accounts * args.events_per_account
+        print(f"{n_events:,} events, {args.accounts:,} accounts, {args.rings} rings ({time.perf_counter() - started:.1f}s to build)")
+
+        with Session() as db:
+            started = time.perf_counter()
+            pairs = backfill_entity_index(db)
+            print(f"backfill: {pairs:,} (entity, account) pairs in {time.perf_counter() - started:.1f}s")
+
+            # random events (mostly personal devices / payees) plus every ring's device and payee
+            sample = [
+                (r.account_id, r.event_type, str(r.payload[ENTITY_FIELDS[r.event_type][1]]))
+                for r in db.query(Event).filter(Event.event_type.in_(list(ENTITY_FIELDS))).order_by(func.random()).limit(args.lookups)
+            ]
+            sample += [("nobody", "device_login", f"ring-dev-{r}") for r in range(args.rings)]
+            sample += [("nobody", "transaction_posted", f"ring-payee-{r}") for r in range(args.rings)]
+            since = _window_start()
+            timings = {"events scan": 0.0, "entity index": 0.0}
+            fanout = mismatches = 0
+            for account_id, event_type, value in sample:
+                entity_type, field = ENTITY_FIELDS[event_type]
+                t0 = time.perf_counter()
+                scanned = scan_linked(db, account_id, entity_type, value, since)
+                t1 = time.perf_counter()
+                indexed = {a for a, _ in linked_accounts(db, account_id, entity_type, value, since)}
+                t2 = time.perf_counter()
+                timings["events scan"] += t1 - t0
+                timings["entity index"] += t2 - t1
+                fanout += len(indexed)
+                mismatches += scanned != indexed
+            print(f"{len(sample)} lookups incl. {2 * args.rings} ring entities (mean fan-out {fanout / max(len(sample), 1):.1f}), results differ: {mismatches}")
+            for name, total in timings.items():
+                print(f"{name:>14}: {total / max(len(sample), 1) * 1000:8.2f} ms/lookup")
+
+            accounts = [f"ACC{rng.randrange(args.accounts):07d}" for _ in range(200)]
+            t0 = time.perf_counter()
+            fired = sum(
+                any(s["signal_name"].startswith("SHARED_") for s in build_signals(db, a)) for a in accounts
+            )
+            print(f"build_signals incl. shared signals: {(time.perf_counter() - t0) / len(accounts) * 1000:.2f} ms/account "
+                  f"({fired}/{len(accounts)} sampled accounts fire one)")
+
+        for name, with_index in (("without index", False), ("with index", True)):
+            with Session() as db:
+                t0 = time.perf_counter()
+                for i in range(args.ingest):
+                    kind = rng.choice(list(ENTITY_FIELDS))
+                    payload = {"device_id": f"new-d{i}"} if kind == "device_login" else {"amount": 10, "counterparty": f"p{i}"}
+                    event = Event(account_id=f"ACC{rng.randrange(args.accounts):07d}", event_type=kind, payload=payload)
+                    db.add(event)
+                    db.flush()
+                    if with_index:
+                        record_event_links(db, event)
+                    db.commit()
+                print(f"ingest {name}: {(time.perf_counter() - t0) / args.ingest * 1000:.2f} ms/event")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
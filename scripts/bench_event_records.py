@@ -0,0 +1,133 @@
+"""
+Benchmark: hydrating an account's lookback window as ORM Event objects (fetch_recent_events)
+vs light EventRecords (fetch_recent_event_records), and the signals computed from each.
+
+    python scripts/bench_event_records.py --events 50000 --repeat 5
+
+Builds a temporary SQLite DB with one heavy account whose payloads carry extra keys the rules
+don't read (plus edge cases: nulls, missing keys, booleans, non-dict payloads). Reports fetch
+latency, fetch + compute_signals latency and retained memory of the fetched list, and exits
+non-zero if the two paths produce different signals.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import Event  # noqa: E402
+from app.signals import (  # noqa: E402
+    compute_signals,
+    fetch_recent_event_records,
+    fetch_recent_events,
+)
+
+ACCOUNT = "ACC-HEAVY"
+
+
+def random_payload(rng: random.Random, kind: str):
+    noise = {"channel": rng.choice(["web", "ios", "android"]), "ip": f"10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)}",
+             "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36", "geo": {"lat": 43.6, "lon": -79.4}}
+    if rng.random() < 0.02:
+        return rng.choice([None, [], "not-a-dict", {}])
+    if kind == "device_login":
+        return {**noise, "device_id": rng.choice([f"d{rng.randint(1, 40)}", "", None])}
+    if kind == "profile_change":
+        return rng.choice([{**noise, "changed_fields": ["email", "phone"]}, {**noise}, {**noise, "changed_fields": None}])
+    payload = {**noise, "amount": rng.choice([25, 700, 2999, 3000, 4200.5, 12000, "5000", None, True]),
+               "counterparty": rng.choice([f"p{rng.randint(1, 60)}", "", None]), "memo": "invoice " + str(rng.randint(1, 10**6))}
+    if rng.random() < 0.8:
+        payload["currency"] = rng.choice(["CAD", "USD", None])
+    return payload
+
+
+def build(database_url: str, n: int, seed: int) -> None:
+    rng = random.Random(seed)
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    at = datetime.now(timezone.utc) - timedelta(days=29)
+    step = timedelta(days=28) / n
+    rows = []
+    for i in range(n):
+        kind = rng.choice(["device_login", "profile_change", "transaction_posted", "transaction_posted", "other"])
+        rows.append({"account_id": ACCOUNT, "event_type": kind, "created_at": at + step * i, "payload": random_payload(rng, kind)})
+    with engine.begin() as conn:
+        conn.execute(insert(Event), rows)
+    engine.dispose()
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def retained_bytes(fn) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn()
+    size = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'records_bench.db')}"
+        build(database_url, args.events, args.seed)
+        engine = create_engine(database_url)
+        SessionBench = sessionmaker(bind=engine)
+
+        # fresh session per call, so the ORM path pays its real hydration cost every time
+        def orm_fetch():
+            with SessionBench() as db:
+                return fetch_recent_events(db, ACCOUNT)
+
+        def record_fetch():
+            with SessionBench() as db:
+                return fetch_recent_event_records(db, ACCOUNT)
+
+        orm_signals = compute_signals(orm_fetch())
+        record_signals = compute_signals(record_fetch())
+
+        rows = [
+            ("ORM Event", orm_fetch),
+            ("EventRecord", record_fetch),
+        ]
+        print(f"{args.events} events, {len(orm_signals)} signals")
+        print(f"{'path':>12}{'fetch ms':>11}{'fetch+signals ms':>18}{'retained MB':>13}")
+        for name, fetch in rows:
+            fetch_s = best_time(fetch, args.repeat)
+            total_s = best_time(lambda: compute_signals(fetch()), args.repeat)
+            print(f"{name:>12}{fetch_s * 1000:>11.1f}{total_s * 1000:>18.1f}{retained_bytes(fetch) / 1e6:>13.2f}")
+        engine.dispose()
+
+    if orm_signals != record_signals:
+        print("MISMATCH: signals differ between the ORM and EventRecord paths")
+        sys.exit(1)
+    print("signals identical")
+
+
+if __name__ == "__main__":
+    main()
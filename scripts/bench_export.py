@@ -0,0 +1,161 @@
+"""
+Benchmark + check: streaming audit export (app/export.py) vs loading everything through the ORM.
+
+    python scripts/bench_export.py --decisions 100000 --actions-per-decision 2
+
+Builds a normalized audit trail in a temporary SQLite file. For the ORM baseline
+(query(...).all() + json) and for each export format it reports throughput, output size and peak
+Python memory. Exits non-zero if any format loses rows, if gzip output doesn't decompress to the
+plain output, or if resuming from a cursor + after_id doesn't complete the export exactly.
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.actions import CaseAction, CaseDecision, DecisionSignal  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.export import export_cursor, plan_export, stream_export  # noqa: E402
+
+SIGNALS = ["NEW_DEVICE_LOGIN", "PROFILE_CHANGE", "LARGE_TRANSACTION", "NEW_PAYEE_LARGE_TRANSFER", "PROFILE_CHANGE_AND_TRANSFER_24HR"]
+PATHS = ["MONITOR", "REQUEST_INFO", "REVIEW", "ESCALATE"]
+
+
+def build(database_url: str, decisions: int, actions_per_decision: int, seed: int) -> None:
+    rng = random.Random(seed)
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    start = datetime.now(timezone.utc) - timedelta(days=90)
+    chunk = 20000
+    with engine.begin() as conn:
+        for lo in range(0, decisions, chunk):
+            d_rows, s_rows, a_rows = [], [], []
+            for i in range(lo + 1, min(lo + chunk, decisions) + 1):
+                account = f"ACC{i % 5000}"
+                case_id = f"CASE-{account}-{i}"
+                at = start + timedelta(seconds=i * 30)
+                det, ai = round(rng.random(), 2), round(rng.uniform(0.4, 0.95), 2)
+                d_rows.append({
+                    "id": i, "decision_uid": f"d{i}", "case_id": case_id, "account_id": account, "created_at": at,
+                    "routed_path": rng.choice(PATHS), "workflow_path": rng.choice(PATHS),
+                    "risk_band": rng.choice(["LOW", "MEDIUM", "HIGH"]), "risk_score": rng.randint(0, 130),
+                    "ai_confidence": ai, "deterministic_confidence": det, "final_confidence": min(det, ai),
+                    "confidence_gap": round(abs(det - ai), 2), "case_version": rng.randint(1, 9),
+                    "content_hash": "%064x" % rng.getrandbits(256), "ai_tier": "fast", "ai_model": "gpt-4o-mini",
+                    "ai_stop": "AI cannot freeze/restrict accounts or file regulatory reports.",
+                    "policy_citations": ["escalation.md#chunk_0", "kyc.md#chunk_3"],
+                    "evidence_event_ids": [rng.randint(1, 10**6) for _ in range(3)],
+                    "extras": {"ai_tier_latency_ms": {"fast": round(rng.uniform(300, 900), 1)}},
+                })
+                for pos, name in enumerate(rng.sample(SIGNALS, rng.randint(0, 3))):
+                    s_rows.append({"decision_id": i, "signal_name": name, "position": pos, "hits": 1})
+                a_rows.append({"case_id": case_id, "account_id": account, "action": "AUTO_ROUTED", "created_at": at,
+                               "reason": "System auto-routing based on AI decision", "decision_id": i, "audit_uid": f"a{i}"})
+                for j in range(actions_per_decision - 1):
+                    action = rng.choice(["APPROVE", "OVERRIDE", "REQUEST_INFO", "ESCALATE"])
+                    a_rows.append({"case_id": case_id, "account_id": account, "action": action,
+                                   "created_at": at + timedelta(minutes=5 + j), "decision_id": i,
+                                   "reason": "analyst note, with a comma" if action == "OVERRIDE" else None,
+                                   "extra_data": {"human_action": action, "human_final_path": rng.choice(PATHS)},
+                                   "audit_uid": f"a{i}-{j}"})
+            conn.execute(insert(CaseDecision), d_rows)
+            if s_rows:
+                conn.execute(insert(DecisionSignal), s_rows)
+            conn.execute(insert(CaseAction), a_rows)
+    engine.dispose()
+
+
+def measure(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decisions", type=int, default=100000)
+    parser.add_argument("--actions-per-decision", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'export_bench.db')}"
+        build(database_url, args.decisions, args.actions_per_decision, args.seed)
+        engine = create_engine(database_url)
+        SessionBench = sessionmaker(bind=engine)
+
+        def orm_dump():
+            with SessionBench() as db:
+                rows = db.query(CaseAction).all()
+                return len("\n".join(json.dumps({c.name: getattr(r, c.name) for c in CaseAction.__table__.columns},
+                                                default=str) for r in rows))
+
+        with SessionBench() as db:
+            specs = {d: plan_export(db, dataset=d) for d in ("actions", "decisions")}
+        n_actions = specs["actions"]["until_id"]
+
+        _, orm_s, orm_peak = measure(orm_dump)
+        print(f"{n_actions} actions, {args.decisions} decisions")
+        print(f"{'export':>22}{'rows/s':>11}{'MB out':>9}{'peak MB':>9}")
+        print(f"{'ORM .all() + json':>22}{n_actions / orm_s:>11,.0f}{'':>9}{orm_peak / 1e6:>9.1f}")
+
+        outputs = {}
+        for dataset in ("actions", "decisions"):
+            for fmt, compress in (("ndjson", False), ("csv", False), ("ndjson", True), ("csv", True)):
+                def run():   # what a client download costs the server: chunks are sent, not kept
+                    return sum(len(c) for c in stream_export(specs[dataset], fmt, compress, session_factory=SessionBench))
+                size, elapsed, peak = measure(run)
+                rows = specs[dataset]["until_id"]
+                label = f"{dataset} {fmt}{' gz' if compress else ''}"
+                print(f"{label:>22}{rows / elapsed:>11,.0f}{size / 1e6:>9.1f}{peak / 1e6:>9.1f}")
+                outputs[(dataset, fmt, compress)] = b"".join(
+                    stream_export(specs[dataset], fmt, compress, session_factory=SessionBench))
+
+            plain_ndjson = outputs[(dataset, "ndjson", False)]
+            if plain_ndjson.count(b"\n") != specs[dataset]["until_id"]:
+                failures.append(f"{dataset} ndjson row count")
+            if len(list(csv.reader(io.StringIO(outputs[(dataset, "csv", False)].decode())))) != specs[dataset]["until_id"] + 1:
+                failures.append(f"{dataset} csv row count")
+            for fmt in ("ndjson", "csv"):
+                if gzip.decompress(outputs[(dataset, fmt, True)]) != outputs[(dataset, fmt, False)]:
+                    failures.append(f"{dataset} {fmt} gzip round trip")
+
+            # interrupted after the first half: resume from the token + last id received
+            half = specs[dataset]["until_id"] // 2
+            with SessionBench() as db:
+                resumed = plan_export(db, cursor=export_cursor(specs[dataset]), after_id=half)
+            tail = b"".join(stream_export(resumed, "ndjson", True, session_factory=SessionBench))
+            lines = plain_ndjson.split(b"\n")
+            if gzip.decompress(tail) != b"\n".join(lines[half:]):
+                failures.append(f"{dataset} resume")
+        engine.dispose()
+
+    if failures:
+        print("MISMATCH: " + ", ".join(failures))
+        sys.exit(1)
+    print("row counts, gzip round trips and resume all check out")
+
+
+if __name__ == "__main__":
+    main()
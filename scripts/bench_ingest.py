@@ -0,0 +1,203 @@
+"""
+Benchmark + check: policy ingestion with batched, concurrent, deduplicated embedding
+(app.rag.ingest_policies) vs the old single Chroma.from_documents call.
+
+    python scripts/bench_ingest.py --docs 40 --sections 30 --request-ms 250 --per-text-ms 2
+
+Generates a synthetic policy library in a temp dir where every document repeats the same
+boilerplate (headers, disclaimers, escalation contacts) around its own sections. Embedding uses the
+fake backend with simulated request latency (--request-ms per request + --per-text-ms per text,
+requests of at most 1000 texts like OpenAIEmbeddings), so no OpenAI calls are made. Reports
+wall time, embedding requests and texts sent, then re-ingests after editing one document.
+The new path is throttled by the scheduler to --embed-rpm / --embed-tpm; the old one ignores quotas.
+Vector search is checked against a brute-force top-5: Chroma's HNSW index degrades when many
+identical vectors are inserted together, so copies are written last, in document order. Exits
+non-zero if the new path matches the exact search on fewer queries than the old one, or a re-ingest
+embeds more than the edit.
+"""
+
+import argparse
+import json
+import logging
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import rag  # noqa: E402
+from app.local_models import FakeEmbeddings  # noqa: E402
+
+BOILERPLATE = [
+    "CONFIDENTIAL - INTERNAL COMPLIANCE USE ONLY. This policy is owned by the Financial Crimes "
+    "Compliance office and is reviewed annually. Questions about its interpretation go to the policy "
+    "owner; exceptions require written approval from the BSA officer before any action is taken.",
+    "Analysts must document every decision in the case management system, including the evidence "
+    "reviewed, the signals that fired, and the rationale for the selected path. Incomplete notes are a "
+    "quality finding and will be returned for remediation during the monthly QA sample.",
+    "Nothing in this policy authorizes an analyst to freeze or restrict an account, file a regulatory "
+    "report, or contact law enforcement directly. Those actions are reserved for the escalation team "
+    "after review, and must follow the procedures in the escalation playbook.",
+    "Escalation contacts: fraud operations on-call (24x7), the BSA officer, and the regional "
+    "compliance lead. Use the on-call channel for anything time-sensitive; email is acceptable only "
+    "for routine questions that can wait until the next business day.",
+]
+WORDS = ("account device login payee transfer wire profile change email phone address velocity "
+         "threshold review monitor escalate request information customer verification identity risk "
+         "band signal score merchant card cash deposit withdrawal beneficiary").split()
+QUERIES = ["risk_band HIGH", "signals NEW_DEVICE_LOGIN", "signals NEW_PAYEE_LARGE_TRANSFER",
+           "request information from the customer", "freeze account escalation", "profile change email"]
+
+
+def section(rng: random.Random, title: str) -> str:
+    words = " ".join(rng.choice(WORDS) for _ in range(45))
+    return f"## {title}\n{words.capitalize()}."
+
+
+def write_library(root: Path, docs: int, sections: int, seed: int) -> None:
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    for d in range(docs):
+        parts = [BOILERPLATE[0]]
+        for s in range(sections):
+            parts.append(section(rng, f"Policy {d}.{s}"))
+            if s % 3 == 2:
+                parts.append(BOILERPLATE[1 + (s // 3) % 3])
+        parts.append(BOILERPLATE[3])
+        (root / f"policy_{d:03d}.md").write_text("\n\n".join(parts), encoding="utf-8")
+
+
+class BenchEmbeddings(FakeEmbeddings):
+    """FakeEmbeddings with per-request latency and request/text counters."""
+
+    def __init__(self, request_ms: float, per_text_ms: float):
+        super().__init__()
+        self.request_ms, self.per_text_ms = request_ms, per_text_ms
+        self.requests = self.texts = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        vectors = []
+        for i in range(0, len(texts), 1000):   # OpenAIEmbeddings sends at most chunk_size=1000 per request
+            part = texts[i:i + 1000]
+            time.sleep((self.request_ms + self.per_text_ms * len(part)) / 1000)
+            with self._lock:
+                self.requests += 1
+                self.texts += len(part)
+            vectors.extend(self._embed(t) for t in part)
+        return vectors
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+# The old embedding step: everything through one from_documents call, random ids
+def legacy_upsert(chunks, progress=None):
+    from langchain_chroma import Chroma
+    Chroma.from_documents(documents=chunks, embedding=rag._get_embeddings(),
+                          persist_directory=str(rag.PERSIST_DIR), collection_name=rag.COLLECTION_NAME)
+    return {"chunks": len(chunks)}
+
+
+# Chroma's top-5 (squared L2) distances for a query
+def top_distances(persist_dir: Path, embeddings: BenchEmbeddings, query: str):
+    from langchain_chroma import Chroma
+    db = Chroma(persist_directory=str(persist_dir), embedding_function=embeddings, collection_name=rag.COLLECTION_NAME)
+    return [round(score, 4) for _, score in db.similarity_search_with_score(query, 5)]
+
+
+# Brute-force top-5 distances over every chunk: what an exact search returns
+def exact_distances(chunk_texts, embeddings: BenchEmbeddings, query: str):
+    import numpy as np
+    matrix = np.array([embeddings._embed(t) for t in chunk_texts])
+    distances = ((matrix - np.array(embeddings._embed(query))) ** 2).sum(axis=1)
+    return [round(float(d), 4) for d in np.sort(distances)[:5]]
+
+
+def ingest(policy_dir: Path, persist_dir: Path, embeddings: BenchEmbeddings, legacy: bool):
+    persist_dir.mkdir(parents=True, exist_ok=True)
+    patches = [
+        mock.patch.object(rag, "POLICY_DIR", policy_dir),
+        mock.patch.object(rag, "PERSIST_DIR", persist_dir),
+        mock.patch.object(rag, "MANIFEST_PATH", persist_dir / "manifest.json"),
+        mock.patch.object(rag, "CHUNKS_PATH", persist_dir / "chunks.json"),
+        mock.patch.object(rag, "CITATION_INDEX_PATH", persist_dir / "citation_index.json"),
+        mock.patch.object(rag, "_get_embeddings", lambda: embeddings),
+        mock.patch.object(rag, "RETRIEVAL_MODE", "lexical"),   # citation index stays out of the timing
+    ]
+    if legacy:
+        patches.append(mock.patch.object(rag, "_upsert_chunk_vectors", legacy_upsert))
+    for p in patches:
+        p.start()
+    try:
+        started = time.perf_counter()
+        stats = rag.ingest_policies(signal_names=[])
+        elapsed = time.perf_counter() - started
+        retrieved = {q: top_distances(persist_dir, embeddings, q) for q in QUERIES}
+    finally:
+        for p in reversed(patches):
+            p.stop()
+    return stats, elapsed, retrieved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=40)
+    parser.add_argument("--sections", type=int, default=30)
+    parser.add_argument("--request-ms", type=float, default=250)
+    parser.add_argument("--per-text-ms", type=float, default=2)
+    parser.add_argument("--batch-size", type=int, default=rag.EMBED_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=rag.EMBED_CONCURRENCY)
+    parser.add_argument("--embed-rpm", type=float, default=5000)
+    parser.add_argument("--embed-tpm", type=float, default=5000000, help="the scheduler's token quota for the model")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rag.EMBED_BATCH_SIZE, rag.EMBED_CONCURRENCY = args.batch_size, args.concurrency
+    rag.EMBED_RPM_LIMIT, rag.EMBED_TPM_LIMIT = args.embed_rpm, args.embed_tpm
+
+    logging.getLogger("langchain_text_splitters").setLevel(logging.ERROR)   # "Created a chunk of size ..."
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        write_library(tmp / "policies", args.docs, args.sections, args.seed)
+
+        print(f"{'':>18}{'seconds':>9}{'requests':>10}{'texts':>8}{'chunks':>8}")
+        exact, hits_by_path = None, {}
+        for name, legacy in (("from_documents", True), ("batched + dedup", False)):
+            emb = BenchEmbeddings(args.request_ms, args.per_text_ms)
+            stats, elapsed, retrieved = ingest(tmp / "policies", tmp / name.replace(" ", ""), emb, legacy)
+            if exact is None:
+                texts = [c["text"] for c in json.loads((tmp / "from_documents" / "chunks.json").read_text(encoding="utf-8"))]
+                exact = {q: exact_distances(texts, emb, q) for q in QUERIES}
+            hits = sum(retrieved[q] == exact[q] for q in QUERIES)
+            print(f"{name:>18}{elapsed:>9.2f}{emb.requests:>10}{emb.texts:>8}{stats['chunks']:>8}"
+                  f"   exact top-5 on {hits}/{len(QUERIES)} queries")
+            hits_by_path[legacy] = hits
+        if hits_by_path[False] < hits_by_path[True]:
+            failures.append("vector search finds fewer exact neighbours than from_documents")
+
+        # Edit one document: only its new text should be embedded again
+        target = tmp / "policies" / "policy_000.md"
+        target.write_text(target.read_text(encoding="utf-8") + "\n\n" + section(random.Random(1), "Addendum"),
+                          encoding="utf-8")
+        emb = BenchEmbeddings(args.request_ms, args.per_text_ms)
+        stats, elapsed, _ = ingest(tmp / "policies", tmp / "batched+dedup", emb, legacy=False)
+        print(f"{'re-ingest, 1 edit':>18}{elapsed:>9.2f}{emb.requests:>10}{emb.texts:>8}{stats['chunks']:>8}"
+              f"   unchanged {stats['unchanged']}, reused {stats['reused']}, stale {stats['deleted']}")
+        if stats["embedded"] > 2:   # the addendum, plus possibly the last chunk it merged into
+            failures.append(f"re-ingest embedded {stats['embedded']} texts")
+        shutil.rmtree(tmp / "from_documents", ignore_errors=True)
+
+    if failures:
+        print("MISMATCH: " + ", ".join(failures))
+        sys.exit(1)
+    print("vector search is no worse than from_documents and re-ingest only embedded the edit")
+
+
+if __name__ == "__main__":
+    main()
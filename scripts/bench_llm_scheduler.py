@@ -0,0 +1,119 @@
+"""
+Benchmark: background LLM work and interactive analyst calls sharing one quota, with and without
+app.llm_scheduler.
+
+    python scripts/bench_llm_scheduler.py --quota-rpm 600 --duration 20 --batch-workers 24 --interactive-rps 1
+
+Uses the fake chat model with a simulated server-side quota (FAKE_LLM_RPM), so no OpenAI calls are
+made. Background workers loop over calls with random HIGH / MEDIUM / batch priority; interactive
+calls arrive at a fixed rate. Without the scheduler, a 429 is a failed call (the background worker
+sleeps 100ms and carries on). --scheduler-rpm above --quota-rpm simulates a misconfigured limit,
+where the scheduler has to find the quota from 429s. Reports throughput against the quota, 429s, interactive success rate
+and latency, and per-class waits from the scheduler.
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import llm_scheduler, local_models  # noqa: E402
+from app.llm_scheduler import BATCH, HIGH, INTERACTIVE, MEDIUM, ModelScheduler  # noqa: E402
+from app.local_models import FakeChatModel, FakeRateLimitError  # noqa: E402
+
+MODEL = "bench-model"
+MESSAGES = ["You are a compliance analyst assistant.", "Here is the case payload (JSON): {}\nAvailable citations: []"]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else float("nan")
+
+
+def run(args, scheduled: bool) -> dict:
+    llm_scheduler.LLM_SCHEDULER = scheduled
+    llm_scheduler._schedulers[MODEL] = ModelScheduler(MODEL, rpm=args.scheduler_rpm or args.quota_rpm, tpm=0)
+    local_models._quotas.clear()
+    model = FakeChatModel(model=MODEL)
+    stop = time.monotonic() + args.duration
+    lock = threading.Lock()
+    result = {"ok": 0, "rate_limited": 0, "interactive_ok": 0, "interactive_failed": 0, "interactive_latency": []}
+
+    def background():
+        rng = random.Random()
+        while time.monotonic() < stop:
+            try:
+                llm_scheduler.invoke(model, MESSAGES, rng.choice([HIGH, MEDIUM, BATCH, BATCH]))
+                with lock:
+                    result["ok"] += 1
+            except FakeRateLimitError:
+                with lock:
+                    result["rate_limited"] += 1
+                time.sleep(0.1)
+
+    def interactive():
+        started = time.monotonic()
+        try:
+            llm_scheduler.invoke(model, MESSAGES, INTERACTIVE)
+            ok = True
+        except FakeRateLimitError:
+            ok = False
+            with lock:
+                result["rate_limited"] += 1
+        with lock:
+            result["ok"] += ok
+            result["interactive_ok" if ok else "interactive_failed"] += 1
+            result["interactive_latency"].append(time.monotonic() - started)
+
+    threads = [threading.Thread(target=background, daemon=True) for _ in range(args.batch_workers)]
+    for t in threads:
+        t.start()
+    next_at = time.monotonic() + 1.0   # let the background flood build up first
+    while next_at < stop:
+        time.sleep(max(0.0, next_at - time.monotonic()))
+        t = threading.Thread(target=interactive, daemon=True)
+        t.start()
+        threads.append(t)
+        next_at += 1.0 / args.interactive_rps
+    for t in threads:
+        t.join()
+    result["stats"] = llm_scheduler._schedulers[MODEL].stats()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quota-rpm", type=float, default=600)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--batch-workers", type=int, default=24)
+    parser.add_argument("--interactive-rps", type=float, default=1)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--scheduler-rpm", type=float, default=None,
+                        help="scheduler's configured limit; set above --quota-rpm to exercise the 429 backoff")
+    args = parser.parse_args()
+
+    local_models.FAKE_LLM_RPM = args.quota_rpm
+    local_models.FAKE_LLM_LATENCY_MS = args.latency_ms
+    llm_scheduler.LLM_MAX_WAITING = args.batch_workers   # the bench has that many background callers
+
+    print(f"quota {args.quota_rpm:.0f} rpm ({args.quota_rpm / 60:.1f}/s), {args.batch_workers} background workers, "
+          f"{args.interactive_rps}/s interactive, {args.duration:.0f}s")
+    print(f"{'':>12}{'calls/s':>9}{'429 errs':>9}{'interactive ok':>16}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, scheduled in (("direct", False), ("scheduled", True)):
+        r = run(args, scheduled)
+        lat = r["interactive_latency"]
+        interactive_ok = f"{r['interactive_ok']}/{r['interactive_ok'] + r['interactive_failed']}"
+        print(f"{name:>12}{r['ok'] / args.duration:>9.1f}{r['rate_limited']:>9}{interactive_ok:>16}"
+              f"{percentile(lat, 0.5) * 1000:>9.0f}{percentile(lat, 0.95) * 1000:>9.0f}")
+        if scheduled:
+            s = r["stats"]
+            print(f"{'':>12}scheduler: dispatched {s['dispatched']}, waits p95 ms "
+                  f"{ {k: v['p95'] for k, v in s['wait_ms'].items()} }, 429s {s['rate_limited']}")
+
+
+if __name__ == "__main__":
+    main()
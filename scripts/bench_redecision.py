@@ -0,0 +1,133 @@
+"""
+Benchmark: re-deciding accounts that already have an AI decision, full case prompt vs incremental
+re-decisioning (app/redecision.py).
+
+    python scripts/bench_redecision.py --accounts 2000 --history 40 --new-events 2 --risky 0.2
+
+For each synthetic account, a decision is made on its history. Then --new-events more events
+arrive. Most of them are routine (known devices, small transfers to known payees); a --risky share
+can fire a signal. Both ways of re-deciding are compared: how many model calls each makes and how
+many prompt tokens each tier is sent (the fast tier's compact prompt keeps only 8 timeline
+events, the strong tier's keeps 20). Everything runs in memory. It uses the real signal rules,
+delta and materiality checks, and prompt builders, with no model calls.
+"""
+
+import argparse
+import random
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.ai_reasoning import _build_messages, _build_policy_citations  # noqa: E402
+from app.llm_scheduler import estimate_tokens  # noqa: E402
+from app.local_models import _fake_decision  # noqa: E402
+from app.redecision import plan_from_prior  # noqa: E402
+from app.risk import assess_risk  # noqa: E402
+from app.signals import EventRecord, compute_signals  # noqa: E402
+
+POLICY_DIR = Path(__file__).resolve().parent.parent / "policies"
+POLICY_VERSION = "bench"
+
+
+def make_event(rng: random.Random, event_id: int, at: datetime, risky: bool) -> dict:
+    kind = rng.choice(["device_login", "device_login", "transaction_posted", "transaction_posted", "profile_change"])
+    if kind == "profile_change" and not risky:
+        kind = "device_login"
+    if kind == "device_login":
+        payload = {"device_id": f"d{rng.randint(1, 8)}" if risky else "d1",
+                   "ip": f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}", "user_agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4)",
+                   "channel": "mobile"}
+    elif kind == "profile_change":
+        payload = {"changed_fields": [rng.choice(["email", "phone", "address"])], "channel": "web"}
+    else:
+        payload = {"amount": rng.choice([4000, 9000]) if risky else rng.choice([25, 80, 140, 600]), "currency": "CAD",
+                   "counterparty": f"p{rng.randint(1, 9)}" if risky else "p1", "channel": "online_banking",
+                   "memo": "bill payment" if not risky else "transfer"}
+    return {"event_id": event_id, "event_type": kind, "created_at": at.isoformat(), "payload": payload}
+
+
+def case_from(account_id: str, timeline: list) -> dict:
+    events = [EventRecord(t["event_id"], t["event_type"], datetime.fromisoformat(t["created_at"]), t["payload"])
+              for t in timeline]
+    signals = compute_signals(events)
+    return {"account_id": account_id, "timeline": timeline, "signals": signals,
+            "risk_assessment": assess_risk(account_id=account_id, signals=signals)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=40, help="events per account before the prior decision")
+    parser.add_argument("--new-events", type=int, default=2)
+    parser.add_argument("--risky", type=float, default=0.2, help="share of new events that may fire a signal")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    snippets = [
+        {"source": p.name, "chunk_id": f"{p.name}#chunk_0", "snippet": p.read_text(encoding="utf-8")[:450]}
+        for p in sorted(POLICY_DIR.glob("*.md"))[:3]
+    ]
+    citations = _build_policy_citations(snippets)
+
+    modes = Counter()
+    tokens = {"full": [0, 0], "incremental": [0, 0]}   # fast tier (compact prompt), strong tier
+    calls = {"full": 0, "incremental": 0}
+    now = datetime.now(timezone.utc)
+    for a in range(args.accounts):
+        account_id = f"ACC{a:06d}"
+        at = now - timedelta(days=20)
+        timeline = [   # the account's usual device and payee
+            {"event_id": 1, "event_type": "device_login", "created_at": at.isoformat(), "payload": {"device_id": "d1"}},
+            {"event_id": 2, "event_type": "transaction_posted", "created_at": at.isoformat(),
+             "payload": {"amount": 40, "currency": "CAD", "counterparty": "p1"}},
+        ]
+        for i in range(2, args.history):
+            at += timedelta(minutes=rng.choice([30, 240, 600]))
+            timeline.append(make_event(rng, i + 1, at, risky=rng.random() < 0.2))
+        basis = case_from(account_id, timeline)
+        prompt = {"risk_band": basis["risk_assessment"]["risk_band"], "fired_signals": basis["risk_assessment"]["fired_signals"],
+                  "account_id": account_id, "timeline": timeline[-20:]}
+        ai_output = _fake_decision(prompt, citations).model_dump()
+        prior = {
+            "decision_uid": f"d{a}", "decided_at": now - timedelta(hours=1), "basis_case_version": 1, "basis": basis,
+            "context": {"ai_output": ai_output, "evidence_event_ids": ai_output["evidence_event_ids"],
+                        "ai_routed_path": ai_output["workflow_path"], "policy_version": POLICY_VERSION},
+        }
+
+        for i in range(args.new_events):
+            at = max(at, now - timedelta(minutes=30)) + timedelta(minutes=1)
+            timeline = timeline + [make_event(rng, args.history + i + 1, at, risky=rng.random() < args.risky)]
+        case_obj = case_from(account_id, timeline)
+
+        full_tokens = [estimate_tokens(_build_messages(case_obj, snippets, citations, compact=compact)) for compact in (True, False)]
+        calls["full"] += 1
+
+        plan = plan_from_prior(prior, case_obj, POLICY_VERSION)
+        modes[plan["mode"]] += 1
+        if plan["mode"] == "incremental":
+            sent = [estimate_tokens(_build_messages(case_obj, snippets, citations, compact=compact, plan=plan)) for compact in (True, False)]
+        else:
+            sent = full_tokens if plan["mode"] == "full" else [0, 0]
+        calls["incremental"] += plan["mode"] != "reused"
+        for tier in (0, 1):
+            tokens["full"][tier] += full_tokens[tier]
+            tokens["incremental"][tier] += sent[tier]
+
+    n = args.accounts
+    print(f"{n} accounts, {args.history} prior events, {args.new_events} new ({args.risky:.0%} risky)")
+    print("incremental mode picked: " + ", ".join(f"{m} {modes[m]} ({modes[m] / n:.0%})" for m in ("reused", "incremental", "full")))
+    print(f"{'':>14}{'model calls':>13}{'fast-tier tokens':>18}{'per call':>10}{'strong-tier tokens':>20}{'per call':>10}")
+    for name in ("full", "incremental"):
+        fast, strong = tokens[name]
+        per = max(calls[name], 1)
+        print(f"{name:>14}{calls[name]:>13}{fast:>18,}{fast / per:>10,.0f}{strong:>20,}{strong / per:>10,.0f}")
+    for tier, label in ((0, "fast"), (1, "strong")):
+        print(f"{label}-tier prompt tokens saved: {1 - tokens['incremental'][tier] / tokens['full'][tier]:.0%}")
+
+
+if __name__ == "__main__":
+    main()
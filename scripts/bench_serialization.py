@@ -0,0 +1,103 @@
+"""
+Benchmark: FastAPI's default JSON path vs the orjson fast path on large synthetic cases.
+
+    python scripts/bench_serialization.py --events 1000 10000 50000
+
+Default path = jsonable_encoder + json.dumps (what JSONResponse does for a plain dict).
+Fast path    = app.serialization.dumps (orjson, datetimes encoded natively).
+Reports best-of-N wall time and peak traced allocations per encode.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.serialization import dumps  # noqa: E402
+
+
+# Case object shaped like app.case.build_case output, with datetime objects in the timeline
+def make_case(n_events: int) -> Dict[str, Any]:
+    start = datetime.now(timezone.utc) - timedelta(days=29)
+    timeline = []
+    for i in range(n_events):
+        kind = random.choice(["device_login", "profile_change", "transaction_posted"])
+        if kind == "device_login":
+            payload = {"device_id": f"dev-{random.randint(1, 50)}", "ip": "10.0.0.1", "user_agent": "Mozilla/5.0"}
+        elif kind == "profile_change":
+            payload = {"changed_fields": ["email", "phone"]}
+        else:
+            payload = {"amount": round(random.uniform(5, 9000), 2), "currency": "CAD", "counterparty": f"payee-{i % 300}"}
+        timeline.append({
+            "event_id": i + 1,
+            "event_type": kind,
+            "created_at": start + timedelta(seconds=i * 30),
+            "payload": payload,
+        })
+
+    return {
+        "case_id": "CASE-BENCH-v1",
+        "account_id": "BENCH",
+        "created_at": datetime.now(timezone.utc),
+        "timeline": timeline,
+        "signals": [{"signal_name": "LARGE_TRANSACTION", "why_it_fired": "bench", "evidence_event_ids": [1, 2, 3]}],
+        "risk_assessment": {"risk_score": 25, "risk_band": "LOW", "confidence": 0.25, "score_breakdown": {}, "fired_signals": []},
+    }
+
+
+def default_path(case: Dict[str, Any]) -> bytes:
+    return json.dumps(
+        jsonable_encoder(case), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(case: Dict[str, Any]) -> bytes:
+    return dumps(case)
+
+
+def measure(fn: Callable[[Dict[str, Any]], bytes], case: Dict[str, Any], repeat: int) -> Tuple[float, int, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = len(fn(case))
+        best = min(best, time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn(case)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(7)
+    header = f"{'events':>8}{'bytes':>12}{'default ms':>12}{'fast ms':>10}{'speedup':>9}{'default MB':>12}{'fast MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for n in args.events:
+        case = make_case(n)
+        d_time, d_peak, size = measure(default_path, case, args.repeat)
+        f_time, f_peak, _ = measure(fast_path, case, args.repeat)
+        print(
+            f"{n:>8}{size:>12}{d_time * 1000:>12.1f}{f_time * 1000:>10.1f}{d_time / f_time:>8.1f}x"
+            f"{d_peak / 1e6:>12.1f}{f_peak / 1e6:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: cold-start time of `import app.main` per APP_PROFILE.
+
+    python scripts/bench_startup.py --profiles full ingest scoring --runs 5
+
+Each run is a fresh interpreter (nothing cached in sys.modules), so this is what a new
+worker pays before it can serve. Reports the import time of app.main, the whole process
+wall time, and whether the LangChain / Chroma / OpenAI stacks were loaded at import.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ["langchain_core", "langchain_openai", "langchain_chroma", "chromadb", "openai"]
+
+# Runs inside the child interpreter
+CHILD = f"""
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps({{"import_s": elapsed, "heavy": heavy, "paths": len(app.main.app.openapi()["paths"])}}))
+"""
+
+
+def run_once(profile: str) -> dict:
+    env = {**os.environ, "APP_PROFILE": profile}
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - t0
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["wall_s"] = wall
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["full", "ingest", "scoring"])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    run_once(args.profiles[0])   # warm the OS file cache / .pyc files first
+
+    header = f"{'profile':>8}{'paths':>8}{'import ms (med)':>17}{'import ms (min)':>17}{'process ms':>12}  heavy modules loaded"
+    print(header)
+    print("-" * len(header))
+    for profile in args.profiles:
+        runs = [run_once(profile) for _ in range(args.runs)]
+        imports = [r["import_s"] * 1000 for r in runs]
+        walls = [r["wall_s"] * 1000 for r in runs]
+        heavy = ", ".join(runs[-1]["heavy"]) or "none"
+        print(
+            f"{profile:>8}{runs[-1]['paths']:>8}{statistics.median(imports):>17.0f}{min(imports):>17.0f}"
+            f"{statistics.median(walls):>12.0f}  {heavy}"
+        )
+
+
+if __name__ == "__main__":
+    main()
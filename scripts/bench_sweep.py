@@ -0,0 +1,103 @@
+"""
+Benchmark: portfolio sweep throughput by worker count, on a synthetic events database.
+
+    python scripts/bench_sweep.py --accounts 20000 --events-per-account 15 --workers 1 2 4
+
+Builds a temporary SQLite DB, runs app.sweep.run_sweep once per worker count, and checks a
+sample of account_risk rows against the single-account path (build_signals + assess_risk).
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import AccountRisk, Event  # noqa: E402
+from app.risk import assess_risk  # noqa: E402
+from app.signals import build_signals  # noqa: E402
+
+
+def build_events(database_url: str, accounts: int, per_account: int, seed: int) -> None:
+    rng = random.Random(seed)
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    start = datetime.now(timezone.utc) - timedelta(days=20)
+    rows = []
+    for a in range(accounts):
+        at = start
+        for _ in range(per_account):
+            at += timedelta(minutes=rng.choice([5, 60, 600, 1500]))
+            kind = rng.choice(["device_login", "profile_change", "transaction_posted", "transaction_posted"])
+            if kind == "device_login":
+                payload = {"device_id": f"d{rng.randint(1, 4)}"}
+            elif kind == "profile_change":
+                payload = {"changed_fields": ["email"]}
+            else:
+                payload = {"amount": rng.choice([50, 900, 3500, 9000]), "currency": "CAD", "counterparty": f"p{rng.randint(1, 6)}"}
+            rows.append({"account_id": f"ACC{a:07d}", "event_type": kind, "created_at": at, "payload": payload})
+        if len(rows) >= 50000:
+            with engine.begin() as conn:
+                conn.execute(insert(Event), rows)
+            rows = []
+    if rows:
+        with engine.begin() as conn:
+            conn.execute(insert(Event), rows)
+    engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=20000)
+    parser.add_argument("--events-per-account", type=int, default=15)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--check", type=int, default=200, help="accounts to verify against build_signals + assess_risk")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SWEEP_CHECKPOINT_DIR"] = os.path.join(tmp, "sweeps")   # read by app.sweep and its pool workers
+        from app.sweep import run_sweep
+
+        database_url = f"sqlite:///{os.path.join(tmp, 'sweep_bench.db')}"
+        t0 = time.perf_counter()
+        build_events(database_url, args.accounts, args.events_per_account, args.seed)
+        total_events = args.accounts * args.events_per_account
+        print(f"built {args.accounts} accounts / {total_events} events in {time.perf_counter() - t0:.1f}s")
+
+        print(f"{'workers':>8}{'seconds':>10}{'accounts/s':>12}{'speedup':>9}")
+        baseline = None
+        for workers in args.workers:
+            result = run_sweep(database_url=database_url, workers=workers)
+            elapsed = result["elapsed_s"]
+            baseline = baseline or elapsed
+            print(f"{workers:>8}{elapsed:>10.2f}{result['accounts_done'] / elapsed:>12,.0f}{baseline / elapsed:>9.2f}")
+            assert result["accounts_done"] == args.accounts, result
+
+        engine = create_engine(database_url)
+        db = sessionmaker(bind=engine)()
+        rng = random.Random(args.seed)
+        for account_id in rng.sample([f"ACC{a:07d}" for a in range(args.accounts)], min(args.check, args.accounts)):
+            expected = assess_risk(account_id, build_signals(db, account_id))
+            row = db.get(AccountRisk, account_id)
+            got = (row.risk_score, row.risk_band, row.confidence, row.fired_signals, row.score_breakdown)
+            want = (expected["risk_score"], expected["risk_band"], expected["confidence"], expected["fired_signals"], expected["score_breakdown"])
+            if got != want:
+                print(f"MISMATCH for {account_id}: sweep={got} direct={want}")
+                sys.exit(1)
+        db.close()
+        engine.dispose()
+        print(f"{min(args.check, args.accounts)} sampled accounts match build_signals + assess_risk")
+
+
+if __name__ == "__main__":
+    main()
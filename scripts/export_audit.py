@@ -0,0 +1,113 @@
+"""
+Export the audit trail to a file (or stdout) as NDJSON or CSV, optionally gzip-compressed.
+
+    python scripts/export_audit.py --dataset actions --format csv --gzip --out audit.csv.gz
+    python scripts/export_audit.py --dataset decisions --start 2026-01-01 --end 2026-04-01 --out q1.ndjson
+    python scripts/export_audit.py --out audit.csv.gz --resume        # continue an interrupted export
+
+Same rows as GET /export/audit (see app/export.py). While writing to a file, a checkpoint
+(<out>.checkpoint.json: cursor token, last id, byte offset) is saved every --checkpoint-rows rows,
+at a point where the file is complete (gzip member closed). --resume truncates the file back to
+that offset and appends the rest. The checkpoint is removed when the export finishes.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import SessionLocal, init_db  # noqa: E402
+from app.export import DATASETS, FORMATS, ExportEncoder, export_cursor, iter_batches, plan_export  # noqa: E402
+
+
+def save_checkpoint(path: Path, state: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", choices=DATASETS, default="actions")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--account-id", default=None)
+    parser.add_argument("--action", action="append", default=None, help="repeatable, e.g. --action OVERRIDE")
+    parser.add_argument("--out", default="-", help="file path, or - for stdout (no checkpoints)")
+    parser.add_argument("--resume", action="store_true", help="continue from <out>.checkpoint.json")
+    parser.add_argument("--checkpoint-rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    init_db()
+    to_stdout = args.out == "-"
+    checkpoint_path = None if to_stdout else Path(args.out + ".checkpoint.json")
+    checkpoint = None
+    if args.resume:
+        if checkpoint_path is None or not checkpoint_path.exists():
+            sys.exit("--resume needs --out <file> with an existing checkpoint")
+        checkpoint = json.loads(checkpoint_path.read_text())
+
+    db = SessionLocal()
+    try:
+        if checkpoint:
+            spec = plan_export(db, cursor=checkpoint["cursor"], after_id=checkpoint["after_id"])
+        else:
+            actions = sorted({a.upper() for a in args.action}) if args.action else None
+            spec = plan_export(db, dataset=args.dataset, start=args.start, end=args.end,
+                               account_id=args.account_id, actions=actions)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    finally:
+        db.close()
+
+    fmt = checkpoint["format"] if checkpoint else args.format
+    compress = checkpoint["gzip"] if checkpoint else args.gzip
+    if to_stdout:
+        out = sys.stdout.buffer
+    else:
+        out = open(args.out, "r+b" if checkpoint else "wb")
+        if checkpoint:
+            out.truncate(checkpoint["offset"])   # drop whatever was written after the last checkpoint
+            out.seek(checkpoint["offset"])
+
+    cursor = export_cursor(spec)
+    encoder = ExportEncoder(spec["dataset"], fmt, compress=compress, header=not spec["after_id"])
+    total = checkpoint["rows"] if checkpoint else 0
+    since_checkpoint = 0
+    started = time.perf_counter()
+    try:
+        for batch in iter_batches(spec):
+            out.write(encoder.encode(batch))
+            total += len(batch)
+            since_checkpoint += len(batch)
+            if checkpoint_path and since_checkpoint >= args.checkpoint_rows:
+                out.write(encoder.finish())
+                out.flush()
+                save_checkpoint(checkpoint_path, {
+                    "cursor": cursor, "after_id": batch[-1]["id"], "offset": out.tell(), "rows": total,
+                    "format": fmt, "gzip": compress,
+                })
+                encoder = ExportEncoder(spec["dataset"], fmt, compress=compress, header=False)
+                since_checkpoint = 0
+                print(f"{total} rows, {time.perf_counter() - started:.1f}s", file=sys.stderr, flush=True)
+        out.write(encoder.finish())
+        out.flush()
+    finally:
+        if not to_stdout:
+            out.close()
+
+    if checkpoint_path and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    print(f"exported {total} {spec['dataset']} rows (ids {spec['after_id']}..{spec['until_id']}) "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,35 @@
 """
 To be run anytime the policy documents change
 
+    python scripts/ingest_policies.py --batch-size 128 --concurrency 4
+
+Only new or changed chunk texts are embedded; unchanged chunks keep their vectors.
 """
 
-from app.rag import ingest_policies
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import rag  # noqa: E402
+
+
+def report(stats: dict) -> None:
+    print(f"embedded {stats['embedded']}/{stats['to_embed']} unique texts, {stats['elapsed_s']:.1f}s",
+          file=sys.stderr, flush=True)
+
 
 if __name__ == "__main__":
-    ingest_policies()
-    print("Policy ingestion complete. Vector DB created in db/chroma_policy/")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=rag.EMBED_BATCH_SIZE, help="texts per embedding request")
+    parser.add_argument("--concurrency", type=int, default=rag.EMBED_CONCURRENCY, help="embedding requests in flight")
+    args = parser.parse_args()
+    rag.EMBED_BATCH_SIZE = args.batch_size
+    rag.EMBED_CONCURRENCY = args.concurrency
+
+    stats = rag.ingest_policies(progress=report)
+    print(f"{stats['chunks']} chunks: {stats['unchanged']} unchanged, {stats['reused']} reused vectors, "
+          f"{stats['embedded']} texts embedded ({stats['chunks'] - stats['unchanged'] - stats['unique_texts']} duplicates "
+          f"collapsed), {stats['deleted']} stale removed in {stats['elapsed_s']:.1f}s")
+    print("Policy ingestion complete. Vector DB and citation index created in db/chroma_policy/")
@@ -0,0 +1,185 @@
+"""
+Open-loop load driver for the compliance API.
+Point the server at the local stand-ins first so no OpenAI calls are made:
+
+    LLM_BACKEND=fake EMBEDDING_BACKEND=fake python scripts/ingest_policies.py
+    LLM_BACKEND=fake EMBEDDING_BACKEND=fake uvicorn app.main:app --workers 4
+
+Then run for example:
+
+    python scripts/load_test.py --rps 50 --duration 60 --mix events=6,risk=2,ai_decision=1,actions=1
+
+Requests are scheduled at a fixed rate (not "send when the last one returns"), and latency
+is measured from the scheduled start so queueing delay shows up in the tail.
+"""
+
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import requests
+
+ENDPOINTS = ("events", "risk", "ai_decision", "actions")
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+# Random raw event that can trip every signal type
+def _random_event(account_id: str) -> Dict:
+    kind = random.choice(["device_login", "profile_change", "transaction_posted", "transaction_posted"])
+    if kind == "device_login":
+        payload = {"device_id": f"dev-{random.randint(1, 20)}"}
+    elif kind == "profile_change":
+        payload = {"changed_fields": random.sample(["email", "phone", "address"], k=1)}
+    else:
+        payload = {
+            "amount": random.choice([50, 250, 900, 3200, 7500]),
+            "currency": "CAD",
+            "counterparty": f"payee-{random.randint(1, 50)}",
+        }
+    return {
+        "event_type": kind,
+        "account_id": account_id,
+        "event_timestamp": datetime.now(timezone.utc).isoformat(),
+        "payload": payload,
+    }
+
+
+class LoadRun:
+    def __init__(self, base_url: str, accounts: List[str], timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.accounts = accounts
+        self.timeout = timeout
+        self.case_ids: List[Tuple[str, str]] = []   # (case_id, account_id) from ai_decision responses
+        self.results: Dict[str, List[Tuple[float, bool]]] = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def _send(self, endpoint: str) -> bool:
+        s = _session()
+        account_id = random.choice(self.accounts)
+
+        if endpoint == "events":
+            r = s.post(f"{self.base_url}/events", json=_random_event(account_id), timeout=self.timeout)
+        elif endpoint == "risk":
+            r = s.get(f"{self.base_url}/risk/{account_id}", timeout=self.timeout)
+        elif endpoint == "ai_decision":
+            r = s.get(f"{self.base_url}/ai_decision/{account_id}", timeout=self.timeout)
+            if r.status_code == 200:
+                with self.lock:
+                    self.case_ids.append((r.json()["case_id"], account_id))
+        else:
+            with self.lock:
+                case_id, acc = random.choice(self.case_ids) if self.case_ids else (f"CASE-{account_id}-loadtest", account_id)
+            action = random.choice(["APPROVE", "APPROVE", "OVERRIDE", "REQUEST_INFO"])
+            r = s.post(
+                f"{self.base_url}/cases/actions",
+                json={
+                    "case_id": case_id,
+                    "account_id": acc,
+                    "action": action,
+                    "reason": "load test override" if action == "OVERRIDE" else None,
+                    "extra_data": {"override_to_path": "REVIEW"} if action == "OVERRIDE" else {},
+                },
+                timeout=self.timeout,
+            )
+        return r.status_code < 400
+
+    def fire(self, endpoint: str, scheduled_at: float) -> None:
+        try:
+            ok = self._send(endpoint)
+        except requests.RequestException:
+            ok = False
+        latency = time.perf_counter() - scheduled_at
+        with self.lock:
+            self.results[endpoint].append((latency, ok))
+
+
+def _parse_mix(mix: str) -> Tuple[List[str], List[float]]:
+    names, weights = [], []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name} (expected one of {ENDPOINTS})")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _report(run: LoadRun, elapsed: float, target_rps: float) -> None:
+    print(f"\nTarget {target_rps:.1f} rps over {elapsed:.1f}s\n")
+    header = f"{'endpoint':<12}{'count':>8}{'rps':>9}{'err%':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+
+    all_rows: List[Tuple[float, bool]] = []
+    for endpoint in ENDPOINTS + ("total",):
+        rows = all_rows if endpoint == "total" else run.results.get(endpoint, [])
+        if endpoint != "total":
+            all_rows.extend(rows)
+        if not rows:
+            continue
+        lat = sorted(r[0] * 1000 for r in rows)
+        errors = sum(1 for r in rows if not r[1])
+        print(
+            f"{endpoint:<12}{len(rows):>8}{len(rows) / elapsed:>9.1f}{errors / len(rows) * 100:>8.1f}"
+            f"{_percentile(lat, 50):>10.1f}{_percentile(lat, 95):>10.1f}{_percentile(lat, 99):>10.1f}{lat[-1]:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the compliance API at a target request rate.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=20.0, help="Target requests per second (all endpoints)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--accounts", type=int, default=100, help="Number of synthetic accounts")
+    parser.add_argument("--seed-events", type=int, default=5, help="Events to post per account before the run")
+    parser.add_argument("--mix", default="events=6,risk=2,ai_decision=1,actions=1", help="Relative endpoint weights")
+    parser.add_argument("--max-workers", type=int, default=64, help="Concurrent in-flight requests")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    accounts = [f"LOAD{i:05d}" for i in range(args.accounts)]
+    run = LoadRun(args.base_url, accounts, args.timeout)
+    names, weights = _parse_mix(args.mix)
+
+    # Seed each account so risk/ai_decision have something to work on
+    for account_id in accounts:
+        for _ in range(args.seed_events):
+            _session().post(f"{run.base_url}/events", json=_random_event(account_id), timeout=args.timeout)
+
+    interval = 1.0 / args.rps
+    total = int(args.rps * args.duration)
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.max_workers) as pool:
+        for i in range(total):
+            scheduled_at = start + i * interval
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run.fire, random.choices(names, weights)[0], scheduled_at)
+
+    _report(run, time.perf_counter() - start, args.rps)
+
+
+if __name__ == "__main__":
+    main()
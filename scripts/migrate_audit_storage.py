@@ -0,0 +1,50 @@
+"""
+Move pre-normalization audit rows into case_decisions / decision_signals.
+
+    python scripts/migrate_audit_storage.py --vacuum
+
+The API runs the same migration at startup; this script is for running it ahead of a deploy
+(and reclaiming the freed space with VACUUM, which the API does not do on its own).
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.audit_migration import migrate_case_actions  # noqa: E402
+from app.database import SessionLocal, engine, init_db  # noqa: E402
+
+
+def db_size() -> int:
+    path = engine.url.database
+    return os.path.getsize(path) if path and os.path.exists(path) else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the database file")
+    args = parser.parse_args()
+
+    init_db()
+    before = db_size()
+    db = SessionLocal()
+    try:
+        counts = migrate_case_actions(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"migrated: {counts}")
+
+    if args.vacuum:
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
+    print(f"database size: {before / 1e6:.2f} MB -> {db_size() / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Score every account with events in the lookback window and store the results in account_risk.
+
+    python scripts/sweep_accounts.py --workers 8
+    python scripts/sweep_accounts.py --resume 20261018T101500-3fa2c1     # continue an interrupted sweep
+
+Accounts are sharded by crc32(account_id) ranges over a process pool (see app/sweep.py). Checkpoints
+live in db/sweeps/<sweep_id>/; re-running with --resume skips finished shards and accounts.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import DATABASE_URL  # noqa: E402
+from app.sweep import SWEEP_WORKERS, run_sweep  # noqa: E402
+
+
+def print_progress(p: dict) -> None:
+    rate = p["accounts_done"] / p["elapsed_s"] if p["elapsed_s"] else 0.0
+    print(
+        f"[{p['sweep_id']}] shards {p['shards_done']}/{p['shards']}  accounts {p['accounts_done']}  "
+        f"events {p['events_done']}  {rate:,.0f} accounts/s  {p['elapsed_s']}s",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    parser.add_argument("--shards", type=int, default=None, help="defaults to --workers; fixed for a sweep once started")
+    parser.add_argument("--resume", metavar="SWEEP_ID", default=None)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args()
+
+    result = run_sweep(
+        database_url=args.database_url,
+        workers=args.workers,
+        shards=args.shards,
+        sweep_id=args.resume,
+        progress=print_progress,
+    )
+    print(f"done: {result}")
+
+
+if __name__ == "__main__":
+    main()
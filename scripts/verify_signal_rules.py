@@ -0,0 +1,114 @@
+"""
+Verify the compiled declarative rules (rules/signal_rules.yaml) produce exactly the same
+signals as the built-in engine in app.signals, on edge cases and random event streams.
+
+    python scripts/verify_signal_rules.py --streams 2000
+
+Exits non-zero on the first mismatch and prints the event stream that caused it.
+Also reports evaluation time of both engines.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.rules import load_ruleset  # noqa: E402
+from app.signals import RULES_PATH, LOOKBACK_DAYS, compute_signals_builtin  # noqa: E402
+
+
+def _event(i: int, kind: str, at: datetime, payload) -> SimpleNamespace:
+    return SimpleNamespace(id=i, event_type=kind, created_at=at, payload=payload)
+
+
+def random_stream(n: int) -> List[SimpleNamespace]:
+    at = datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)
+    events = []
+    for i in range(1, n + 1):
+        at += timedelta(minutes=random.choice([1, 30, 300, 1500]))
+        kind = random.choice(["device_login", "profile_change", "transaction_posted", "unknown_type"])
+        if kind == "device_login":
+            payload = random.choice([{"device_id": f"d{random.randint(1, 4)}"}, {"device_id": ""}, {}, None])
+        elif kind == "profile_change":
+            payload = random.choice([{"changed_fields": ["email"]}, {}, {"changed_fields": None}])
+        elif kind == "transaction_posted":
+            payload = {
+                "amount": random.choice([10, 2999, 3000, 3000.5, 9000, "5000", None, True]),
+                "counterparty": random.choice(["p1", "p2", "p3", "", None]),
+            }
+            if random.random() < 0.5:
+                payload["currency"] = random.choice(["CAD", "USD", None])
+            if random.random() < 0.1:
+                del payload["amount"]
+        else:
+            payload = {"anything": 1}
+        events.append(_event(i, kind, at, payload))
+    return events
+
+
+def edge_cases() -> List[List[SimpleNamespace]]:
+    t = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        [],
+        # profile change then large transfer to a new payee inside 24h (all five signal types)
+        [
+            _event(1, "device_login", t, {"device_id": "d1"}),
+            _event(2, "profile_change", t + timedelta(hours=1), {"changed_fields": ["email"]}),
+            _event(3, "transaction_posted", t + timedelta(hours=2), {"amount": 5000, "counterparty": "p1"}),
+        ],
+        # exactly on the 24h boundary, then just past it
+        [
+            _event(1, "profile_change", t, {}),
+            _event(2, "transaction_posted", t + timedelta(hours=24), {"amount": 1}),
+            _event(3, "transaction_posted", t + timedelta(hours=24, seconds=1), {"amount": 1}),
+        ],
+        # small transfer makes a payee known, so a later large one is not "new"
+        [
+            _event(1, "transaction_posted", t, {"amount": 10, "counterparty": "p1"}),
+            _event(2, "transaction_posted", t + timedelta(hours=1), {"amount": 9000, "counterparty": "p1"}),
+        ],
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=2000, help="Random event streams to compare")
+    parser.add_argument("--max-events", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rules", type=Path, default=RULES_PATH)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    ruleset = load_ruleset(args.rules, constants={"lookback_days": LOOKBACK_DAYS})
+    streams = edge_cases() + [random_stream(random.randint(1, args.max_events)) for _ in range(args.streams)]
+
+    builtin_time = compiled_time = 0.0
+    for n, events in enumerate(streams):
+        t0 = time.perf_counter()
+        expected = compute_signals_builtin(events)
+        t1 = time.perf_counter()
+        actual = ruleset.evaluate(events)
+        t2 = time.perf_counter()
+        builtin_time += t1 - t0
+        compiled_time += t2 - t1
+
+        if actual != expected:
+            print(f"MISMATCH on stream #{n}")
+            for e in events:
+                print(f"  {e.id:>3} {e.event_type:<20} {e.created_at.isoformat()} {e.payload}")
+            print("built-in:", expected)
+            print("compiled:", actual)
+            sys.exit(1)
+
+    print(f"OK: {len(streams)} streams, rules version {ruleset.version} ({', '.join(ruleset.rule_names)})")
+    print(f"built-in {builtin_time * 1000:.1f} ms, compiled {compiled_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
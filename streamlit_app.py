@@ -1,3 +1,4 @@
+import json
 import streamlit as st
 import requests
 from datetime import datetime
@@ -17,10 +18,26 @@ if "case_data" not in st.session_state:
 # -----------------------------
 # Generate Case
 # -----------------------------
+# Read Server-Sent Events from the streaming endpoint as (event, data) pairs
+def iter_sse(res):
+    event, data = None, []
+    for line in res.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+        elif not line and event:
+            yield event, json.loads("\n".join(data))
+            event, data = None, []
+
+
 if st.button("Generate Case"):
-    with st.spinner("Generating case..."):
-        try:
-            res = requests.get(f"{API_BASE}/ai_decision/{account_id}")
+    # Each stage is shown as soon as the API sends it instead of one long spinner
+    status = st.status("Building case...", expanded=True)
+    narrative_box = st.empty()
+    data = None
+    try:
+        with requests.get(f"{API_BASE}/ai_decision/{account_id}/stream", stream=True, timeout=300) as res:
 
             # If the API fails, show the exact error message
             if res.status_code != 200:
@@ -28,12 +45,38 @@ if st.button("Generate Case"):
                 st.code(res.text)
                 st.stop()
 
-            data = res.json()
-
-        except Exception as e:
-            st.error("Request failed")
-            st.code(str(e))
-            st.stop()
+            narrative = ""
+            for event, payload in iter_sse(res):
+                if event == "case":
+                    risk = payload.get("risk_assessment", {})
+                    status.write(f"Case {payload.get('case_id')}: risk **{risk.get('risk_band')}** ({risk.get('risk_score')})")
+                    status.update(label="Retrieving policy...")
+                elif event == "policy":
+                    status.write(f"{len(payload.get('policy_snippets', []))} policy snippets retrieved")
+                    status.update(label="AI is writing the narrative...")
+                elif event == "escalated":
+                    narrative = ""   # the strong model starts over
+                    status.write(f"Escalated to the {payload.get('to_tier')} model: {', '.join(payload.get('reasons', []))}")
+                elif event == "token":
+                    narrative += payload.get("text", "")
+                    narrative_box.markdown(f"**Narrative (draft):** {narrative}")
+                elif event == "final":
+                    data = payload
+                elif event == "error":
+                    st.error(payload.get("detail", "AI decision failed"))
+                    st.stop()
+
+    except Exception as e:
+        st.error("Request failed")
+        st.code(str(e))
+        st.stop()
+
+    if data is None:
+        st.error("Stream ended before the final decision")
+        st.stop()
+
+    status.update(label="Case Generated", state="complete", expanded=False)
+    narrative_box.empty()
 
     # Persist the case so the UI doesn't reset when analyst changes decision
     st.session_state.case_data = data
@@ -0,0 +1,65 @@
+"""
+Shared test setup. Everything the app writes to disk (SQLite DB, audit WAL, engine state, sweep
+checkpoints) goes to a temporary directory, and the LLM / embedding backends are the offline
+stand-ins. The environment is set before any `app` module is imported, since they read it at import.
+"""
+
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="compliance-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_TMP, 'compliance.db')}",
+    "AUDIT_WAL_DIR": os.path.join(_TMP, "audit_wal"),
+    "ENGINE_STATE_PATH": os.path.join(_TMP, "engine_state.bin"),
+    "SWEEP_CHECKPOINT_DIR": os.path.join(_TMP, "sweeps"),
+    "APP_WARMUP": "0",
+    "LLM_BACKEND": "fake",
+    "EMBEDDING_BACKEND": "fake",
+    "FAKE_LLM_LATENCY_MS": "1",
+})
+
+from app import models  # noqa: E402,F401  (registers the tables on Base)
+from app.database import SessionLocal, init_db  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+# TestClient without the lifespan: no background workers, so each test drives them itself
+# (the audit writer, not running, writes in the request transaction)
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def account_id() -> str:
+    return f"T{uuid.uuid4().hex[:10]}"
+
+
+def event_body(account_id: str, event_type: str, payload: Dict[str, Any], key: Optional[str] = None) -> Dict[str, Any]:
+    body = {
+        "event_timestamp": datetime.now(timezone.utc).isoformat(),
+        "account_id": account_id,
+        "event_type": event_type,
+        "payload": payload,
+    }
+    if key is not None:
+        body["idempotency_key"] = key
+    return body
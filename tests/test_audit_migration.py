@@ -0,0 +1,75 @@
+"""
+Legacy audit rows (app.audit_migration): AI context copied into case_actions.extra_data becomes
+one normalized case_decisions row, analyst rows point at it, and a re-run changes nothing.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models  # noqa: F401  (registers the tables on Base)
+from app.actions import CaseAction, CaseDecision, DecisionSignal, decision_context
+from app.audit_migration import migrate_case_actions
+from app.database import Base
+
+AI_CONTEXT = {
+    "ai_routed_path": "REVIEW",
+    "ai_workflow_path": "ESCALATE",
+    "risk_score": "40",          # legacy rows stored some numbers as strings
+    "ai_confidence": "0.7",
+    "fired_signals": ["PROFILE_CHANGE", "LARGE_TRANSACTION"],
+    "tier_latency_ms": 12,       # no column: kept in extras
+}
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            CaseAction(case_id="CASE-A-v1", account_id="A", action="AUTO_ROUTED", extra_data=dict(AI_CONTEXT)),
+            # analyst copy that matches the decision above
+            CaseAction(case_id="CASE-A-v1", account_id="A", action="OVERRIDE", reason="fine",
+                       extra_data={**AI_CONTEXT, "human_action": "OVERRIDE", "human_final_path": "MONITOR"}),
+            # analyst copy that doesn't match any decision
+            CaseAction(case_id="CASE-A-v1", account_id="A", action="APPROVE",
+                       extra_data={**AI_CONTEXT, "ai_routed_path": "ESCALATE", "human_action": "APPROVE"}),
+            # nothing to migrate
+            CaseAction(case_id="CASE-B-v1", account_id="B", action="APPROVE", extra_data={"human_action": "APPROVE"}),
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_legacy_rows_are_normalized(legacy_db):
+    counts = migrate_case_actions(legacy_db, batch_size=1)
+    assert counts == {"decisions": 1, "linked_actions": 2, "copied_decisions": 1}
+
+    auto, override, approve, untouched = legacy_db.query(CaseAction).order_by(CaseAction.id).all()
+    decision = legacy_db.get(CaseDecision, auto.decision_id)
+    assert auto.extra_data is None and auto.audit_uid == decision.decision_uid
+    assert (decision.routed_path, decision.risk_score, decision.ai_confidence) == ("REVIEW", 40, 0.7)
+    assert decision.extras == {"tier_latency_ms": 12}
+
+    signals = [s.signal_name for s in legacy_db.query(DecisionSignal)
+               .filter(DecisionSignal.decision_id == decision.id).order_by(DecisionSignal.position)]
+    assert signals == AI_CONTEXT["fired_signals"]
+    restored = decision_context(decision, signals)
+    assert restored["ai_routed_path"] == "REVIEW" and restored["tier_latency_ms"] == 12
+
+    assert override.decision_id == decision.id
+    assert override.extra_data == {"human_action": "OVERRIDE", "human_final_path": "MONITOR"}
+
+    copy = legacy_db.get(CaseDecision, approve.decision_id)
+    assert copy.origin == "migrated_copy" and copy.routed_path == "ESCALATE"
+    assert approve.extra_data == {"human_action": "APPROVE"}
+
+    assert untouched.decision_id is None and untouched.extra_data == {"human_action": "APPROVE"}
+
+
+def test_rerun_is_a_no_op(legacy_db):
+    migrate_case_actions(legacy_db)
+    assert migrate_case_actions(legacy_db) == {"decisions": 0, "linked_actions": 0, "copied_decisions": 0}
+    assert legacy_db.query(CaseDecision).count() == 2
@@ -0,0 +1,144 @@
+"""
+Audit writer: a record that can't be inserted must not block the records queued behind it.
+"""
+
+import json
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models  # noqa: F401  (registers the tables on Base)
+from app.actions import CaseAction
+from app.audit_writer import AUDIT_DEAD_LETTER_FILE, AuditWriter
+from app.database import Base
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _wait_until(condition, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the audit writer")
+        time.sleep(0.02)
+
+
+def test_poison_record_is_dead_lettered_and_the_rest_commit(tmp_path, session_factory):
+    writer = AuditWriter(wal_dir=tmp_path / "wal", mode="async", batch_size=10, flush_interval=0.05)
+    writer.start(session_factory)
+    db = session_factory()
+    try:
+        good = [writer.submit(db, f"CASE-A-v{i}", "A", "APPROVE", reason="ok") for i in range(3)]
+        # The WAL line is written with default=str, but the queued record still holds the object,
+        # so the JSON column can't serialize it and every insert of this record fails
+        poison = writer.submit(db, "CASE-A-v3", "A", "OVERRIDE", extra_data={"bad": object()})
+        good += [writer.submit(db, f"CASE-A-v{i}", "A", "APPROVE", reason="ok") for i in range(4, 7)]
+
+        _wait_until(lambda: writer.stats()["pending"] == 0)
+        stored = {uid for (uid,) in db.query(CaseAction.audit_uid)}
+    finally:
+        db.close()
+        writer.stop()
+
+    assert stored == set(good)
+    assert writer.stats()["dead_lettered"] == 1
+    assert writer.stats()["flushed"] == len(good)
+
+    lines = (tmp_path / "wal" / AUDIT_DEAD_LETTER_FILE).read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["record"]["audit_uid"] == poison
+    assert entry["error"]
+
+    # Everything committed or dead-lettered, so the WAL was removed on stop
+    assert not list((tmp_path / "wal").glob("audit-*.wal"))
+
+
+def test_unavailable_database_keeps_records_pending(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}", connect_args={"check_same_thread": False})
+    writer = AuditWriter(wal_dir=tmp_path / "wal", mode="async", batch_size=10, flush_interval=0.05)
+    writer.start(sessionmaker(bind=engine))   # no tables: every insert is an OperationalError
+    db = sessionmaker(bind=engine)()
+    try:
+        writer.submit(db, "CASE-B-v1", "B", "APPROVE")
+        _wait_until(lambda: writer.stats()["flush_errors"] > 0)
+        assert writer.stats()["pending"] == 1
+        assert writer.stats()["dead_lettered"] == 0
+    finally:
+        db.close()
+        writer.stop()
+        engine.dispose()
+
+    assert not (tmp_path / "wal" / AUDIT_DEAD_LETTER_FILE).exists()
+    assert list((tmp_path / "wal").glob("audit-*.wal"))   # kept for the next start to replay
+
+
+def test_restart_with_database_down_never_skips_unreplayed_records(tmp_path, session_factory):
+    # Every writer here runs under the same pid, like a container restarting
+    down = create_engine(f"sqlite:///{tmp_path / 'down.db'}", connect_args={"check_same_thread": False})
+    wal_dir = tmp_path / "wal"
+
+    first = AuditWriter(wal_dir=wal_dir, mode="async", batch_size=10, flush_interval=0.05)
+    first.start(sessionmaker(bind=down))
+    db = sessionmaker(bind=down)()
+    try:
+        uid = first.submit(db, "CASE-C-v1", "C", "APPROVE")
+    finally:
+        db.close()
+        first.stop()   # database down: the WAL stays
+
+    # Restart while the database is still down: recovery keeps the old WAL untouched
+    second = AuditWriter(wal_dir=wal_dir, mode="async", batch_size=10, flush_interval=0.05)
+    second.start(sessionmaker(bind=down))
+    second.stop()
+    down.dispose()
+
+    # Database back: the record from the first run is replayed
+    third = AuditWriter(wal_dir=wal_dir, mode="async", batch_size=10, flush_interval=0.05)
+    third.start(session_factory)
+    third.stop()
+
+    db = session_factory()
+    try:
+        assert {u for (u,) in db.query(CaseAction.audit_uid)} == {uid}
+    finally:
+        db.close()
+    assert not list(wal_dir.glob("audit-*.wal"))
+
+
+def test_sync_decisions_are_visible_to_other_workers(tmp_path, session_factory, monkeypatch):
+    monkeypatch.setattr("app.audit_writer.AUDIT_SYNC_DECISIONS", True)
+    worker_a = AuditWriter(wal_dir=tmp_path / "a", mode="async", batch_size=10, flush_interval=60)
+    worker_b = AuditWriter(wal_dir=tmp_path / "b", mode="async", batch_size=10, flush_interval=60)
+    worker_a.start(session_factory)
+    worker_b.start(session_factory)
+    db = session_factory()
+    try:
+        decision = {"routed_path": "REVIEW", "workflow_path": "REVIEW", "fired_signals": []}
+        uid = worker_a.submit(db, "CASE-D-v1", "D", "AUTO_ROUTED", decision=decision)
+        db.commit()
+        analyst_uid = worker_a.submit(db, "CASE-D-v1", "D", "APPROVE")
+
+        found = worker_b.latest_auto_routed(db, "CASE-D-v1")
+        assert found is not None and found[0] == uid
+        assert worker_a.action_id(db, uid) is not None          # written in the caller's transaction
+        assert worker_a.action_id(db, analyst_uid) is None      # analyst actions stay batched
+    finally:
+        db.close()
+        worker_a.stop()
+        worker_b.stop()
+
+
+def test_cases_actions_keeps_action_id(client, account_id):
+    body = {"case_id": f"CASE-{account_id}-v1", "account_id": account_id, "action": "APPROVE", "reason": "ok"}
+    out = client.post("/cases/actions", json=body).json()
+    assert out["audit_uid"]
+    assert isinstance(out["action_id"], int)   # writer not running here, so written synchronously
@@ -0,0 +1,98 @@
+"""
+Backtesting (app.backtest): the vectorized metrics must equal replaying every case through the
+real scoring and guardrail code, and load_cases must read outcomes the way feedback does.
+"""
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import risk, router
+from app.actions import CaseAction, CaseDecision, DecisionSignal
+from app.backtest import BANDS, NOT_REVIEWED, PATH_CODE, PATHS, CaseMatrix, evaluate, load_cases
+from app.database import Base
+
+SIGNALS = ["LARGE_TRANSACTION", "NEW_DEVICE_LOGIN", "PROFILE_CHANGE", "SOMETHING_NEW"]
+
+
+def _random_cases(rng, n=400) -> CaseMatrix:
+    vectors = rng.integers(0, 4, size=(25, len(SIGNALS))).astype(np.float32)
+    return CaseMatrix(
+        signal_names=SIGNALS,
+        vectors=vectors,
+        vec_idx=rng.integers(0, len(vectors), n),
+        proposed=rng.integers(0, len(PATHS), n),
+        confidence=rng.choice([0.3, 0.55, 0.6, 0.65, 0.9], n),
+        routed=rng.integers(0, len(PATHS) + 1, n),          # includes UNKNOWN
+        outcome=rng.integers(NOT_REVIEWED, len(PATHS) + 1, n),
+        count=rng.integers(1, 5, n).astype(np.float64),
+    )
+
+
+# One case at a time through risk.score_signals / band_from_score / router.apply_guardrails
+def _replay(cases: CaseMatrix, config, monkeypatch):
+    monkeypatch.setattr(risk, "LOW_MAX", config["low_max"])
+    monkeypatch.setattr(risk, "MEDIUM_MAX", config["medium_max"])
+    monkeypatch.setattr(router, "CONFIDENCE_FLOOR", config["confidence_floor"])
+    monkeypatch.setattr(risk, "current_signal_weights", lambda: config["weights"])
+    bands, routed = np.zeros(len(BANDS)), np.zeros(len(PATHS))
+    overrides = changes = 0.0
+    for r in range(len(cases.count)):
+        hits = cases.vectors[cases.vec_idx[r]]
+        signals = [{"signal_name": n} for j, n in enumerate(cases.signal_names) for _ in range(int(hits[j]))]
+        band = risk.band_from_score(risk.score_signals(signals)[0])
+        path = PATH_CODE[router.apply_guardrails(
+            {"workflow_path": PATHS[cases.proposed[r]], "confidence": cases.confidence[r]}, band,
+        )["routed_path"]]
+        bands[BANDS.index(band)] += cases.count[r]
+        routed[path] += cases.count[r]
+        overrides += cases.count[r] * (cases.outcome[r] not in (NOT_REVIEWED, path))
+        changes += cases.count[r] * (cases.routed[r] != path)
+    return bands, routed, overrides, changes
+
+
+def test_vectorized_metrics_match_a_per_case_replay(monkeypatch):
+    rng = np.random.default_rng(44)
+    cases = _random_cases(rng)
+    configs = [
+        {"weights": {s: int(w) for s, w in zip(SIGNALS, rng.integers(0, 30, len(SIGNALS)))},
+         "low_max": int(low), "medium_max": int(low) + int(gap), "confidence_floor": float(floor)}
+        for low, gap, floor in zip(rng.integers(10, 50, 12), rng.integers(5, 40, 12), rng.choice([0.5, 0.6, 0.65, 0.7], 12))
+    ]
+    configs[0]["weights"].pop("SOMETHING_NEW")   # unknown signal: default weight on both sides
+
+    metrics = evaluate(cases, configs)
+    for i, config in enumerate(configs):
+        with monkeypatch.context() as m:
+            bands, routed, overrides, changes = _replay(cases, config, m)
+        assert np.allclose(metrics["bands"][i], bands)
+        assert np.allclose(metrics["routed"][i], routed)
+        assert metrics["overrides"][i] == pytest.approx(overrides)
+        assert metrics["changes"][i] == pytest.approx(changes)
+        assert metrics["transitions"][i].sum() == pytest.approx(changes)
+
+
+def test_load_cases_takes_the_latest_analyst_action(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'backtest.db'}")
+    Base.metadata.create_all(bind=engine, tables=[CaseAction.__table__, CaseDecision.__table__, DecisionSignal.__table__])
+    with sessionmaker(bind=engine)() as db:
+        for uid, origin in (("d1", "ai_decision"), ("d2", "ai_decision"), ("copy", "migrated_copy")):
+            db.add(CaseDecision(decision_uid=uid, origin=origin, case_id="C", account_id="A",
+                                workflow_path="MONITOR", routed_path="REVIEW", ai_confidence=0.4))
+        db.flush()
+        db.add_all([
+            DecisionSignal(decision_id=1, signal_name="PROFILE_CHANGE", position=0, hits=2),
+            DecisionSignal(decision_id=2, signal_name="PROFILE_CHANGE", position=0),   # legacy: no hit count
+            CaseAction(case_id="C", account_id="A", action="ESCALATE", decision_id=1),
+            CaseAction(case_id="C", account_id="A", action="APPROVE", decision_id=1),   # latest: keeps REVIEW
+            CaseAction(case_id="C", account_id="A", action="OVERRIDE", decision_id=2,
+                       extra_data={"human_final_path": "MONITOR"}),
+        ])
+        db.commit()
+        cases = load_cases(db)
+    engine.dispose()
+
+    assert cases.signal_names == ["PROFILE_CHANGE"] and cases.count.sum() == 2   # the migrated copy isn't counted
+    by_hits = {float(cases.vectors[v][0]): PATHS[o] for v, o in zip(cases.vec_idx, cases.outcome)}
+    assert by_hits == {2.0: "REVIEW", 1.0: "MONITOR"}
@@ -0,0 +1,92 @@
+"""
+Case snapshots (app.case): only the newest version carries the full timeline, pinned older
+versions shrink to their timeline event ids and are pruned after the retention window. Over HTTP
+the full case inlines a capped timeline and the rest is keyset-paginated.
+"""
+
+from app import case
+from app.case import refresh_case_snapshot, timeline_event_ids
+from app.models import CaseSnapshot
+from tests.conftest import event_body
+
+
+def _versions(db, account_id):
+    db.expire_all()
+    return {
+        s.version: s
+        for s in db.query(CaseSnapshot).filter(CaseSnapshot.account_id == account_id)
+    }
+
+
+def _login(client, account_id, device):
+    return client.post("/events", json=event_body(account_id, "device_login", {"device_id": f"{account_id}-{device}"})).json()["event_id"]
+
+
+def test_pinned_versions_keep_only_their_event_ids(client, db, account_id):
+    first = _login(client, account_id, "phone")
+    client.get(f"/ai_decision/{account_id}")   # pins version 1
+    second = _login(client, account_id, "laptop")
+    refresh_case_snapshot(db, account_id)
+
+    versions = _versions(db, account_id)
+    assert sorted(versions) == [1, 2]
+    old, head = versions[1].snapshot, versions[2].snapshot
+    assert "timeline" not in old and old["timeline_event_ids"] == [first]
+    assert old["signals"] and old["risk_assessment"]
+    assert [t["event_id"] for t in head["timeline"]] == [first, second]
+    assert timeline_event_ids(old) == [first] and timeline_event_ids(head) == [first, second]
+
+
+def test_unpinned_versions_are_pruned(client, db, account_id):
+    _login(client, account_id, "phone")
+    refresh_case_snapshot(db, account_id)
+    _login(client, account_id, "laptop")
+    refresh_case_snapshot(db, account_id)
+    assert sorted(_versions(db, account_id)) == [2]
+
+
+def test_pinned_versions_past_retention_are_pruned(client, db, account_id, monkeypatch):
+    _login(client, account_id, "phone")
+    client.get(f"/ai_decision/{account_id}")
+    monkeypatch.setattr(case, "CASE_PINNED_RETENTION_DAYS", 1e-9)
+    _login(client, account_id, "laptop")
+    refresh_case_snapshot(db, account_id)
+    assert sorted(_versions(db, account_id)) == [2]
+
+
+
+def test_full_case_inlines_a_capped_timeline_that_pages_on(client, account_id, monkeypatch):
+    monkeypatch.setattr(case, "CASE_INLINE_TIMELINE_MAX", 2)
+    ids = [_login(client, account_id, device) for device in "abcde"]
+    body = client.get(f"/case/{account_id}").json()
+    assert [t["event_id"] for t in body["timeline"]] == ids[:2]
+    assert body["timeline_size"] == 5 and body["timeline_truncated"] is True
+
+    # Keyset pages pick up right after the inlined events and never repeat or skip one
+    seen, cursor = [], body["timeline_next_cursor"]
+    while cursor:
+        page = client.get(f"/case/{account_id}/timeline", params={"limit": 2, "cursor": cursor}).json()
+        seen += [e["event_id"] for e in page["events"]]
+        cursor = page["next_cursor"]
+    assert seen == ids[2:]
+
+
+def test_timeline_keyset_cursor_walks_every_event_once(client, account_id):
+    ids = [_login(client, account_id, device) for device in "abcde"]
+    seen, cursor = [], None
+    while True:
+        page = client.get(f"/case/{account_id}/timeline", params={"limit": 2, "cursor": cursor} if cursor else {"limit": 2}).json()
+        assert len(page["events"]) <= 2
+        seen += [e["event_id"] for e in page["events"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ids
+    assert client.get(f"/case/{account_id}/timeline", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_small_case_is_inlined_whole(client, account_id):
+    first = _login(client, account_id, "phone")
+    body = client.get(f"/case/{account_id}").json()
+    assert [t["event_id"] for t in body["timeline"]] == [first]
+    assert body["timeline_truncated"] is False and body["timeline_next_cursor"] is None
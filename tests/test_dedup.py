@@ -0,0 +1,82 @@
+"""
+Idempotent ingestion (app.dedup): the Bloom pre-filter never forgets a key, derived keys are
+stable across retries, and POST /events stores a retried event once.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.dedup import BloomFilter, derive_idempotency_key
+from app.models import Event
+from app.schemas import EventCreate
+from tests.conftest import event_body
+
+
+def test_bloom_filter_has_no_false_negatives_and_a_bounded_error_rate():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    keys = [f"key-{i}" for i in range(5000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    added = bloom.count   # approximate: a key whose bits were all set already isn't counted
+    assert 0.99 * len(keys) <= added <= len(keys)
+
+    bloom.add(keys[0])   # re-adding doesn't count twice
+    assert bloom.count == added
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.03
+
+
+def test_bloom_restore_rejects_a_different_sizing():
+    bloom = BloomFilter(capacity=100)
+    bloom.add("a")
+    bits, count = bloom.snapshot()
+
+    copy = BloomFilter(capacity=100)
+    copy.restore(bytearray(bits), count)
+    assert "a" in copy and copy.count == 1
+
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=10_000).restore(bytearray(bits), count)
+
+
+def test_derived_key_ignores_payload_order_and_timezone():
+    at = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    first = EventCreate(event_timestamp=at, account_id="A", event_type="transaction_posted",
+                        payload={"amount": 10, "currency": "CAD"})
+    retry = EventCreate(event_timestamp=at.astimezone(timezone(timedelta(hours=-5))), account_id="A",
+                        event_type="transaction_posted", payload={"currency": "CAD", "amount": 10})
+    other = EventCreate(event_timestamp=at, account_id="A", event_type="transaction_posted",
+                        payload={"amount": 11, "currency": "CAD"})
+    assert derive_idempotency_key(first) == derive_idempotency_key(retry)
+    assert derive_idempotency_key(first) != derive_idempotency_key(other)
+
+
+def test_retried_event_is_stored_once(client, db, account_id):
+    body = event_body(account_id, "device_login", {"device_id": "d1"})
+    first = client.post("/events", json=body).json()
+    retry = client.post("/events", json=body).json()
+    assert not first.get("duplicate") and retry["duplicate"] is True
+    assert retry["event_id"] == first["event_id"]
+
+    keyed = event_body(account_id, "device_login", {"device_id": "d2"}, key=f"k-{random.random()}")
+    stored = client.post("/events", json=keyed).json()["event_id"]
+    keyed["payload"] = {"device_id": "changed"}   # same client key wins over content
+    assert client.post("/events", json=keyed).json() == {
+        "message": "Duplicate event ignored", "event_id": stored, "duplicate": True,
+    }
+    assert db.query(Event).filter(Event.account_id == account_id).count() == 2
+
+
+def test_key_missing_from_the_filter_is_caught_by_the_unique_index(client, db, account_id, monkeypatch):
+    # Another worker stored the key: this process's filter has never seen it
+    body = event_body(account_id, "device_login", {"device_id": "d1"}, key=f"k-{random.random()}")
+    original = client.post("/events", json=body).json()["event_id"]
+    monkeypatch.setattr(BloomFilter, "__contains__", lambda self, key: False)
+
+    retry = client.post("/events", json=body).json()
+    assert retry["duplicate"] is True and retry["event_id"] == original
+    assert db.query(Event).filter(Event.account_id == account_id).count() == 1
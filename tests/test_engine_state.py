@@ -0,0 +1,72 @@
+"""
+Engine state snapshots (app.engine_state): the ingest filter restores as a view into the mapped
+file plus a replay after the watermark, and a corrupt, truncated or missing file falls back to
+rebuilding from the events table.
+"""
+
+import pytest
+
+from app.dedup import ingest_filter
+from app.engine_state import EngineStateSnapshotter, open_snapshot
+from tests.conftest import event_body
+
+
+@pytest.fixture(autouse=True)
+def own_filter():
+    # leave the process-wide filter as a plain bytearray with the same keys afterwards
+    yield
+    bits, count = ingest_filter.snapshot()
+    ingest_filter.restore(bytearray(bits), count)
+
+
+def _store(client, account_id, key):
+    return client.post("/events", json=event_body(account_id, "device_login", {"device_id": key}, key=key)).json()["event_id"]
+
+
+def test_restore_maps_the_snapshot_and_replays_newer_events(client, db, account_id, tmp_path):
+    path = tmp_path / "state.bin"
+    before = _store(client, account_id, f"{account_id}-before")
+    written = EngineStateSnapshotter(path).snapshot(db)
+    assert written["watermark"] >= before
+    after = _store(client, account_id, f"{account_id}-after")
+
+    ingest_filter.restore(bytearray(len(ingest_filter.bits)), 0)   # as in a fresh process
+    restorer = EngineStateSnapshotter(path)
+    restored = restorer.restore(db)
+    assert restored["source"] == "snapshot" and restored["snapshot_watermark"] == written["watermark"]
+    assert restored["watermark"] >= after and restored["replayed_keys"] >= 1
+    assert isinstance(ingest_filter.bits, memoryview)   # not parsed or copied
+    assert f"{account_id}-before" in ingest_filter and f"{account_id}-after" in ingest_filter
+
+    # The mapping is copy-on-write: new keys never reach the file
+    ingest_filter.add(f"{account_id}-memory-only")
+    index, mapping = open_snapshot(path)
+    meta = index["sections"]["ingest_bloom"]
+    on_disk = bytes(mapping[meta["offset"]:meta["offset"] + meta["length"]])
+    mapping.close()
+    assert on_disk != bytes(ingest_filter.bits)
+
+
+@pytest.mark.parametrize("damage", ["flip_bit", "truncate", "missing", "garbage"])
+def test_damaged_snapshot_falls_back_to_a_rebuild(client, db, account_id, tmp_path, damage):
+    path = tmp_path / "state.bin"
+    _store(client, account_id, f"{account_id}-k")
+    EngineStateSnapshotter(path).snapshot(db)
+    meta = open_snapshot(path)[0]["sections"]["ingest_bloom"]
+
+    raw = bytearray(path.read_bytes())
+    if damage == "flip_bit":
+        raw[meta["offset"] + 10] ^= 0x01
+        path.write_bytes(raw)
+    elif damage == "truncate":
+        path.write_bytes(raw[:meta["offset"] + 100])
+    elif damage == "missing":
+        path.unlink()
+    else:
+        path.write_bytes(b"not a snapshot at all")
+
+    ingest_filter.restore(bytearray(len(ingest_filter.bits)), 0)
+    restored = EngineStateSnapshotter(path).restore(db)
+    assert restored["source"] == "rebuild" and restored["snapshot_watermark"] == 0
+    assert f"{account_id}-k" in ingest_filter
+    assert isinstance(ingest_filter.bits, bytearray)
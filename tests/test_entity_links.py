@@ -0,0 +1,102 @@
+"""
+Cross-account signals (app.entity_links): SHARED_DEVICE / SHARED_PAYEE_FANIN from the entity
+index, the incremental lookup, and the links marker that stays bounded for hot entities.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app import entity_links
+from app.entity_links import links_marker, shared_entity_signals
+from app.models import Event
+from tests.conftest import event_body
+
+
+def _login(client, account_id, device):
+    return client.post("/events", json=event_body(account_id, "device_login", {"device_id": device})).json()["event_id"]
+
+
+def _pay(client, account_id, payee):
+    return client.post("/events", json=event_body(
+        account_id, "transaction_posted", {"amount": 50, "currency": "CAD", "counterparty": payee},
+    )).json()["event_id"]
+
+
+def _events(db, account_id):
+    return db.query(Event).filter(Event.account_id == account_id).order_by(Event.id).all()
+
+
+def _since():
+    return datetime.now(timezone.utc) - timedelta(days=1)
+
+
+def test_shared_device_fires_at_the_threshold(client, account_id):
+    device = f"dev-{uuid.uuid4().hex[:8]}"
+    others = [f"{account_id}-{i}" for i in range(entity_links.SHARED_DEVICE_MIN_ACCOUNTS - 2)]
+    for other in others:
+        _login(client, other, device)
+    first_use = _login(client, account_id, device)
+
+    names = {s["signal_name"] for s in client.get(f"/signals/{account_id}").json()}
+    assert "SHARED_DEVICE" not in names   # one account short
+
+    late = f"{account_id}-late"
+    late_use = _login(client, late, device)
+    signals = [s for s in client.get(f"/signals/{account_id}").json() if s["signal_name"] == "SHARED_DEVICE"]
+    assert len(signals) == 1
+    assert signals[0]["evidence_event_ids"][0] == first_use
+    assert late_use in signals[0]["evidence_event_ids"]
+
+
+def test_shared_payee_fanin(client, account_id):
+    payee = f"payee-{uuid.uuid4().hex[:8]}"
+    for i in range(entity_links.SHARED_PAYEE_MIN_ACCOUNTS - 1):
+        _pay(client, f"{account_id}-{i}", payee)
+    _pay(client, account_id, payee)
+    assert "SHARED_PAYEE_FANIN" in {s["signal_name"] for s in client.get(f"/signals/{account_id}").json()}
+
+
+def test_incremental_lookup_matches_a_full_lookup(client, db, account_id):
+    shared, quiet = f"dev-{uuid.uuid4().hex[:8]}", f"dev-{uuid.uuid4().hex[:8]}"
+    for i in range(entity_links.SHARED_DEVICE_MIN_ACCOUNTS):
+        _login(client, f"{account_id}-{i}", shared)
+    _login(client, account_id, quiet)
+    previous = shared_entity_signals(db, account_id, _events(db, account_id))
+    assert previous == []
+
+    _login(client, account_id, shared)
+    events = _events(db, account_id)
+    incremental = shared_entity_signals(db, account_id, events, previous=previous, changed={("device", shared)})
+    assert incremental == shared_entity_signals(db, account_id, events)
+    assert [s["signal_name"] for s in incremental] == ["SHARED_DEVICE"]
+
+
+def test_links_marker_changes_with_other_accounts_only(client, db, account_id):
+    device = f"dev-{uuid.uuid4().hex[:8]}"
+    _login(client, account_id, device)
+    before = links_marker(db, account_id, _since())
+    assert before == "0.0"
+
+    _login(client, account_id, device)   # own activity: not the marker's job
+    assert links_marker(db, account_id, _since()) == before
+
+    _login(client, f"{account_id}-other", device)
+    db.expire_all()
+    assert links_marker(db, account_id, _since()) != before
+
+
+def test_links_marker_reads_at_most_the_fanout_cap(client, db, account_id, monkeypatch):
+    monkeypatch.setattr(entity_links, "ENTITY_LINK_MAX_FANOUT", 3)
+    device = f"dev-{uuid.uuid4().hex[:8]}"
+    _login(client, account_id, device)
+    for i in range(6):
+        _login(client, f"{account_id}-{i}", device)
+
+    marker = links_marker(db, account_id, _since())
+    assert marker.split(".")[0] == "4"   # cap + 1, not all six
+
+    # A newer account replaces the oldest one in the window the signals read
+    _login(client, f"{account_id}-new", device)
+    db.expire_all()
+    changed = links_marker(db, account_id, _since())
+    assert changed.split(".")[0] == "4" and changed != marker
@@ -0,0 +1,42 @@
+"""
+Conditional GETs (app.http_cache): a 304 only answers a request for the exact representation the
+client holds, so mode, cursor, limit and fields are part of the ETag and of the body cache key.
+"""
+
+from tests.conftest import event_body
+
+
+def _login(client, account_id, device):
+    client.post("/events", json=event_body(account_id, "device_login", {"device_id": f"{account_id}-{device}"}))
+
+
+def test_conditional_get_answers_304_only_for_the_same_representation(client, account_id):
+    _login(client, account_id, "phone")
+    url = f"/case/{account_id}"
+    full = client.get(url, params={"mode": "full"})
+    etag = full.headers["ETag"]
+    assert client.get(url, params={"mode": "full"}, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, params={"mode": "full"}, headers={"If-None-Match": f'"x", W/{etag}'}).status_code == 304
+    assert client.get(url, params={"mode": "full"}, headers={"If-None-Match": "*"}).status_code == 200
+
+    summary = client.get(url, params={"mode": "summary"}, headers={"If-None-Match": etag})
+    assert summary.status_code == 200 and summary.headers["ETag"] != etag
+    assert "timeline" not in summary.json() and "timeline" in full.json()   # not served from the full body
+
+    _login(client, account_id, "laptop")
+    assert client.get(url, params={"mode": "full"}, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_timeline_etag_and_body_depend_on_cursor_and_fields(client, account_id):
+    for device in ("a", "b", "c"):
+        _login(client, account_id, device)
+    url = f"/case/{account_id}/timeline"
+    first = client.get(url, params={"limit": 2})
+    second = client.get(url, params={"limit": 2, "cursor": first.json()["next_cursor"]})
+    projected = client.get(url, params={"limit": 2, "fields": "device_id"})
+
+    assert len({r.headers["ETag"] for r in (first, second, projected)}) == 3
+    assert second.json()["events"] != first.json()["events"]
+    assert projected.json()["fields"] == ["device_id"]
+    headers = {"If-None-Match": first.headers["ETag"]}
+    assert client.get(url, params={"limit": 2, "fields": "device_id"}, headers=headers).status_code == 200
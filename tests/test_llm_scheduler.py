@@ -0,0 +1,104 @@
+"""
+LLM scheduler (app.llm_scheduler): waiting calls go out strictly by priority class, and a 429
+pauses the model (Retry-After, else exponential backoff) and halves its rate before the retry.
+"""
+
+import threading
+import time
+
+import pytest
+
+from app import llm_scheduler
+from app.llm_scheduler import (
+    BATCH, HIGH, INTERACTIVE, MEDIUM, LLMQueueFull, ModelScheduler, call,
+)
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        self.retry_after = retry_after
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_waiting_calls_are_served_by_priority(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_BURST_SECONDS", 0.1)
+    scheduler = ModelScheduler("m", rpm=600, tpm=0)   # one request per 0.1s, bucket of one
+    scheduler.acquire(INTERACTIVE, 0)   # drain the bucket
+    scheduler.release(0, 0)
+
+    order = []
+
+    def worker(priority):
+        scheduler.acquire(priority, 0)
+        order.append(priority)
+        scheduler.release(0, 0)
+
+    threads = []
+    for priority in (BATCH, MEDIUM, HIGH, INTERACTIVE):   # arrive lowest class first
+        threads.append(threading.Thread(target=worker, args=(priority,)))
+        threads[-1].start()
+        _wait_until(lambda p=priority: scheduler.stats()["queue_depth"][llm_scheduler.PRIORITY_CLASSES[p]] == 1 or p in order)
+    for t in threads:
+        t.join(5)
+    assert order == [INTERACTIVE, HIGH, MEDIUM, BATCH]
+
+
+def test_429_pauses_for_retry_after_and_retries_in_place():
+    scheduler = ModelScheduler("m", rpm=0, tpm=0)
+    attempts = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RateLimited(retry_after=0.2)
+        return "ok"
+
+    assert call(scheduler, 10, flaky, priority=HIGH) == "ok"
+    assert attempts[1] - attempts[0] >= 0.19
+    stats = scheduler.stats()
+    assert stats["rate_limited"] == 1 and stats["retries"] == 1
+    assert stats["rate_factor"] == pytest.approx(0.5 + llm_scheduler.RATE_FACTOR_RECOVERY)
+
+
+def test_backoff_grows_exponentially_without_retry_after(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_BACKOFF_BASE_S", 5)   # 5, 10, 20: under LLM_BACKOFF_MAX_S
+    scheduler = ModelScheduler("m", rpm=0, tpm=0)
+    pauses = []
+    for _ in range(3):
+        scheduler.paused_until = 0.0
+        scheduler.release(0, rate_limited=RateLimited())
+        pauses.append(scheduler.paused_until - time.monotonic())
+    for n, pause in enumerate(pauses):
+        full = 5 * 2 ** n
+        assert 0.5 * full - 0.1 <= pause <= full   # jitter keeps 50-100% of the step
+    assert scheduler.rate_factor == pytest.approx(0.125)
+
+
+def test_retries_give_up_after_the_limit(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_MAX_RETRIES", 1)
+    scheduler = ModelScheduler("m", rpm=0, tpm=0)
+
+    def always_429():
+        raise RateLimited(retry_after=0)
+
+    with pytest.raises(RateLimited):
+        call(scheduler, 10, always_429)
+    assert scheduler.stats()["rate_limited"] == 2 and scheduler.stats()["in_flight"] == 0
+
+
+def test_background_calls_are_rejected_when_too_many_wait(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_MAX_WAITING", 0)
+    scheduler = ModelScheduler("m", rpm=0, tpm=0)
+    with pytest.raises(LLMQueueFull):
+        scheduler.acquire(BATCH, 10)
+    scheduler.acquire(INTERACTIVE, 10)   # interactive is never turned away
+    assert scheduler.stats()["rejected"] == 1
@@ -0,0 +1,95 @@
+"""
+Incremental re-decisioning (app.redecision): an immaterial delta reuses the prior answer without
+a model call, a material one sends the delta, and reuse chains stay anchored to the case the
+answer was actually made on.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import redecision
+from app.redecision import plan_from_prior
+from tests.conftest import event_body
+
+POLICY = "policy-v1"
+
+
+def _prior(basis, decided_at=None, **context):
+    return {
+        "decision_uid": "d1",
+        "decided_at": decided_at or datetime.now(timezone.utc),
+        "basis_case_version": 1,
+        "basis": basis,
+        "context": {"ai_output": {"confidence": 0.8}, "policy_version": POLICY, "evidence_event_ids": [1], **context},
+    }
+
+
+def _case(event_ids, fired, band="MEDIUM", score=50):
+    return {
+        "timeline": [{"event_id": i} for i in event_ids],
+        "risk_assessment": {"fired_signals": fired, "risk_band": band, "risk_score": score},
+    }
+
+
+def test_immaterial_delta_reuses_the_prior_answer():
+    basis = _case([1, 2], ["PROFILE_CHANGE"])
+    plan = plan_from_prior(_prior(basis), _case([1, 2, 3], ["PROFILE_CHANGE"], score=55), POLICY)
+    assert plan["mode"] == "reused" and plan["reasons"] == []
+    assert [t["event_id"] for t in plan["delta"]["new_events"]] == [3]
+
+
+@pytest.mark.parametrize("change, reason", [
+    (dict(fired=["PROFILE_CHANGE", "LARGE_TRANSACTION"]), "new signals"),
+    (dict(fired=[]), "signals no longer firing"),
+    (dict(band="HIGH"), "risk band MEDIUM -> HIGH"),
+    (dict(score=50 + redecision.REDECISION_SCORE_DELTA), "risk score moved"),
+    (dict(event_ids=[2]), "evidence events aged out [1]"),
+])
+def test_material_changes_are_decided_incrementally(change, reason):
+    basis = _case([1, 2], ["PROFILE_CHANGE"])
+    current = _case(**{"event_ids": [1, 2], "fired": ["PROFILE_CHANGE"], **change})
+    plan = plan_from_prior(_prior(basis), current, POLICY)
+    assert plan["mode"] == "incremental"
+    assert any(r.startswith(reason) for r in plan["reasons"]), plan["reasons"]
+
+
+def test_stale_prior_policy_change_and_fail_safe_answers_are_redecided():
+    basis = _case([1], ["PROFILE_CHANGE"])
+    old = datetime.now(timezone.utc) - timedelta(hours=redecision.REDECISION_MAX_AGE_HOURS + 1)
+    assert plan_from_prior(_prior(basis, decided_at=old), basis, POLICY)["mode"] == "incremental"
+    assert plan_from_prior(_prior(basis), basis, "policy-v2")["reasons"] == ["policy documents changed"]
+    fail_safe = _prior(basis, ai_output={"confidence": 0.0})
+    assert plan_from_prior(fail_safe, basis, POLICY)["mode"] == "incremental"
+
+
+def test_large_delta_falls_back_to_the_full_case(monkeypatch):
+    monkeypatch.setattr(redecision, "REDECISION_MAX_DELTA_EVENTS", 2)
+    basis = _case([1], ["PROFILE_CHANGE"])
+    plan = plan_from_prior(_prior(basis), _case([1, 2, 3, 4], ["PROFILE_CHANGE", "NEW_DEVICE_LOGIN"]), POLICY)
+    assert plan["mode"] == "full" and plan["reasons"][-1] == "3 new events; sending the full case"
+
+
+def test_ai_decision_reuses_then_decides_incrementally(client, account_id):
+    client.post("/events", json=event_body(account_id, "profile_change", {"changed_fields": ["email"]}))
+    client.post("/events", json=event_body(
+        account_id, "transaction_posted", {"amount": 9000, "currency": "CAD", "counterparty": "mule-1"},
+    ))
+    first = client.get(f"/ai_decision/{account_id}").json()["redecision"]
+    assert first["decision_mode"] == "full" and first["prior_decision_uid"] is None
+
+    again = client.get(f"/ai_decision/{account_id}").json()
+    assert again["redecision"]["decision_mode"] == "reused"
+    assert again["ai_trace"]["ai_tier_latency_ms"] == {}   # no model call
+
+    # A second reuse still diffs against version 1, the case the answer was made on
+    assert client.get(f"/ai_decision/{account_id}").json()["redecision"]["basis_case_version"] == 1
+
+    event_id = client.post("/events", json=event_body(account_id, "device_login", {"device_id": f"{account_id}-phone"})).json()["event_id"]
+    changed = client.get(f"/ai_decision/{account_id}").json()["redecision"]
+    assert changed["decision_mode"] == "incremental"
+    assert changed["delta"]["new_event_ids"] == [event_id]
+    assert changed["delta"]["signals_added"] == ["NEW_DEVICE_LOGIN"]
+
+    assert client.get(f"/ai_decision/{account_id}?mode=full").json()["redecision"]["decision_mode"] == "full"
+    assert client.get(f"/ai_decision/{account_id}?mode=bogus").status_code == 422
@@ -0,0 +1,62 @@
+"""
+Declarative signal rules (app.rules): the compiled rule file must agree with the built-in engine,
+reject invalid rules, and a broken edit must not replace the last good rule set.
+"""
+
+import json
+import os
+import random
+
+import pytest
+
+from app.rules import RuleError, RuleRegistry, compile_ruleset, load_ruleset
+from app.signals import LOOKBACK_DAYS, RULES_PATH, compute_signals_builtin
+from scripts.verify_signal_rules import edge_cases, random_stream
+
+
+@pytest.fixture(scope="module")
+def ruleset():
+    return load_ruleset(RULES_PATH, constants={"lookback_days": LOOKBACK_DAYS})
+
+
+def test_compiled_rules_match_the_builtin_engine(ruleset):
+    random.seed(34)
+    streams = edge_cases() + [random_stream(random.randint(1, 60)) for _ in range(300)]
+    for events in streams:
+        assert ruleset.evaluate(events) == compute_signals_builtin(events)
+
+
+def test_every_builtin_signal_has_a_rule(ruleset):
+    assert set(ruleset.rule_names) == {
+        "NEW_DEVICE_LOGIN", "PROFILE_CHANGE", "LARGE_TRANSACTION",
+        "NEW_PAYEE_LARGE_TRANSFER", "PROFILE_CHANGE_AND_TRANSFER_24HR",
+    }
+
+
+@pytest.mark.parametrize("spec", [
+    {},
+    {"rules": [{"name": "X", "type": "nope"}]},
+    {"rules": [{"name": "X", "type": "event"}]},                              # no event_type
+    {"rules": [{"name": "X", "type": "first_seen", "event_type": "device_login"}]},   # no key
+    {"rules": [{"name": "X", "type": "sequence", "first": {"event_type": "a"}}]},     # no then
+    {"rules": [{"name": "X", "type": "event", "event_type": "a"}] * 2},       # duplicate name
+])
+def test_invalid_rules_are_rejected(spec):
+    with pytest.raises(RuleError):
+        compile_ruleset(spec)
+
+
+def test_registry_keeps_the_last_good_rules_on_a_broken_edit(tmp_path):
+    path = tmp_path / "rules.json"
+    good = {"rules": [{"name": "ANY_LOGIN", "type": "event", "event_type": "device_login"}]}
+    path.write_text(json.dumps(good))
+    registry = RuleRegistry(path, check_interval=0)
+    loaded = registry.current()
+    assert loaded.rule_names == ["ANY_LOGIN"]
+
+    path.write_text("{not json")
+    os.utime(path, ns=(1, 1))   # a different mtime even on coarse-clock filesystems
+    assert registry.current() is loaded
+
+    path.unlink()
+    assert registry.current() is None and registry.version() == "builtin"
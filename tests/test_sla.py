@@ -0,0 +1,119 @@
+"""
+Persisted SLAs (app.sla): one open SLA per account across case versions, resolved rows stay
+resolved, the sweeper moves statuses by due time, and the queue pages by (sla_due_at, id).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import CaseSla
+from app.sla import (
+    assign_sla, list_sla_queue, resolve_case_sla, supersede_duplicate_slas, sweep_sla_statuses, upsert_case_sla,
+)
+
+
+def _decide(db, account_id, version, created_at, path):
+    case_id = f"CASE-{account_id}-v{version}"
+    sla = upsert_case_sla(db, case_id, account_id, created_at, path, assign_sla(created_at, path))
+    db.commit()
+    return sla
+
+
+def _rows(db, account_id):
+    return {r.case_id.rsplit("-", 1)[1]: r for r in db.query(CaseSla).filter(CaseSla.account_id == account_id)}
+
+
+@pytest.fixture
+def queue_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sla.db'}")
+    Base.metadata.create_all(bind=engine, tables=[CaseSla.__table__])
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def test_newer_version_supersedes_and_keeps_the_earliest_deadline(db, account_id):
+    start = datetime.now(timezone.utc)
+    first = _decide(db, account_id, 1, start, "ESCALATE")        # due in 2h
+    second = _decide(db, account_id, 2, start + timedelta(minutes=30), "REVIEW")   # would be 24h
+
+    assert second["sla_due_at"] == first["sla_due_at"]   # new events never push the clock back
+    rows = _rows(db, account_id)
+    assert rows["v1"].sla_status == "SUPERSEDED"
+    assert rows["v2"].sla_status in ("ON_TRACK", "DUE_SOON")
+    assert db.query(CaseSla).filter(CaseSla.account_id == account_id, CaseSla.sla_status.in_(
+        ("ON_TRACK", "DUE_SOON", "BREACHED"))).count() == 1
+
+
+def test_resolved_sla_is_never_reopened(db, account_id):
+    start = datetime.now(timezone.utc)
+    _decide(db, account_id, 1, start, "REVIEW")
+    _decide(db, account_id, 2, start, "REVIEW")
+
+    resolve_case_sla(db, f"CASE-{account_id}-v1")   # analyst worked from the older version
+    db.commit()
+    assert _rows(db, account_id)["v2"].sla_status == "RESOLVED"
+
+    # Re-deciding the same version returns the closed row as is
+    again = _decide(db, account_id, 2, start, "ESCALATE")
+    assert again["sla_status"] == "RESOLVED"
+    assert _rows(db, account_id)["v2"].resolved_at is not None
+
+
+def test_monitor_decision_clears_the_open_deadline(db, account_id):
+    start = datetime.now(timezone.utc)
+    _decide(db, account_id, 1, start, "REVIEW")
+    assert _decide(db, account_id, 2, start, "MONITOR") == {"sla_due_at": None, "sla_status": "NO_SLA"}
+    rows = _rows(db, account_id)
+    assert set(rows) == {"v1"} and rows["v1"].sla_status == "SUPERSEDED"
+
+
+def test_duplicate_open_rows_are_superseded_once(queue_db):
+    due = datetime.now(timezone.utc) + timedelta(hours=5)
+    for version in (1, 2, 3):
+        queue_db.add(CaseSla(case_id=f"CASE-A-v{version}", account_id="A", sla_due_at=due, sla_status="ON_TRACK"))
+    queue_db.add(CaseSla(case_id="CASE-B-v1", account_id="B", sla_due_at=due, sla_status="BREACHED"))
+    queue_db.commit()
+
+    assert supersede_duplicate_slas(queue_db) == 2
+    open_rows = {r.case_id for r in queue_db.query(CaseSla).filter(CaseSla.sla_status != "SUPERSEDED")}
+    assert open_rows == {"CASE-A-v3", "CASE-B-v1"}
+    assert supersede_duplicate_slas(queue_db) == 0
+
+
+def test_sweeper_moves_statuses_by_due_time(queue_db):
+    now = datetime.now(timezone.utc)
+    for case_id, hours in (("late", -1), ("soon", 1), ("later", 10)):
+        queue_db.add(CaseSla(case_id=case_id, account_id=case_id, sla_due_at=now + timedelta(hours=hours), sla_status="ON_TRACK"))
+    queue_db.commit()
+
+    assert sweep_sla_statuses(queue_db, now) == 2
+    statuses = {r.case_id: r.sla_status for r in queue_db.query(CaseSla)}
+    assert statuses == {"late": "BREACHED", "soon": "DUE_SOON", "later": "ON_TRACK"}
+    assert sweep_sla_statuses(queue_db, now) == 0
+
+
+def test_queue_pages_in_due_order_without_gaps_or_repeats(queue_db):
+    base = datetime.now(timezone.utc) + timedelta(hours=3)
+    for i in range(7):
+        # pairs share a due time, so the id breaks the tie across page boundaries
+        queue_db.add(CaseSla(case_id=f"C{i}", account_id=f"A{i}", sla_due_at=base + timedelta(minutes=i // 2), sla_status="ON_TRACK"))
+    queue_db.add(CaseSla(case_id="closed", account_id="Z", sla_due_at=base, sla_status="RESOLVED"))
+    queue_db.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = list_sla_queue(queue_db, cursor=cursor, limit=3)
+        seen += [item["case_id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"C{i}" for i in range(7)]
+
+    assert [i["case_id"] for i in list_sla_queue(queue_db, due_within_hours=3.01)["items"]] == ["C0", "C1"]
+    with pytest.raises(ValueError):
+        list_sla_queue(queue_db, cursor="not-a-cursor")
@@ -0,0 +1,76 @@
+"""
+Signal push on ingest (app.streaming): detections are published exactly once, even when a reader
+refreshes the case before the background evaluation gets to it.
+"""
+
+import time
+
+import pytest
+
+from app import streaming
+from app.streaming import IngestEvaluator, evaluate_ingested_event
+from tests.conftest import event_body
+
+
+@pytest.fixture
+def published(monkeypatch):
+    messages = []
+    monkeypatch.setattr(streaming.signal_broker, "publish", messages.append)
+    return messages
+
+
+def _ingest_profile_change_then_transfer(client, account_id):
+    first = client.post("/events", json=event_body(account_id, "profile_change", {"changed_fields": ["email"]}))
+    second = client.post("/events", json=event_body(
+        account_id, "transaction_posted", {"amount": 9000, "currency": "CAD", "counterparty": "mule-1"},
+    ))
+    return first.json()["event_id"], second.json()["event_id"]
+
+
+def test_case_read_before_evaluation_does_not_swallow_detections(client, db, account_id, published):
+    first_id, last_id = _ingest_profile_change_then_transfer(client, account_id)
+
+    # A reader lands between the ingest and the background evaluation and refreshes the snapshot
+    case = client.get(f"/case/{account_id}").json()
+    assert "PROFILE_CHANGE_AND_TRANSFER_24HR" in {s["signal_name"] for s in case["signals"]}
+
+    evaluate_ingested_event(db, account_id, last_id, first_id)
+    names = {m.get("signal_name") for m in published if m["type"] == "signal"}
+    assert {"PROFILE_CHANGE", "LARGE_TRANSACTION", "PROFILE_CHANGE_AND_TRANSFER_24HR"} <= names
+    bands = [m for m in published if m["type"] == "band_change"]
+    assert len(bands) == 1 and bands[0]["from_band"] is None and bands[0]["to_band"] == case["risk_assessment"]["risk_band"]
+
+    # Already announced: evaluating again publishes nothing
+    published.clear()
+    assert evaluate_ingested_event(db, account_id, last_id, first_id) == []
+
+
+def test_only_new_detections_are_published(client, db, account_id, published):
+    first_id, last_id = _ingest_profile_change_then_transfer(client, account_id)
+    evaluate_ingested_event(db, account_id, last_id, first_id)
+    published.clear()
+
+    event_id = client.post("/events", json=event_body(account_id, "device_login", {"device_id": "new-phone"})).json()["event_id"]
+    client.get(f"/risk/{account_id}")
+    evaluate_ingested_event(db, account_id, event_id)
+    assert [(m["type"], m.get("signal_name")) for m in published] == [("signal", "NEW_DEVICE_LOGIN")]
+
+
+def test_evaluator_coalesces_an_accounts_events(client, account_id, published):
+    from app.database import SessionLocal
+
+    first_id, last_id = _ingest_profile_change_then_transfer(client, account_id)
+    evaluator = IngestEvaluator(workers=1)
+    evaluator.submit(account_id, first_id)
+    evaluator.submit(account_id, last_id)
+    assert evaluator.stats()["pending_accounts"] == 1 and evaluator.stats()["coalesced"] == 1
+
+    evaluator.start(SessionLocal)
+    try:
+        deadline = time.monotonic() + 10
+        while evaluator.stats()["evaluated"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        evaluator.stop()
+    assert evaluator.stats()["evaluated"] == 1 and evaluator.stats()["failed"] == 0
+    assert "PROFILE_CHANGE_AND_TRANSFER_24HR" in {m.get("signal_name") for m in published}
@@ -0,0 +1,78 @@
+"""
+Portfolio sweep (app.sweep): shards are account_bucket ranges that together cover every account
+exactly once, including events stored before the column existed.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import init_db
+from app.models import AccountRisk, Event, account_bucket
+from app.sweep import run_sweep, shard_of, shard_range
+
+
+def test_shard_ranges_cover_every_bucket_once():
+    for shards in (1, 3, 8):
+        ranges = [shard_range(s, shards) for s in range(shards)]
+        assert ranges[0][0] == 0 and ranges[-1][1] == 1 << 32
+        assert all(ranges[s][1] == ranges[s + 1][0] for s in range(shards - 1))
+        for account_id in ("A1", "B22", "C333", ""):
+            lo, hi = ranges[shard_of(account_id, shards)]
+            assert lo <= account_bucket(account_id) < hi
+
+
+def test_sweep_scores_every_account_including_legacy_rows(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'sweep.db'}"
+    engine = create_engine(database_url)
+    init_db(engine)
+    at = datetime.now(timezone.utc) - timedelta(days=1)
+    accounts = [f"S{i:03d}" for i in range(40)]
+    with engine.begin() as conn:
+        conn.execute(insert(Event), [
+            {"account_id": a, "event_type": "transaction_posted", "created_at": at + timedelta(minutes=n),
+             "payload": {"amount": 9000, "currency": "CAD", "counterparty": "p1"}}
+            for a in accounts for n in range(2)
+        ])
+        stored = {a: b for a, b in conn.execute(select(Event.account_id, Event.account_bucket).distinct())}
+        # rows stored before the column existed
+        conn.execute(update(Event).where(Event.account_id.in_(accounts[:10])).values(account_bucket=None))
+    assert stored == {a: account_bucket(a) for a in accounts}   # filled on insert
+
+    result = run_sweep(database_url=database_url, workers=1, shards=3)
+    assert result["shards_done"] == 3
+    assert result["accounts_done"] == len(accounts)
+    assert result["events_done"] == 2 * len(accounts)
+
+    with sessionmaker(bind=engine)() as db:
+        assert {a for (a,) in db.query(AccountRisk.account_id)} == set(accounts)
+        assert db.query(Event).filter(Event.account_bucket.is_(None)).count() == 0
+    engine.dispose()
+
+
+def test_shard_resumes_after_its_checkpointed_account(tmp_path, monkeypatch):
+    from app import sweep
+
+    monkeypatch.setattr(sweep, "SWEEP_CHECKPOINT_DIR", tmp_path / "sweeps")
+    database_url = f"sqlite:///{tmp_path / 'resume.db'}"
+    engine = create_engine(database_url)
+    init_db(engine)
+    accounts = [f"R{i:03d}" for i in range(20)]
+    with engine.begin() as conn:
+        conn.execute(insert(Event), [{"account_id": a, "event_type": "device_login", "payload": {"device_id": "d1"}} for a in accounts])
+    engine.dispose()
+
+    in_order = sorted(accounts, key=lambda a: (account_bucket(a), a))   # the order a shard walks
+    (tmp_path / "sweeps" / "s1").mkdir(parents=True)
+    sweep._write_json(sweep._shard_path("s1", 0), {
+        "shard": 0, "last_account_id": in_order[7], "accounts_done": 8, "events_done": 8, "done": False,
+    })
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    checkpoint = sweep.sweep_shard(database_url, "s1", 0, 1, cutoff)
+    assert checkpoint["done"] and checkpoint["accounts_done"] == len(accounts)
+
+    engine = create_engine(database_url)
+    with sessionmaker(bind=engine)() as db:
+        assert {a for (a,) in db.query(AccountRisk.account_id)} == set(in_order[8:])
+    engine.dispose()